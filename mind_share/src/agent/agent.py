@@ -1,56 +1,18 @@
 from nearai.agents.environment import Environment
-import near_api
 import json
 import os
 import requests
 from datetime import datetime, timedelta
-from decimal import Decimal
 from src.constants import ASSET_MAP
+from src.agent.balances import read_balances
+from src.timeseries.store import open_store
+from src.telemetry import log
 
-def get_account(account_id, private_key, provider):
-    near_provider = near_api.providers.JsonProvider(provider)
-    key_pair = near_api.signer.KeyPair(private_key)
-    signer = near_api.signer.Signer(account_id, key_pair)
-    return near_api.account.Account(near_provider, signer, account_id)
+KAITO_API_URL = "https://api.kaito.ai/api/v1/mindshare"
+KAITO_TIMEOUT = 10  # seconds, the scheduler kills the whole agent once its stage budget is spent
 
-def get_asset_id(token):
-    if token == 'NEAR':
-        return 'nep141:' + ASSET_MAP[token]['token_id']
-    else:
-        return ASSET_MAP[token]['token_id']
-   
-def get_account_balances(account):
-    """Get all assets for an account in intents.near contract"""
-    balances = {}
-    
-    for token, info in ASSET_MAP.items():
-        try:
-            result = account.view_function(
-                "intents.near",
-                "mt_balance_of",
-                {
-                    "account_id": account.account_id,
-                    "token_id": get_asset_id(token)
-                }
-            )
-            
-            if isinstance(result, dict) and 'result' in result:
-                balance_str = result['result']
-                if balance_str:
-                    balance = Decimal(balance_str) / Decimal(str(10 ** info['decimals']))
-                    if balance > 0:
-                        balances[token] = float(balance)
-                    else:
-                        balances[token] = 0
-            
-        except Exception as e:
-            print(f"Error getting balance for {token}: {str(e)}")
-            continue
-    
-    return balances
-
-def get_mindshare(token, api_key, use_mock=None):
-    print(f"Getting mindshare for token: {token}")  # Debug log
+def get_mindshare(token, api_key, use_mock=None, api_url=None, store=None):
+    log.debug("agent.mindshare", f"Getting mindshare for token: {token}")
     if use_mock is None:
         use_mock = os.getenv('USE_MOCK_MINDSHARE', 'false').lower() == 'true'
 
@@ -65,19 +27,22 @@ def get_mindshare(token, api_key, use_mock=None):
             "XRP": {"mindshare": 0.05},
         }
         result = mock_data.get(token, {"error": "Token not found"})
-        print(f"Mock mindshare result for {token}: {result}")  # Debug log
+        log.debug("agent.mindshare_mock", f"Mock mindshare result for {token}", result=result)
         return result
     else:
         # KAITO API Connection
 
         today = datetime.now().strftime("%Y-%m-%d")
         yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-        base_url = f"https://api.kaito.ai/api/v1/mindshare?token={token}&start_date={yesterday}&end_date={today}"
+        base_url = f"{api_url or KAITO_API_URL}?token={token}&start_date={yesterday}&end_date={today}"
         headers = {"x-api-key": api_key}
-        response = requests.get(base_url, headers=headers)
-        print(f"Kaito API response for {token}: {response.text}")  # Debug log
+        response = requests.get(base_url, headers=headers, timeout=KAITO_TIMEOUT)
+        log.debug("agent.kaito_response", f"Kaito API response for {token}", status=response.status_code, body=response.text)
         if response.status_code == 200:
             data = response.json()
+            if store is not None:
+                # Keep the whole window for history, the decision still uses the first value
+                store.record_mindshare(token, data['mindshare'])
             mindshare_value = list(data['mindshare'].values())[0]
             return {"mindshare": mindshare_value}
         else:
@@ -86,30 +51,26 @@ def get_mindshare(token, api_key, use_mock=None):
 
             return
 
-def get_provider(network):
-    if network == 'testnet':
-        return 'https://rpc.testnet.near.org'
-    else:
-        return 'https://rpc.mainnet.near.org'
-
 def run(env: Environment):
 
     api_key = env.env_vars.get('KAITO_API_KEY')
     account_id = env.env_vars.get('ACCOUNT_ID')
-    private_key = env.env_vars.get('PRIVATE_KEY')
     network = env.env_vars.get('NETWORK')
     use_mock = env.env_vars.get('USE_MOCK_MINDSHARE', 'false').lower() == 'true'
-
-    provider = get_provider(network)
+    kaito_api_url = env.env_vars.get('KAITO_API_URL')
+    store = open_store(env.env_vars.get('TIMESERIES_DIR'))
 
     print("Getting account balances")
-    account = get_account(account_id, private_key, provider)
-    balances = get_account_balances(account)
+    # Endpoint picked by the scheduler's RPC pool, the network defaults otherwise
+    # The scheduler hands over the balances it kept current from settled intents, they are read otherwise
+    known_balances = env.env_vars.get('BALANCES')
+    balances = json.loads(known_balances) if known_balances else read_balances(account_id, network, env.env_vars.get('RPC_URL'))
+    # The scheduler reads the balances back from this line of stdout
     print(f"Retrieved balances: {balances}")
 
     token_data = {}
     for token, amount in balances.items():
-        mindshare = get_mindshare(token, api_key, use_mock)
+        mindshare = get_mindshare(token, api_key, use_mock, kaito_api_url, store)
         if "error" not in mindshare:
             mindshare_value = mindshare["mindshare"]
             token_data[token] = {"balance": amount, "mindshare": mindshare_value}
@@ -137,7 +98,7 @@ def run(env: Environment):
     
     }
     
-    print(f"Sending prompt to LLM: {prompt}")
+    log.debug("agent.prompt", "Sending prompt to LLM", prompt=prompt["content"])
     messages = env.list_messages()
     result = env.completion([prompt] + messages)
     
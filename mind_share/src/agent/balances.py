@@ -0,0 +1,58 @@
+import asyncio
+
+from decimal import Decimal
+from src.constants import ASSET_MAP
+from src.quote.generate_quote import get_asset_id
+from src.rpc.client import NearRpcClient, get_rpc_client
+from src.rpc.endpoints import RpcEndpointPool
+from src.rpc.view_cache import ViewCallCache
+from src.telemetry import log
+
+INTENTS_CONTRACT = "intents.near"
+
+
+async def get_token_balance(client: NearRpcClient, account_id: str, token: str, cache: ViewCallCache):
+    args = {"account_id": account_id, "token_id": get_asset_id(token)}
+    # NEAR and WNEAR share a token id, the concurrent second read waits for the first
+    result = await cache.call(
+        INTENTS_CONTRACT, "mt_balance_of", args,
+        lambda: client.view_function(INTENTS_CONTRACT, "mt_balance_of", args)
+    )
+    balance_str = result.get('result')
+    if not balance_str:
+        return None
+    balance = Decimal(balance_str) / Decimal(str(10 ** ASSET_MAP[token]['decimals']))
+    return float(balance) if balance > 0 else 0
+
+
+async def get_account_balances(client: NearRpcClient, account_id: str, cache: ViewCallCache = None):
+    """Get all assets for an account in intents.near contract, through the client's shared view cache by default"""
+    if cache is None:
+        cache = client.view_cache
+
+    tokens = list(ASSET_MAP)
+    results = await asyncio.gather(
+        *(get_token_balance(client, account_id, token, cache) for token in tokens),
+        return_exceptions=True
+    )
+
+    balances = {}
+    for token, result in zip(tokens, results):
+        if isinstance(result, Exception):
+            log.warning("balances.read_failed", f"Error getting balance for {token}: {str(result)}", token=token)
+        elif result is not None:
+            balances[token] = result
+    return balances
+
+
+def read_balances(account_id: str, network: str, rpc_url: str = None):
+    """Blocking entry point for callers without an event loop, like the nearai agent process"""
+    client = NearRpcClient(RpcEndpointPool([rpc_url])) if rpc_url else get_rpc_client(network)
+
+    async def read():
+        try:
+            return await get_account_balances(client, account_id)
+        finally:
+            await client.close()
+
+    return asyncio.run(read())
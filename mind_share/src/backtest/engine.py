@@ -0,0 +1,166 @@
+import itertools
+
+import numpy as np
+
+from typing import Any, Dict, List, Optional, Sequence, Union
+from src.constants import ASSET_MAP
+
+DEFAULT_FEE_BPS = 30.0  # solver spread and protocol fee taken from every fill
+DEFAULT_MIN_TRADE_USD = 1.0  # smaller swaps get no solver quote, as with a dust amount_in live
+
+
+def reference_price(token: str) -> float:
+    """ASSET_MAP price of the token, NEAR trades at the price of its wrapped form"""
+    asset = ASSET_MAP.get('WNEAR' if token == 'NEAR' else token, {})
+    return float(asset.get('price', 1.0))
+
+
+class MarketHistory:
+    """Price and mindshare series aligned on the same timesteps, one column per token"""
+
+    def __init__(self, tokens: Sequence[str], prices: np.ndarray, mindshare: np.ndarray,
+                 timestamps: Optional[np.ndarray] = None):
+        self.tokens = list(tokens)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.mindshare = np.asarray(mindshare, dtype=np.float64)
+        if self.prices.shape != self.mindshare.shape or self.prices.shape[1:] != (len(self.tokens),):
+            raise ValueError(f"prices {self.prices.shape} and mindshare {self.mindshare.shape} must both be (steps, {len(self.tokens)})")
+        self.timestamps = np.arange(len(self.prices)) if timestamps is None else np.asarray(timestamps)
+
+    @property
+    def steps(self) -> int:
+        return len(self.prices)
+
+    def index(self, token: str) -> int:
+        return self.tokens.index(token)
+
+    @classmethod
+    def synthetic(cls, tokens: Optional[Sequence[str]] = None, steps: int = 2000, seed: int = 0,
+                  volatility: float = 0.01) -> "MarketHistory":
+        """Random walks from the ASSET_MAP prices where a rising mindshare nudges the price up, WNEAR follows NEAR"""
+        tokens = list(tokens or ASSET_MAP)
+        rng = np.random.default_rng(seed)
+        mindshare_steps = rng.normal(0, 0.02, size=(steps, len(tokens)))
+        mindshare = np.clip(0.3 + np.cumsum(mindshare_steps, axis=0), 0.0, 1.0)
+        returns = rng.normal(0, volatility, size=(steps, len(tokens))) + 0.1 * mindshare_steps
+        start = np.array([reference_price(token) for token in tokens])
+        prices = start * np.exp(np.cumsum(returns, axis=0))
+        if 'NEAR' in tokens and 'WNEAR' in tokens:
+            # Wrapped 1:1, an independent walk would leave an arbitrage no solver quote offers
+            near, wnear = tokens.index('NEAR'), tokens.index('WNEAR')
+            prices[:, wnear] = prices[:, near]
+            mindshare[:, wnear] = mindshare[:, near]
+        return cls(tokens, prices, mindshare)
+
+    @classmethod
+    def from_store(cls, store, tokens: Sequence[str], start: int, end: int, step: int) -> "MarketHistory":
+        """History resampled from a TimeSeriesStore every step seconds, the last observation carried forward"""
+        from src.timeseries.store import MINDSHARE, PRICE, STABLE_TOKENS
+
+        timestamps = np.arange(start, end, step)
+        prices = np.column_stack([
+            np.ones(len(timestamps)) if token in STABLE_TOKENS and not len(store.series(PRICE, token))
+            else store.series(PRICE, token).resample(timestamps)
+            for token in tokens
+        ])
+        mindshare = np.column_stack([store.series(MINDSHARE, token).resample(timestamps) for token in tokens])
+        # Before a token's first observation, use its first one and a zero mindshare
+        missing = [token for token, column in zip(tokens, prices.T) if np.isnan(column).all()]
+        if missing:
+            raise ValueError(f"No price recorded for {', '.join(missing)} before {end}")
+        first = np.argmax(~np.isnan(prices), axis=0)
+        prices = np.where(np.isnan(prices), prices[first, np.arange(len(tokens))], prices)
+        return cls(tokens, prices, np.nan_to_num(mindshare), timestamps)
+
+
+class BacktestResult:
+    """Portfolio value of every parameter set at every timestep, with the fees and fills that got it there"""
+
+    def __init__(self, tokens: List[str], params: Dict[str, np.ndarray], values: np.ndarray, balances: np.ndarray,
+                 fees: np.ndarray, trades: np.ndarray):
+        self.tokens = tokens
+        self.params = params
+        self.values = values
+        self.balances = balances
+        self.fees = fees
+        self.trades = trades
+
+    @property
+    def returns(self) -> np.ndarray:
+        return self.values[:, -1] / self.values[:, 0] - 1
+
+    @property
+    def max_drawdown(self) -> np.ndarray:
+        peaks = np.maximum.accumulate(self.values, axis=1)
+        return ((peaks - self.values) / peaks).max(axis=1)
+
+    def summary(self, top: Optional[int] = None) -> List[Dict[str, Any]]:
+        """One row per parameter set, best return first"""
+        returns, drawdowns = self.returns, self.max_drawdown
+        rows = []
+        for i in np.argsort(-returns)[:top]:
+            rows.append({
+                "params": {name: values[i].item() for name, values in self.params.items()},
+                "return": round(float(returns[i]), 6),
+                "max_drawdown": round(float(drawdowns[i]), 6),
+                "final_value": round(float(self.values[i, -1]), 2),
+                "fees": round(float(self.fees[i]), 2),
+                "trades": int(self.trades[i]),
+            })
+        return rows
+
+
+def param_grid(**axes: Sequence[Any]) -> Dict[str, np.ndarray]:
+    """Every combination of the axes, one flat array per parameter"""
+    names = list(axes)
+    combinations = list(itertools.product(*(axes[name] for name in names)))
+    return {name: np.array([combination[i] for combination in combinations]) for i, name in enumerate(names)}
+
+
+class Backtester:
+    """Replays a history through a strategy, filling intent_swap trades for every parameter set at once"""
+
+    def __init__(self, history: MarketHistory, fee_bps: float = DEFAULT_FEE_BPS, slippage_bps: float = 0.0,
+                 min_trade_usd: float = DEFAULT_MIN_TRADE_USD, decide_every: int = 1):
+        self.history = history
+        self.fee_bps = fee_bps
+        self.slippage_bps = slippage_bps
+        self.min_trade_usd = min_trade_usd
+        # Timesteps between two agent runs, the SCHEDULE_INTERVAL of the history's resolution
+        self.decide_every = decide_every
+
+    def initial_balances(self, balances: Union[Dict[str, float], np.ndarray], sets: int) -> np.ndarray:
+        if isinstance(balances, dict):
+            balances = np.array([balances.get(token, 0.0) for token in self.history.tokens])
+        return np.broadcast_to(np.asarray(balances, dtype=np.float64), (sets, len(self.history.tokens))).copy()
+
+    def run(self, strategy, balances: Union[Dict[str, float], np.ndarray]) -> BacktestResult:
+        sets = strategy.sets
+        held = self.initial_balances(balances, sets)
+        steps, tokens = self.history.steps, len(self.history.tokens)
+        values = np.empty((sets, steps))
+        fees = np.zeros(sets)
+        trades = np.zeros(sets, dtype=np.int64)
+        kept = 1 - (self.fee_bps + self.slippage_bps) / 10000
+        off_diagonal = 1 - np.eye(tokens)
+
+        for step in range(steps):
+            prices = self.history.prices[step]
+            if step % self.decide_every == 0:
+                # Share of each token_in balance swapped into each token_out, (sets, token_in, token_out)
+                fractions = np.clip(strategy.decide(step, self.history, held), 0.0, None) * off_diagonal
+                total = fractions.sum(axis=2, keepdims=True)
+                fractions = np.where(total > 1, fractions / np.maximum(total, 1e-12), fractions)
+
+                sold = held[:, :, None] * fractions
+                sold_value = sold * prices[None, :, None]
+                filled = sold_value >= self.min_trade_usd
+                sold = np.where(filled, sold, 0.0)
+                sold_value = np.where(filled, sold_value, 0.0)
+
+                held = held - sold.sum(axis=2) + (sold_value * kept).sum(axis=1) / prices
+                fees += sold_value.sum(axis=(1, 2)) * (1 - kept)
+                trades += filled.sum(axis=(1, 2))
+            values[:, step] = held @ prices
+
+        return BacktestResult(self.history.tokens, strategy.params, values, held, fees, trades)
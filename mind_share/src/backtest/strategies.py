@@ -0,0 +1,100 @@
+import ast
+
+import numpy as np
+
+from typing import Dict, List, Optional, Sequence
+from src.backtest.engine import MarketHistory
+from src.bench.cassette import AGENT, Cassette
+from src.quote.generate_quote import parse_llm_response
+
+BALANCES_PREFIX = 'Retrieved balances: '  # the line the scheduler reads the balances back from
+
+
+class Strategy:
+    """Decides the swaps of every parameter set at a timestep, as fractions of each token_in balance"""
+
+    def __init__(self, params: Optional[Dict[str, np.ndarray]] = None, sets: Optional[int] = None):
+        self.params = {name: np.asarray(values) for name, values in (params or {}).items()}
+        self.sets = sets or (len(next(iter(self.params.values()))) if self.params else 1)
+
+    def decide(self, step: int, history: MarketHistory, balances: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class Hold(Strategy):
+    """Never trades, the baseline every strategy should beat"""
+
+    def decide(self, step, history, balances):
+        tokens = len(history.tokens)
+        return np.zeros((self.sets, tokens, tokens))
+
+
+class MindshareMomentum(Strategy):
+    """Moves out of tokens losing mindshare into the one gaining the most
+
+    Parameters, one value per set: lookback (timesteps), threshold (mindshare change that triggers a trade)
+    and fraction (share of a losing balance that is sold).
+    """
+
+    def __init__(self, lookback: Sequence[int], threshold: Sequence[float], fraction: Sequence[float]):
+        super().__init__({"lookback": lookback, "threshold": threshold, "fraction": fraction})
+        self.lookback = self.params["lookback"].astype(np.int64)
+        self.threshold = self.params["threshold"].astype(np.float64)[:, None]
+        self.fraction = self.params["fraction"].astype(np.float64)
+
+    def decide(self, step, history, balances):
+        sets, tokens = balances.shape
+        delta = history.mindshare[step] - history.mindshare[np.maximum(step - self.lookback, 0)]
+        best = delta.argmax(axis=1)
+        buying = delta[np.arange(sets), best] > self.threshold[:, 0]
+        selling = (delta < -self.threshold) & buying[:, None]
+
+        fractions = np.zeros((sets, tokens, tokens))
+        fractions[np.arange(sets)[:, None], np.arange(tokens)[None, :], best[:, None]] = selling * self.fraction[:, None]
+        return fractions
+
+
+def response_balances(response: str) -> Dict[str, float]:
+    for line in response.split('\n'):
+        if line.startswith(BALANCES_PREFIX):
+            return ast.literal_eval(line[len(BALANCES_PREFIX):].strip())
+    return {}
+
+
+class RecordedResponses(Strategy):
+    """Replays recorded agent outputs through the live parser, one response per decision in order
+
+    A trade moves the same share of the simulated balance as it did of the balance the agent saw,
+    so every parameter set of the backtester follows the recorded decisions.
+    """
+
+    def __init__(self, responses: List[str], tokens: Sequence[str], sets: int = 1, decide_every: int = 1):
+        super().__init__(sets=sets)
+        self.decide_every = decide_every
+        self.decisions = [self.parse(response, list(tokens)) for response in responses]
+
+    @staticmethod
+    def parse(response: str, tokens: List[str]) -> np.ndarray:
+        balances = response_balances(response)
+        fractions = np.zeros((len(tokens), len(tokens)))
+        for trade in parse_llm_response(response, balances):
+            held = balances.get(trade["token_in"])
+            if not held or trade["token_in"] not in tokens or trade["token_out"] not in tokens:
+                continue
+            fractions[tokens.index(trade["token_in"]), tokens.index(trade["token_out"])] += trade["amount_in"] / held
+        return fractions
+
+    @classmethod
+    def from_cassettes(cls, paths: List[str], tokens: Sequence[str], **kwargs) -> "RecordedResponses":
+        """Agent outputs of recorded cycles, see src/bench/harness.py record"""
+        responses = []
+        for path in paths:
+            responses.extend(interaction.result["stdout"] for interaction in Cassette.load(path).by_stage(AGENT))
+        return cls(responses, tokens, **kwargs)
+
+    def decide(self, step, history, balances):
+        # decide_every must match the backtester's, so the n-th agent run gets the n-th response
+        decision = step // self.decide_every
+        if decision >= len(self.decisions):
+            return Hold(sets=self.sets).decide(step, history, balances)
+        return np.broadcast_to(self.decisions[decision], (self.sets,) + self.decisions[decision].shape)
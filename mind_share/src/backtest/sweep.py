@@ -0,0 +1,70 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+from typing import Any, Dict, List, Optional
+from src.backtest.engine import DEFAULT_FEE_BPS, Backtester, MarketHistory, param_grid
+from src.backtest.strategies import Hold, MindshareMomentum, RecordedResponses
+
+DEFAULT_BALANCES = {'USDC': 100.0, 'NEAR': 30.0, 'ETH': 0.05, 'SOL': 0.7}
+DEFAULT_GRID = {
+    "lookback": [1, 3, 6, 12, 24, 48],
+    "threshold": [0.005, 0.01, 0.02, 0.04, 0.08],
+    "fraction": [0.05, 0.1, 0.2, 0.4],
+}
+
+
+def load_history(path: str) -> MarketHistory:
+    """History from an .npz with tokens, prices and mindshare arrays"""
+    data = np.load(path)
+    return MarketHistory([str(token) for token in data["tokens"]], data["prices"], data["mindshare"],
+                         data["timestamps"] if "timestamps" in data else None)
+
+
+def sweep(history: MarketHistory, grid: Optional[Dict[str, List[Any]]] = None, balances: Optional[Dict[str, float]] = None,
+          fee_bps: float = DEFAULT_FEE_BPS, decide_every: int = 1, top: int = 5,
+          cassettes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Momentum over every combination of the grid, against holding and the recorded agent decisions"""
+    balances = balances or DEFAULT_BALANCES
+    backtester = Backtester(history, fee_bps=fee_bps, decide_every=decide_every)
+    strategy = MindshareMomentum(**param_grid(**(grid or DEFAULT_GRID)))
+
+    started = time.perf_counter()
+    result = backtester.run(strategy, balances)
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "steps": history.steps,
+        "tokens": history.tokens,
+        "parameter_sets": strategy.sets,
+        "elapsed_s": round(elapsed, 3),
+        "set_steps_per_s": round(strategy.sets * history.steps / elapsed),
+        "hold": backtester.run(Hold(), balances).summary()[0],
+        "top": result.summary(top),
+    }
+    if cassettes:
+        recorded = RecordedResponses.from_cassettes(cassettes, history.tokens, decide_every=decide_every)
+        report["recorded"] = backtester.run(recorded, balances).summary()[0]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep strategy parameters over a price and mindshare history")
+    parser.add_argument("--history", help=".npz history, a synthetic one when omitted")
+    parser.add_argument("--steps", type=int, default=5000, help="timesteps of the synthetic history")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic history")
+    parser.add_argument("--fee-bps", type=float, default=DEFAULT_FEE_BPS, help="fee and spread of every fill")
+    parser.add_argument("--decide-every", type=int, default=1, help="timesteps between two agent runs")
+    parser.add_argument("--cassette", action="append", help="recorded cycle whose agent output is replayed, repeatable")
+    parser.add_argument("--top", type=int, default=5, help="parameter sets reported")
+    args = parser.parse_args()
+
+    history = load_history(args.history) if args.history else MarketHistory.synthetic(steps=args.steps, seed=args.seed)
+    report = sweep(history, fee_bps=args.fee_bps, decide_every=args.decide_every, top=args.top, cassettes=args.cassette)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
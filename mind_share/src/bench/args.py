@@ -0,0 +1,81 @@
+import argparse
+import json
+import statistics
+import timeit
+
+from typing import Any, Dict, List
+from src.contract.encoding import ARGS_ENCODINGS, BYTE_ARGS, ArgsEncoding
+from src.quote.generate_quote import create_token_diff_quote, to_decimals
+from src.quote.serializer import erc191_message
+from src.rpc.client import encode_args, serialize_args
+
+# Protocol fees of a function call action per byte of method name and args, send (not to self) plus execution
+ARGS_GAS_PER_BYTE = 2235934 + 2235934
+SAMPLE_TRADES = [("NEAR", 12.5, "USDC", "38125000"), ("ETH", 0.42, "SOL", "5912300000"), ("SOL", 3.1, "NEAR", "1812000000000000000000000")]
+TRANSACTION_METHODS = ("sign_trade",)  # generate_payload is a view call, free of gas
+SPACED = "json-spaced"  # what py_near sent before: the JSON encoding with default separators
+
+
+def sample_quotes(account_id: str = "mindshare.near") -> List[str]:
+    return [
+        create_token_diff_quote(account_id, token_in, to_decimals(amount_in, 24 if token_in == "NEAR" else 18),
+                                token_out, amount_out)
+        for token_in, amount_in, token_out, amount_out in SAMPLE_TRADES
+    ]
+
+
+def method_data(method_name: str, quote: str) -> bytes:
+    """Bytes a method is called with for a quote, generate_payload gets the ERC-191 message"""
+    if method_name == "generate_payload":
+        return erc191_message(quote.encode('utf-8'))
+    return quote.encode('utf-8')
+
+
+def measure(encoding: str, method_name: str, data: bytes, repeat: int) -> Dict[str, Any]:
+    if encoding == SPACED:
+        wire_method = method_name
+        encode = lambda: json.dumps(ArgsEncoding().encode(method_name, data)).encode('utf-8')
+    else:
+        args_encoding = ArgsEncoding(encoding)
+        wire_method = args_encoding.method(method_name)
+        encode = lambda: serialize_args(args_encoding.encode(method_name, data))
+    args = encode()
+    return {
+        "args_bytes": len(args),
+        # View calls and signed transactions carry the args in base64 inside the JSON-RPC request
+        "rpc_bytes": len(encode_args(args)),
+        "gas": (len(wire_method) + len(args)) * ARGS_GAS_PER_BYTE if method_name in TRANSACTION_METHODS else 0,
+        "encode_us": round(timeit.timeit(encode, number=repeat) / repeat * 1e6, 2),
+    }
+
+
+def run(repeat: int = 2000) -> Dict[str, Any]:
+    """Argument size, fee gas and encoding time of generate_payload and sign_trade per encoding, medians over the sample quotes"""
+    quotes = sample_quotes()
+    methods = {}
+    for method_name in BYTE_ARGS:
+        encodings = {}
+        for encoding in (SPACED,) + ARGS_ENCODINGS:
+            samples = [measure(encoding, method_name, method_data(method_name, quote), repeat) for quote in quotes]
+            encodings[encoding] = {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+        baseline = encodings[SPACED]["args_bytes"]
+        for stats in encodings.values():
+            stats["vs_spaced"] = round(stats["args_bytes"] / baseline, 3)
+        methods[method_name] = encodings
+    return {
+        "quotes": len(quotes),
+        "message_bytes_p50": statistics.median(len(method_data("generate_payload", quote)) for quote in quotes),
+        "gas_per_byte": ARGS_GAS_PER_BYTE,
+        "methods": methods,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the wire size and cost of the contract args encodings")
+    parser.add_argument("--repeat", type=int, default=2000, help="encodings timed per sample")
+    args = parser.parse_args()
+    print(json.dumps(run(args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import json
+import time
+
+from typing import Any, Dict, List, Optional
+
+AGENT = "agent"
+SOLVER_QUOTE = "solver.quote"
+SIGN_TRADE = "contract.sign_trade"
+GENERATE_PAYLOAD = "contract.generate_payload"
+SOLVER_PUBLISH = "solver.publish"
+
+STAGES = [AGENT, SOLVER_QUOTE, SIGN_TRADE, GENERATE_PAYLOAD, SOLVER_PUBLISH]
+
+
+class CassetteExhausted(Exception):
+    """Replay asked for more interactions of a stage than were recorded"""
+
+
+class Interaction:
+    """One recorded call to an external system and how long it took"""
+
+    def __init__(self, stage: str, result: Any, latency: float):
+        self.stage = stage
+        self.result = result
+        self.latency = latency
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"stage": self.stage, "result": self.result, "latency": self.latency}
+
+
+class Cassette:
+    """External interactions of one rebalancing cycle, replayed per stage in the order they were recorded"""
+
+    def __init__(self, interactions: Optional[List[Interaction]] = None, meta: Optional[Dict[str, Any]] = None):
+        self.interactions = interactions or []
+        self.meta = meta or {}
+        self._cursors: Dict[str, int] = {}
+
+    def add(self, stage: str, result: Any, latency: float) -> Interaction:
+        interaction = Interaction(stage, result, latency)
+        self.interactions.append(interaction)
+        return interaction
+
+    def by_stage(self, stage: str) -> List[Interaction]:
+        return [interaction for interaction in self.interactions if interaction.stage == stage]
+
+    def rewind(self):
+        """Start the next replay from the first interaction of every stage"""
+        self._cursors = {}
+
+    def next(self, stage: str) -> Interaction:
+        position = self._cursors.get(stage, 0)
+        recorded = self.by_stage(stage)
+        if position >= len(recorded):
+            raise CassetteExhausted(f"No recorded {stage} interaction left (recorded {len(recorded)})")
+        self._cursors[stage] = position + 1
+        return recorded[position]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "meta": self.meta,
+            "interactions": [interaction.to_dict() for interaction in self.interactions],
+        }
+
+    def save(self, path: str):
+        self.meta.setdefault("recorded_at", time.time())
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with open(path, 'r') as file:
+            data = json.load(file)
+        interactions = [
+            Interaction(entry['stage'], entry['result'], entry.get('latency', 0.0))
+            for entry in data.get('interactions', [])
+        ]
+        return cls(interactions, data.get('meta'))
@@ -0,0 +1,351 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import threading
+import time
+
+from typing import Any, Callable, Dict, List, Optional
+from src.constants import BASE_DIR
+from src.bench.cassette import (
+    Cassette, STAGES, AGENT, SOLVER_QUOTE, SIGN_TRADE, GENERATE_PAYLOAD, SOLVER_PUBLISH
+)
+from src.contract.sign_intent import SignIntentContract
+from src.scheduler.scheduler import MindshareScheduler
+
+import src.quote.generate_quote as generate_quote
+
+SAMPLE_CASSETTE_PATH = os.path.join(BASE_DIR, "samples", "cycle_cassette.json")
+DEFAULT_RESULTS_PATH = "bench_results.jsonl"
+DEFAULT_TOLERANCE = 0.2  # relative slowdown reported as a regression
+MIN_COMPARABLE = 0.001  # seconds, faster stages are below timer noise
+LOCAL = "local"  # time spent in the scheduler itself, while no external call is in flight
+SIGNER_PUBLIC_KEY_VAR = 'SIGNER_PUBLIC_KEY_USING_MINDSHARE_ACCOUNT'
+
+
+class LatencyProfile:
+    """Latency injected per replayed interaction, the recorded one scaled or a fixed value per stage"""
+
+    def __init__(self, scale: float = 1.0, fixed: Optional[Dict[str, float]] = None):
+        self.scale = scale
+        self.fixed = fixed or {}
+
+    def delay(self, interaction) -> float:
+        if interaction.stage in self.fixed:
+            return self.fixed[interaction.stage]
+        return interaction.latency * self.scale
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"scale": self.scale, "fixed": self.fixed}
+
+
+@contextlib.contextmanager
+def patched(target, name: str, value):
+    """Replace an attribute of a module or instance for the duration of the block"""
+    had_own = name in vars(target)
+    original = vars(target).get(name)
+    setattr(target, name, value)
+    try:
+        yield
+    finally:
+        if had_own:
+            setattr(target, name, original)
+        else:
+            delattr(target, name)
+
+
+@contextlib.contextmanager
+def env_var(name: str, value: Optional[str]):
+    original = os.environ.get(name)
+    if value is not None:
+        os.environ[name] = value
+    try:
+        yield
+    finally:
+        if original is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = original
+
+
+def encode_process(result: subprocess.CompletedProcess) -> Dict[str, Any]:
+    return {"returncode": result.returncode, "stdout": result.stdout, "stderr": result.stderr}
+
+
+def decode_process(result: Dict[str, Any]) -> subprocess.CompletedProcess:
+    return subprocess.CompletedProcess([], result["returncode"], result["stdout"], result["stderr"])
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class CycleHarness:
+    """Runs MindshareScheduler.execute_agent with its external calls recorded to, or replayed from, a cassette"""
+
+    def __init__(self, scheduler: MindshareScheduler, cassette: Cassette, replay: bool = True,
+                 latency: Optional[LatencyProfile] = None):
+        self.scheduler = scheduler
+        self.cassette = cassette
+        self.replay = replay
+        self.latency = latency or LatencyProfile()
+        self._timings: Dict[str, List[float]] = {}
+        # Wall time with at least one external call in flight, stages overlap once pipelined
+        self._in_flight = 0
+        self._external_since = 0.0
+        self._external = 0.0
+        self._lock = threading.Lock()
+
+    def _started(self) -> float:
+        start = time.perf_counter()
+        with self._lock:
+            if self._in_flight == 0:
+                self._external_since = start
+            self._in_flight += 1
+        return start
+
+    def _elapsed(self, stage: str, start: float):
+        end = time.perf_counter()
+        with self._lock:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self._external += end - self._external_since
+            self._timings.setdefault(stage, []).append(end - start)
+
+    def _sync_stage(self, stage: str, real: Callable, encode: Callable = None, decode: Callable = None):
+        def call(*args, **kwargs):
+            start = self._started()
+            try:
+                if self.replay:
+                    interaction = self.cassette.next(stage)
+                    time.sleep(self.latency.delay(interaction))
+                    return decode(interaction.result) if decode else interaction.result
+                result = real(*args, **kwargs)
+                self.cassette.add(stage, encode(result) if encode else result, time.perf_counter() - start)
+                return result
+            finally:
+                self._elapsed(stage, start)
+        return call
+
+    def _async_stage(self, stage: str, real: Callable):
+        async def call(*args, **kwargs):
+            start = self._started()
+            try:
+                if self.replay:
+                    interaction = self.cassette.next(stage)
+                    await asyncio.sleep(self.latency.delay(interaction))
+                    return interaction.result
+                result = await real(*args, **kwargs)
+                self.cassette.add(stage, result, time.perf_counter() - start)
+                return result
+            finally:
+                self._elapsed(stage, start)
+        return call
+
+    @staticmethod
+    async def _no_balances():
+        return None
+
+    def _intercept(self, stack: contextlib.ExitStack):
+        scheduler = self.scheduler
+        contract = scheduler.sign_contract
+        stack.enter_context(patched(scheduler, 'run_agent_process', self._sync_stage(
+            AGENT, scheduler.run_agent_process, encode_process, decode_process
+        )))
+        stack.enter_context(patched(generate_quote, 'fetch_options', self._sync_stage(
+            SOLVER_QUOTE, generate_quote.fetch_options
+        )))
+        stack.enter_context(patched(scheduler.publisher, 'publish', self._async_stage(
+            SOLVER_PUBLISH, scheduler.publisher.publish
+        )))
+        stack.enter_context(patched(contract, 'sign_quote', self._async_stage(SIGN_TRADE, contract.sign_quote)))
+        stack.enter_context(patched(contract, 'generate_payload', self._async_stage(
+            GENERATE_PAYLOAD, contract.generate_payload
+        )))
+        if self.replay:
+            stack.enter_context(env_var(SIGNER_PUBLIC_KEY_VAR, self.cassette.meta.get('signer_public_key')))
+            # The recorded agent run read the balances itself, replaying it needs no RPC
+            stack.enter_context(patched(scheduler, 'read_balances', self._no_balances))
+
+    async def run_cycle(self) -> Dict[str, Any]:
+        """Run one cycle and return its total duration and the time spent in every stage"""
+        self._timings = {}
+        self._in_flight, self._external = 0, 0.0
+        self.cassette.rewind()
+        with contextlib.ExitStack() as stack:
+            self._intercept(stack)
+            start = time.perf_counter()
+            await self.scheduler.execute_agent()
+            total = time.perf_counter() - start
+
+        stages = {stage: self._timings.get(stage, []) for stage in STAGES}
+        stages[LOCAL] = [total - self._external]
+        return {"total": total, "stages": stages}
+
+
+def summarize(runs: List[Dict[str, Any]], cassette_path: str, latency: LatencyProfile) -> Dict[str, Any]:
+    totals = [run["total"] for run in runs]
+    stages = {}
+    for stage in STAGES + [LOCAL]:
+        per_run = [sum(run["stages"][stage]) for run in runs]
+        stages[stage] = {
+            "calls": len(runs[0]["stages"][stage]) if runs else 0,
+            "p50": statistics.median(per_run) if per_run else None,
+            "max": max(per_run) if per_run else None,
+        }
+    return {
+        "timestamp": time.time(),
+        "cassette": os.path.basename(cassette_path),
+        "latency": latency.to_dict(),
+        "runs": len(runs),
+        "total": {
+            "p50": statistics.median(totals) if totals else None,
+            "p90": percentile(totals, 0.9),
+            "max": max(totals) if totals else None,
+        },
+        "stages": stages,
+    }
+
+
+class BenchmarkStore:
+    """Benchmark summaries appended to a JSONL file, each compared with the last run under the same settings"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv('BENCH_RESULTS_PATH', DEFAULT_RESULTS_PATH)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        if not os.path.isfile(self.path):
+            return []
+        with open(self.path, 'r') as file:
+            return [json.loads(line) for line in file if line.strip()]
+
+    def baseline(self, summary: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        for entry in reversed(self.entries()):
+            if entry.get("cassette") == summary["cassette"] and entry.get("latency") == summary["latency"]:
+                return entry
+        return None
+
+    def append(self, summary: Dict[str, Any]):
+        with open(self.path, 'a') as file:
+            file.write(json.dumps(summary) + "\n")
+
+    def compare(self, summary: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+        """Describe every p50 that got slower than the baseline by more than the tolerance"""
+        baseline = self.baseline(summary)
+        if baseline is None:
+            return []
+
+        checks = [("total", baseline["total"]["p50"], summary["total"]["p50"])]
+        for stage, stats in summary["stages"].items():
+            previous = baseline.get("stages", {}).get(stage)
+            if previous is not None:
+                checks.append((stage, previous["p50"], stats["p50"]))
+
+        regressions = []
+        for name, before, after in checks:
+            if before is None or after is None or before < MIN_COMPARABLE:
+                continue
+            if after > before * (1 + tolerance):
+                regressions.append(f"{name}: p50 {before:.4f}s -> {after:.4f}s (+{(after / before - 1) * 100:.0f}%)")
+        return regressions
+
+
+def serialize_stages(scheduler: MindshareScheduler):
+    """One worker per pipeline stage, cassettes pair interactions by call order so that order must not vary"""
+    scheduler.pipeline_concurrency = dict.fromkeys(scheduler.pipeline_concurrency, 1)
+
+
+def replay_scheduler() -> MindshareScheduler:
+    """Scheduler wired for replay, no account setup since every contract call comes from the cassette"""
+    scheduler = MindshareScheduler(interval=0)
+    scheduler.sign_contract = SignIntentContract(worker_public_key=None)
+    serialize_stages(scheduler)
+    return scheduler
+
+
+async def replay(cassette_path: str = SAMPLE_CASSETTE_PATH, runs: int = 3,
+                 latency: Optional[LatencyProfile] = None, quiet: bool = True) -> Dict[str, Any]:
+    latency = latency or LatencyProfile()
+    harness = CycleHarness(replay_scheduler(), Cassette.load(cassette_path), replay=True, latency=latency)
+    results = []
+    for _ in range(runs):
+        output = io.StringIO() if quiet else None
+        with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+            results.append(await harness.run_cycle())
+    return summarize(results, cassette_path, latency)
+
+
+async def record(cassette_path: str) -> Cassette:
+    """Set up a real worker, run one cycle against the live services and save what it exchanged"""
+    scheduler = MindshareScheduler()
+    await scheduler.setup()
+    # Replays drive sign_quote, which waits for sign_trade in line instead of through the tracker
+    if scheduler.tx_tracker is not None:
+        await scheduler.tx_tracker.stop()
+        scheduler.tx_tracker = None
+    serialize_stages(scheduler)
+
+    cassette = Cassette(meta={
+        "network": scheduler.network,
+        "signer_public_key": os.getenv(SIGNER_PUBLIC_KEY_VAR),
+    })
+    harness = CycleHarness(scheduler, cassette, replay=False)
+    result = await harness.run_cycle()
+    cassette.meta["recorded_total"] = result["total"]
+    cassette.save(cassette_path)
+    print(f"[LOG] Recorded {len(cassette.interactions)} interactions to {cassette_path}")
+    return cassette
+
+
+def parse_fixed_latency(values: List[str]) -> Dict[str, float]:
+    fixed = {}
+    for value in values or []:
+        stage, _, seconds = value.partition('=')
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage {stage}, expected one of {', '.join(STAGES)}")
+        fixed[stage] = float(seconds)
+    return fixed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay a rebalancing cycle and benchmark it")
+    parser.add_argument("mode", choices=["replay", "record"], nargs="?", default="replay")
+    parser.add_argument("--cassette", default=SAMPLE_CASSETTE_PATH)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier of the recorded latencies")
+    parser.add_argument("--latency", action="append", metavar="STAGE=SECONDS", help="fixed latency of a stage")
+    parser.add_argument("--results", default=None, help="JSONL file keeping every run, defaults to BENCH_RESULTS_PATH")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--no-store", action="store_true", help="compare without appending the result")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show the scheduler output of each run")
+    args = parser.parse_args()
+
+    if args.mode == "record":
+        asyncio.run(record(args.cassette))
+        return
+
+    latency = LatencyProfile(args.latency_scale, parse_fixed_latency(args.latency))
+    summary = asyncio.run(replay(args.cassette, args.runs, latency, quiet=not args.verbose))
+    print(json.dumps(summary, indent=2))
+
+    store = BenchmarkStore(args.results)
+    regressions = store.compare(summary, args.tolerance)
+    if not args.no_store:
+        store.append(summary)
+
+    for regression in regressions:
+        print(f"[LOG] Regression {regression}")
+    if regressions and args.fail_on_regression:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
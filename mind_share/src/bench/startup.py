@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from typing import Any, Dict, List, Optional
+from src.constants import BASE_DIR
+
+ENTRYPOINT = "src.scheduler.scheduler"
+DEFAULT_BUDGET_MS = 400
+# Libraries only some paths need, the entrypoint must not pay for them at import
+DEFERRED_MODULES = ["py_near", "near_api", "eth_keys", "eth_utils", "ecdsa", "coincurve", "requests", "httpx", "pydantic"]
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Entries of python -X importtime as dicts with self and cumulative microseconds and nesting depth"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+    return entries
+
+
+def _run(code: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    return subprocess.run(command, capture_output=True, text=True, cwd=BASE_DIR, check=True)
+
+
+def profile_import(module: str = ENTRYPOINT) -> Dict[str, Any]:
+    """Import a module in a fresh interpreter and return its import time and heaviest direct imports"""
+    start = time.perf_counter()
+    result = _run(f"import {module}", importtime=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    entries = parse_importtime(result.stderr)
+    index = max(i for i, entry in enumerate(entries) if entry["module"] == module)
+    target = entries[index]
+
+    # importtime lists the imports of a module right before the module itself
+    children = []
+    for entry in reversed(entries[:index]):
+        if entry["depth"] <= target["depth"]:
+            break
+        if entry["depth"] == target["depth"] + 1:
+            children.append(entry)
+    heaviest = sorted(children, key=lambda entry: entry["cumulative_us"], reverse=True)[:10]
+    return {
+        "import_ms": target["cumulative_us"] / 1000,
+        "process_ms": wall_ms,
+        "heaviest": [{"module": entry["module"], "ms": entry["cumulative_us"] / 1000} for entry in heaviest],
+    }
+
+
+def eagerly_loaded(module: str = ENTRYPOINT, deferred: Optional[List[str]] = None) -> List[str]:
+    """Deferred libraries that importing the module loads anyway"""
+    deferred = deferred or DEFERRED_MODULES
+    result = _run(f"import sys, json, {module}; print(json.dumps([m for m in {deferred!r} if m in sys.modules]))")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def check_startup(runs: int = 5, budget_ms: float = None, module: str = ENTRYPOINT) -> Dict[str, Any]:
+    budget_ms = budget_ms if budget_ms is not None else float(os.getenv('STARTUP_BUDGET_MS', DEFAULT_BUDGET_MS))
+    profiles = [profile_import(module) for _ in range(runs)]
+    import_ms = statistics.median(profile["import_ms"] for profile in profiles)
+    eager = eagerly_loaded(module)
+
+    problems = []
+    if import_ms > budget_ms:
+        problems.append(f"import of {module} took {import_ms:.0f}ms, budget is {budget_ms:.0f}ms")
+    if eager:
+        problems.append(f"{module} loads deferred libraries at import: {', '.join(eager)}")
+
+    return {
+        "module": module,
+        "runs": runs,
+        "import_ms_p50": import_ms,
+        "process_ms_p50": statistics.median(profile["process_ms"] for profile in profiles),
+        "budget_ms": budget_ms,
+        "heaviest": profiles[-1]["heaviest"],
+        "eagerly_loaded": eager,
+        "problems": problems,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the scheduler cold start and check it against a budget")
+    parser.add_argument("--module", default=ENTRYPOINT)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=None, help="defaults to STARTUP_BUDGET_MS")
+    args = parser.parse_args()
+
+    report = check_startup(args.runs, args.budget_ms, args.module)
+    print(json.dumps(report, indent=2))
+    for problem in report["problems"]:
+        print(f"[ERROR] {problem}")
+    if report["problems"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
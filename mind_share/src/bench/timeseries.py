@@ -0,0 +1,45 @@
+import argparse
+import json
+import tempfile
+import timeit
+
+import numpy as np
+
+from typing import Any, Dict
+from src.timeseries.store import MINDSHARE, TimeSeriesStore
+
+HOUR = 3600
+
+
+def run(days: int = 180, repeat: int = 2000) -> Dict[str, Any]:
+    """Append hourly mindshare for a token over days, then time windowed reads on the memory map"""
+    with tempfile.TemporaryDirectory() as root:
+        series = TimeSeriesStore(root).series(MINDSHARE, "NEAR")
+        timestamps = np.arange(days * 24) * HOUR
+        appended = timeit.timeit(lambda: series.append(timestamps, np.random.default_rng(0).random(len(timestamps))), number=1)
+        end = int(timestamps[-1])
+
+        def time_us(call) -> float:
+            return round(timeit.timeit(call, number=repeat) / repeat * 1e6, 2)
+
+        return {
+            "observations": len(series),
+            "append_s": round(appended, 4),
+            "latest_us": time_us(series.latest),
+            "at_us": time_us(lambda: series.at(end // 2)),
+            "rolling_mean_24h_us": time_us(lambda: series.rolling_mean(24 * HOUR, end)),
+            "rolling_mean_30d_us": time_us(lambda: series.rolling_mean(30 * 24 * HOUR, end)),
+            "delta_7d_us": time_us(lambda: series.delta(7 * 24 * HOUR, end)),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time appends and windowed reads of the time-series store")
+    parser.add_argument("--days", type=int, default=180, help="days of hourly observations")
+    parser.add_argument("--repeat", type=int, default=2000, help="reads timed per query")
+    args = parser.parse_args()
+    print(json.dumps(run(args.days, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
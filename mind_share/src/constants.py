@@ -3,6 +3,21 @@ import os
 # Path constants
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 AGENT_PATH = os.path.join(BASE_DIR, "src", "agent")
+SEALED_IDENTITY_PATH = "/data/worker_identity.sealed"
+WORKER_POOL_PATH = "/data/worker_pool.db"
+
+# NEAR RPC endpoints, ranked at runtime by src/rpc/endpoints.py
+RPC_ENDPOINTS = {
+    'mainnet': [
+        'https://rpc.mainnet.near.org',
+        'https://free.rpc.fastnear.com',
+        'https://near.lava.build',
+    ],
+    'testnet': [
+        'https://rpc.testnet.near.org',
+        'https://test.rpc.fastnear.com',
+    ],
+}
 
 ## List of tokens to be used in the agent
 # NEAR: NEAR
@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import os
+import time
+
+import base58
+
+from nacl.signing import SigningKey
+from typing import Any, Dict, List, Optional
+from py_near import transactions
+from src.rpc.client import serialize_args
+from src.rpc.endpoints import InvalidNonceError
+from src.telemetry import log
+
+FUNCTION_CALL_SCOPE = "function_call"
+FULL_ACCESS_SCOPE = "full_access"
+DEFAULT_METHOD_NAMES = ["sign_trade", "register_worker"]
+ACCESS_KEY_ALLOWANCE = 250000000000000000000000  # 0.25 NEAR of gas per key
+BLOCK_HASH_TTL = 50  # seconds, transactions must reference a recent block
+
+
+class ManagedKey:
+    """One access key of the worker account with its locally tracked nonce"""
+
+    def __init__(self, seed: bytes):
+        signing_key = SigningKey(seed)
+        self.secret_key = signing_key.encode() + signing_key.verify_key.encode()
+        self.public_key = "ed25519:" + base58.b58encode(signing_key.verify_key.encode()).decode('utf-8')
+        self.nonce: Optional[int] = None
+        self.lock = None
+
+    def next_nonce(self) -> int:
+        self.nonce += 1
+        return self.nonce
+
+
+class AccessKeyManager:
+    """Spreads contract calls across several access keys so they can be signed and broadcast in parallel"""
+
+    def __init__(self, account, contract_id: str = None, size: int = None, scope: str = None, method_names: List[str] = None):
+        self.account = account
+        self.contract_id = contract_id or os.getenv('SIGN_INTENT_CONTRACT')
+        self.size = size if size is not None else int(os.getenv('SIGNING_ACCESS_KEYS', '4'))
+        # Full access by default, NEAR rejects the sign_trade deposit on function call keys
+        self.scope = scope or os.getenv('SIGNING_ACCESS_KEY_SCOPE', FULL_ACCESS_SCOPE)
+        self.method_names = method_names or DEFAULT_METHOD_NAMES
+        self.keys: List[ManagedKey] = []
+        self._next = 0
+        self._block_hash = None
+        self._block_hash_ts = 0
+
+    def _derive_keys(self) -> List[ManagedKey]:
+        # Keys are derived from the account key, so restarts find the keys they added last time
+        primary = self.account.signer
+        return [
+            ManagedKey(hashlib.sha256(primary + f"{self.contract_id}:{index}".encode('utf-8')).digest())
+            for index in range(self.size)
+        ]
+
+    async def provision(self):
+        """Add the missing access keys in a single transaction and load the nonce of every key"""
+        provider = self.account.provider
+        keys = self._derive_keys()
+
+        existing = await provider.get_access_key_list(self.account.account_id)
+        existing_keys = {key['public_key'] for key in existing.get('keys', [])}
+        missing = [key for key in keys if key.public_key not in existing_keys]
+
+        if missing:
+            if self.scope == FULL_ACCESS_SCOPE:
+                actions = [transactions.create_full_access_key_action(key.public_key) for key in missing]
+            else:
+                actions = [
+                    transactions.create_function_call_access_key_action(
+                        key.public_key, ACCESS_KEY_ALLOWANCE, self.contract_id, self.method_names
+                    )
+                    for key in missing
+                ]
+            log.info("access_keys.add", f"Adding {len(missing)} {self.scope} access keys for {self.contract_id}",
+                     keys=len(missing), scope=self.scope)
+            await self.account.sign_and_submit_tx(self.account.account_id, actions)
+
+        await asyncio.gather(*(self._sync_nonce(key) for key in keys))
+        for key in keys:
+            key.lock = asyncio.Lock()
+        self.keys = keys
+        log.info("access_keys.ready", f"Access key manager ready with {len(self.keys)} keys", keys=len(self.keys), scope=self.scope)
+        if self.scope != FULL_ACCESS_SCOPE:
+            log.warning("access_keys.no_deposit", "Function call keys cannot attach the sign_trade deposit, it stays on the account key")
+
+    async def _sync_nonce(self, key: ManagedKey):
+        result = await self.account.provider.get_access_key(self.account.account_id, key.public_key)
+        if "error" in result:
+            raise ValueError(result["error"])
+        key.nonce = result["nonce"]
+
+    async def _get_block_hash(self) -> bytes:
+        if self._block_hash is None or self._block_hash_ts + BLOCK_HASH_TTL < time.time():
+            status = await self.account.provider.get_status()
+            self._block_hash = base58.b58decode(status["sync_info"]["latest_block_hash"])
+            self._block_hash_ts = time.time()
+        return self._block_hash
+
+    def _select_key(self) -> ManagedKey:
+        """Round-robin over the keys, preferring one that has no call in flight"""
+        count = len(self.keys)
+        for offset in range(count):
+            key = self.keys[(self._next + offset) % count]
+            if not key.lock.locked():
+                self._next = (self._next + offset + 1) % count
+                return key
+        key = self.keys[self._next]
+        self._next = (self._next + 1) % count
+        return key
+
+    def can_sign(self, amount: int = 0) -> bool:
+        # NEAR rejects attached deposits on function call access keys
+        return bool(self.keys) and (amount == 0 or self.scope == FULL_ACCESS_SCOPE)
+
+    async def function_call(self, method_name: str, args: Dict[str, Any], gas: int, amount: int = 0, nowait: bool = False):
+        """Call the contract with the next free key, falls back to the account key when the managed keys cannot sign"""
+        if not self.can_sign(amount):
+            return await self.account.function_call(self.contract_id, method_name, args, gas=gas, amount=amount, nowait=nowait)
+
+        key = self._select_key()
+        actions = [
+            transactions.create_function_call_action(
+                method_name, serialize_args(args), gas, amount
+            )
+        ]
+
+        # The lock keeps nonces of one key reaching the pool in order
+        async with key.lock:
+            block_hash = await self._get_block_hash()
+            nonce = key.next_nonce()
+            serialized_tx = transactions.sign_and_serialize_transaction(
+                self.account.account_id, key.secret_key, self.contract_id, nonce, actions, block_hash
+            )
+            trx_hash = transactions.calc_trx_hash(
+                self.account.account_id, key.secret_key, self.contract_id, nonce, actions, block_hash
+            )
+            try:
+                if nowait:
+                    return await self.account.provider.send_tx(serialized_tx)
+                return await self.account.provider.send_tx_and_wait(
+                    serialized_tx, trx_hash=trx_hash, receiver_id=self.contract_id
+                )
+            except InvalidNonceError:
+                log.warning("access_keys.nonce_resync", f"Nonce out of sync for {key.public_key}, reloading it", public_key=key.public_key)
+                await self._sync_nonce(key)
+                raise
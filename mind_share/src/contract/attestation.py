@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from datetime import datetime
+from typing import Dict, Any, Optional
+from src.constants import BASE_DIR
+
+PROOF_UPLOAD_URL = "https://proof.t16z.com/api/upload"
+DEFAULT_COLLATERAL_TTL = 6 * 60 * 60  # seconds
+SAMPLE_COLLATERAL_PATH = os.path.join(BASE_DIR, "samples", "quote_collateral.json")
+
+
+def quote_hash(quote_hex: str) -> str:
+    """Return the sha256 hex digest of a hex encoded quote"""
+    return hashlib.sha256(bytes.fromhex(quote_hex)).hexdigest()
+
+
+def collateral_expiry(collateral: Dict[str, Any]) -> Optional[float]:
+    """Earliest nextUpdate of the TCB info and QE identity in a quote collateral, as a unix timestamp"""
+    expiries = []
+    for field in ('tcb_info', 'qe_identity'):
+        value = collateral.get(field)
+        if not value:
+            continue
+        try:
+            parsed = json.loads(value) if isinstance(value, str) else value
+            next_update = parsed['nextUpdate'].replace('Z', '+00:00')
+            expiries.append(datetime.fromisoformat(next_update).timestamp())
+        except (ValueError, KeyError, TypeError):
+            continue
+    return min(expiries) if expiries else None
+
+
+class CollateralCache:
+    """In-memory cache of verifier checksum and collateral keyed by quote hash"""
+
+    def __init__(self, ttl: float = DEFAULT_COLLATERAL_TTL, clock=time.time):
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, quote_hex: str) -> Optional[Dict[str, Any]]:
+        """Return the cached artifacts for a quote, or None if missing or expired"""
+        key = quote_hash(quote_hex)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry['expires_at'] <= self.clock():
+            del self._entries[key]
+            return None
+        return entry
+
+    def put(self, quote_hex: str, checksum: str, collateral: Dict[str, Any], expires: bool = True) -> Dict[str, Any]:
+        """Store artifacts for a quote until the TTL or the collateral nextUpdate, whichever comes first"""
+        expires_at = self.clock() + self.ttl
+        next_update = collateral_expiry(collateral) if expires else None
+        if next_update is not None:
+            expires_at = min(expires_at, next_update)
+
+        entry = {
+            "checksum": checksum,
+            "collateral": collateral,
+            "expires_at": expires_at,
+        }
+        self._entries[quote_hash(quote_hex)] = entry
+        return entry
+
+    def invalidate(self, quote_hex: Optional[str] = None):
+        """Drop one quote from the cache, or everything if no quote is given"""
+        if quote_hex is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(quote_hash(quote_hex), None)
+
+
+class ProofVerifier:
+    """Uploads a quote to proof.t16z.com to obtain its checksum and collateral"""
+
+    # Cached artifacts and registrations must be renewed at the collateral nextUpdate
+    collateral_expires = True
+
+    def __init__(self, url: Optional[str] = None):
+        self.url = url or os.getenv('QUOTE_VERIFIER_URL', PROOF_UPLOAD_URL)
+
+    async def upload(self, quote_hex: str) -> Dict[str, Any]:
+        import httpx
+
+        files = {
+            'hex': (None, quote_hex, 'text/plain')  # (filename, data, content_type)
+        }
+
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                self.url,
+                files=files,
+                headers={'Accept': 'application/json'}
+            )
+            response.raise_for_status()
+            res_data = response.json()
+
+        return {
+            "checksum": res_data['checksum'],
+            "collateral": res_data['quote_collateral'],
+        }
+
+
+class LocalProofVerifier:
+    """Stand-in verifier that answers with the sample collateral, for tests and local runs"""
+
+    # The sample collateral is long past its nextUpdate, only the TTL applies
+    collateral_expires = False
+
+    def __init__(self, collateral: Optional[Dict[str, Any]] = None, delay: float = 0.0):
+        if collateral is None:
+            with open(SAMPLE_COLLATERAL_PATH, 'r') as file:
+                collateral = json.load(file)
+        self.collateral = collateral
+        self.delay = delay
+        self.uploads = 0
+
+    async def upload(self, quote_hex: str) -> Dict[str, Any]:
+        self.uploads += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return {
+            "checksum": quote_hash(quote_hex),
+            "collateral": self.collateral,
+        }
+
+
+def get_verifier():
+    """Return the stand-in verifier if USE_LOCAL_VERIFIER is set, the remote one otherwise"""
+    if os.getenv('USE_LOCAL_VERIFIER', 'false').lower() == 'true':
+        return LocalProofVerifier()
+    return ProofVerifier()
@@ -0,0 +1,68 @@
+import argparse
+import os
+
+import base58
+
+from typing import Any, Dict, Optional
+
+
+class LocalSigner:
+    """secp256k1 key answering like the MPC contract, generate_payload's hash and sign_trade's big_r, s and recovery_id"""
+
+    def __init__(self, private_key):
+        self.private_key = private_key
+        self.signatures = 0
+
+    @classmethod
+    def from_hex(cls, private_key_hex: str) -> "LocalSigner":
+        from eth_keys import keys
+
+        return cls(keys.PrivateKey(bytes.fromhex(private_key_hex.removeprefix('0x'))))
+
+    @classmethod
+    def from_seed(cls, seed: bytes) -> "LocalSigner":
+        """Deterministic key of a seed, the same signer on every run"""
+        from eth_keys import keys
+        from eth_utils import keccak
+
+        return cls(keys.PrivateKey(keccak(seed)))
+
+    @classmethod
+    def from_env(cls) -> Optional["LocalSigner"]:
+        """Signer of DRY_RUN_SIGNER_KEY, None outside dry runs"""
+        private_key_hex = os.getenv('DRY_RUN_SIGNER_KEY')
+        return cls.from_hex(private_key_hex) if private_key_hex else None
+
+    @property
+    def public_key(self) -> str:
+        """In the format of SIGNER_PUBLIC_KEY_USING_MINDSHARE_ACCOUNT"""
+        return "secp256k1:" + base58.b58encode(self.private_key.public_key.to_bytes()).decode('utf-8')
+
+    def payload(self, message: bytes) -> bytes:
+        """What generate_payload returns for the message"""
+        from eth_utils import keccak
+
+        return keccak(message)
+
+    def sign(self, message: bytes) -> Dict[str, Any]:
+        """Signature of the message's payload in the shape sign_trade returns it"""
+        signature = self.private_key.sign_msg_hash(self.payload(message))
+        self.signatures += 1
+        return {
+            "big_r": {"affine_point": "02" + format(signature.r, '064X')},
+            "s": {"scalar": format(signature.s, '064X')},
+            "recovery_id": signature.v,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print a dry run signer key and the public key that verifies it")
+    parser.add_argument("--key", help="existing private key in hex, a new one when omitted")
+    args = parser.parse_args()
+    signer = LocalSigner.from_hex(args.key or os.urandom(32).hex())
+    print(f"DRY_RUN_SIGNER_KEY={signer.private_key.to_hex()[2:]}")
+    print(f"SIGNER_PUBLIC_KEY_USING_MINDSHARE_ACCOUNT={signer.public_key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import base64
+import json
+import os
+import struct
+
+from typing import Any, Dict, Tuple, Union
+
+JSON = "json"
+BASE64 = "base64"
+BORSH = "borsh"
+ARGS_ENCODINGS = (JSON, BASE64, BORSH)
+
+# Contract methods taking one byte string, and the field holding it in their JSON args
+BYTE_ARGS = {"generate_payload": "data", "sign_trade": "quote"}
+
+
+def borsh_bytes(data: bytes) -> bytes:
+    """Borsh form of a Vec<u8> or String: little endian u32 length, then the bytes"""
+    return struct.pack('<I', len(data)) + data
+
+
+def read_borsh_bytes(raw: bytes) -> bytes:
+    (length,) = struct.unpack_from('<I', raw)
+    if len(raw) != 4 + length:
+        raise ValueError(f"Borsh bytes of length {length} in {len(raw)} bytes of args")
+    return raw[4:]
+
+
+class ArgsEncoding:
+    """Wire form of the generate_payload and sign_trade arguments, the contract exposes one method per encoding"""
+
+    def __init__(self, name: str = JSON):
+        if name not in ARGS_ENCODINGS:
+            raise ValueError(f"Unknown contract args encoding {name}, expected one of {ARGS_ENCODINGS}")
+        self.name = name
+
+    @classmethod
+    def from_env(cls) -> "ArgsEncoding":
+        return cls(os.getenv('CONTRACT_ARGS_ENCODING', JSON).lower())
+
+    def method(self, method_name: str) -> str:
+        """Contract method taking the args of this encoding, generate_payload_borsh for instance"""
+        if self.name == JSON or method_name not in BYTE_ARGS:
+            return method_name
+        return f"{method_name}_{self.name}"
+
+    def encode(self, method_name: str, data: bytes) -> Union[Dict[str, Any], bytes]:
+        """Args of a byte string method, a dict sent as compact JSON or raw Borsh bytes"""
+        field = BYTE_ARGS[method_name]
+        if self.name == BORSH:
+            return borsh_bytes(data)
+        if self.name == BASE64:
+            return {field: base64.b64encode(data).decode('utf-8')}
+        # The original forms: the payload message as an array of byte values, the quote as a string
+        return {field: list(data) if method_name == "generate_payload" else data.decode('utf-8')}
+
+
+def decode_call(method_name: str, raw: bytes) -> Tuple[str, Dict[str, Any]]:
+    """Contract side of the encodings: the base method and its JSON args, whatever encoding the call used"""
+    for name in (BASE64, BORSH):
+        suffix = f"_{name}"
+        base = method_name[:-len(suffix)]
+        if not method_name.endswith(suffix) or base not in BYTE_ARGS:
+            continue
+        if name == BORSH:
+            data = read_borsh_bytes(raw)
+        else:
+            data = base64.b64decode(json.loads(raw)[BYTE_ARGS[base]])
+        return base, ArgsEncoding(JSON).encode(base, data)
+    return method_name, json.loads(raw or b"{}")
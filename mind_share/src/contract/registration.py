@@ -0,0 +1,128 @@
+import json
+import os
+import time
+
+from typing import Any, Dict, Optional
+from src.contract.attestation import collateral_expiry, quote_hash
+from src.telemetry import log
+
+DEFAULT_REGISTRATION_TTL = 24 * 60 * 60  # seconds a known registration is trusted without asking the contract
+DEFAULT_REFRESH_MARGIN = 10 * 60  # seconds before expiry the registration is checked again
+
+NOT_REGISTERED_MARKERS = ("worker not found", "option::unwrap()")
+
+
+def is_not_registered_error(error) -> bool:
+    """get_worker panics when the account is unknown, the panic text is the only signal the contract gives"""
+    message = str(error).lower()
+    return any(marker in message for marker in NOT_REGISTERED_MARKERS)
+
+
+class RegistrationState:
+    """Registration of one worker account in the sign intent contract"""
+
+    def __init__(self, account_id: str, contract_id: str, registered_at: float, expires_at: float,
+                 quote_hash: Optional[str] = None, checksum: Optional[str] = None):
+        self.account_id = account_id
+        self.contract_id = contract_id
+        self.registered_at = registered_at
+        self.expires_at = expires_at
+        self.quote_hash = quote_hash
+        self.checksum = checksum
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "account_id": self.account_id,
+            "contract_id": self.contract_id,
+            "registered_at": self.registered_at,
+            "expires_at": self.expires_at,
+            "quote_hash": self.quote_hash,
+            "checksum": self.checksum,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RegistrationState":
+        return cls(
+            data['account_id'],
+            data['contract_id'],
+            data['registered_at'],
+            data['expires_at'],
+            data.get('quote_hash'),
+            data.get('checksum'),
+        )
+
+
+class RegistrationTracker:
+    """Remembers worker registrations so get_worker is only asked when the state is unknown or about to expire"""
+
+    def __init__(self, contract_id: str, ttl: float = None, refresh_margin: float = DEFAULT_REFRESH_MARGIN,
+                 path: Optional[str] = None, clock=time.time):
+        self.contract_id = contract_id
+        self.ttl = ttl if ttl is not None else int(os.getenv('REGISTRATION_TTL', str(DEFAULT_REGISTRATION_TTL)))
+        self.refresh_margin = refresh_margin
+        self.path = path or os.getenv('REGISTRATION_STATE_PATH')
+        self.clock = clock
+        self._states: Dict[str, RegistrationState] = {}
+        self._load()
+
+    def get(self, account_id: str) -> Optional[RegistrationState]:
+        """Known registration of an account, None if unknown or expired"""
+        state = self._states.get(account_id)
+        if state is None or state.contract_id != self.contract_id:
+            return None
+        if state.expires_at <= self.clock():
+            self.forget(account_id)
+            return None
+        return state
+
+    def is_registered(self, account_id: str) -> bool:
+        return self.get(account_id) is not None
+
+    def needs_refresh(self, account_id: str) -> bool:
+        """True when the state is unknown or expires within the refresh margin"""
+        state = self.get(account_id)
+        return state is None or state.expires_at - self.refresh_margin <= self.clock()
+
+    def record(self, account_id: str, quote_hex: Optional[str] = None, checksum: Optional[str] = None,
+               collateral: Optional[Dict[str, Any]] = None) -> RegistrationState:
+        """Remember a registration, it expires after the TTL or when its collateral must be updated"""
+        now = self.clock()
+        expires_at = now + self.ttl
+        if collateral:
+            next_update = collateral_expiry(collateral)
+            if next_update is not None:
+                expires_at = min(expires_at, next_update)
+
+        previous = self._states.get(account_id)
+        if quote_hex is None and previous is not None and previous.contract_id == self.contract_id:
+            # Confirmed by get_worker, the attestation details of the last registration still apply
+            state = RegistrationState(account_id, self.contract_id, previous.registered_at, expires_at,
+                                      previous.quote_hash, previous.checksum)
+        else:
+            state = RegistrationState(account_id, self.contract_id, now, expires_at,
+                                      quote_hash(quote_hex) if quote_hex else None, checksum)
+        self._states[account_id] = state
+        self._save()
+        return state
+
+    def forget(self, account_id: str):
+        if self._states.pop(account_id, None) is not None:
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        with open(self.path, 'w') as file:
+            json.dump([state.to_dict() for state in self._states.values()], file)
+
+    def _load(self):
+        if not self.path or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, 'r') as file:
+                entries = json.load(file)
+            for entry in entries:
+                state = RegistrationState.from_dict(entry)
+                self._states[state.account_id] = state
+        except (OSError, ValueError, KeyError) as e:
+            log.warning("registration.unreadable_state", f"Ignoring unreadable registration state file {self.path}: {str(e)}")
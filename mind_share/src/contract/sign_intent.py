@@ -1,21 +1,27 @@
 import asyncio
 import os
 import json
-import base58
-import re
 import base64
 import random 
-import httpx
-import datetime
-import traceback
-
-from py_near.account import Account
-from typing import Dict, Any
-from src.worker.keypair import AgentWorker
-from eth_utils import keccak
-from src.tappd.tappd import AsyncTappdClient
+
+from typing import Dict, Any, Union
+from src.tappd.quote import validate_quote
+from src.contract.attestation import CollateralCache, get_verifier
+from src.contract.dry_run import LocalSigner
+from src.contract.encoding import ArgsEncoding
+from src.contract.registration import RegistrationTracker, is_not_registered_error
+from src.quote.serializer import erc191_message
+from src.rpc.client import get_rpc_client, serialize_args
+from src.rpc.view_cache import ViewCallCache
+from src.telemetry import log
+from src.telemetry.tracing import get_tracer
 from dotenv import load_dotenv
 
+SIGN_TRADE_DEPOSIT = 1000000000000000000000
+SIGN_TRADE_GAS = 300000000000000
+GET_WORKER_CACHE_TTL = 30  # seconds
+PAYLOAD_CACHE_TTL = 600  # seconds
+
 class SignIntentContract:
     def __init__(self, worker_public_key: str, worker_account_id: str = None, worker_signing_key: str = None, worker_account=None):
         load_dotenv()
@@ -24,7 +30,20 @@ class SignIntentContract:
         self.contract_id = os.getenv('SIGN_INTENT_CONTRACT')
         self.use_static_account = os.getenv('USE_STATIC_ACCOUNT', 'false').lower() == 'true'
         self._is_initialized = False
+        self.verifier = get_verifier()
+        self.collateral_cache = CollateralCache()
+        self._attestation = None
+        self.key_manager = None
+        self.registration = RegistrationTracker(self.contract_id)
+        self.args_encoding = ArgsEncoding.from_env()
+        # Set by DRY_RUN_SIGNER_KEY, answers sign_trade and generate_payload locally without gas or MPC
+        self.dry_run = LocalSigner.from_env()
                 
+    @property
+    def view_cache(self) -> ViewCallCache:
+        """View cache of the shared RPC client, whose responses tell it when a block has passed"""
+        return get_rpc_client(os.getenv('NETWORK')).view_cache
+
     async def startup(self):
         """Initialize contract if not already initialized"""
         try:
@@ -34,41 +53,110 @@ class SignIntentContract:
             if self.worker_account is None:
                 raise ValueError("Worker account not provided")
                 
-            print("Contract ready to operate!")
+            if self.dry_run is not None:
+                log.warning("contract.dry_run", f"Dry run, {self.contract_id} is never called and quotes are signed locally",
+                            public_key=self.dry_run.public_key)
+                if os.getenv('SIGNER_PUBLIC_KEY_USING_MINDSHARE_ACCOUNT') != self.dry_run.public_key:
+                    log.warning("contract.dry_run_key_mismatch",
+                                "SIGNER_PUBLIC_KEY_USING_MINDSHARE_ACCOUNT is not the dry run key, signatures will not verify")
+            log.info("contract.ready", "Contract ready to operate!")
             self._is_initialized = True
                 
         except Exception as e:
-            print(f"[ERROR] Failed to initialize contract: {str(e)}")
-            print(f"[ERROR] Full error details: {traceback.format_exc()}")
+            log.error("contract.startup_failed", f"Failed to initialize contract: {str(e)}", exc_info=True)
             raise
     
+    async def function_call(self, method_name: str, args: Union[Dict[str, Any], bytes], gas: int, amount: int = 0,
+                            nowait: bool = False):
+        """Call the contract through the access key manager when one is attached, nowait returns the tx hash"""
+        if self.key_manager is not None and self.key_manager.can_sign(amount):
+            return await self.key_manager.function_call(method_name, args, gas=gas, amount=amount, nowait=nowait)
+
+        from py_near import transactions
+
+        # py_near would send args as spaced JSON, and cannot send Borsh ones
+        action = transactions.create_function_call_action(method_name, serialize_args(args), gas, amount)
+        return await self.worker_account.sign_and_submit_tx(self.contract_id, [action], nowait)
+
+    async def view_function(self, method_name: str, args: Union[Dict[str, Any], bytes]):
+        """View call of the contract, Borsh args go through the provider since py_near only sends JSON"""
+        if not isinstance(args, bytes):
+            return await self.worker_account.view_function(self.contract_id, method_name, args)
+
+        from py_near.models import ViewFunctionResult
+
+        result = await self.worker_account.provider.view_call(self.contract_id, method_name, args)
+        result["result"] = json.loads(bytes(result["result"]) or b"null")
+        return ViewFunctionResult(**result)
+
+    def signing_concurrency(self) -> int:
+        """Number of sign_trade calls that can be in flight at once without racing on a nonce"""
+        if self.key_manager is not None and self.key_manager.can_sign(SIGN_TRADE_DEPOSIT):
+            return len(self.key_manager.keys)
+        return 1
+
     async def sign_quote(self, quote: str) -> Dict[str, Any]:
         """Send quote to contract for signing"""
         try:
             if self.worker_account is None:
                 await self.startup()
 
-            result = await self.worker_account.function_call(
-                self.contract_id,
-                "sign_trade",
-                {
-                    "quote": quote,
-                },
-                gas=300000000000000,
-                amount=1000000000000000000000 
-            )
+            if self.dry_run is not None:
+                with get_tracer().span("contract.sign_trade", dry_run=True):
+                    return {"result": self.dry_run.sign(erc191_message(quote.encode('utf-8')))}
+
+            args = self.args_encoding.encode("sign_trade", quote.encode('utf-8'))
+            with get_tracer().span("contract.sign_trade", gas=SIGN_TRADE_GAS, deposit=SIGN_TRADE_DEPOSIT,
+                                   access_key=self.key_manager is not None, encoding=self.args_encoding.name,
+                                   args_bytes=len(serialize_args(args))) as span:
+                result = await self.function_call(
+                    self.args_encoding.method("sign_trade"),
+                    args,
+                    gas=SIGN_TRADE_GAS,
+                    amount=SIGN_TRADE_DEPOSIT
+                )
+                gas_burnt = getattr(getattr(result, "transaction_outcome", None), "gas_burnt", None)
+                span.set_attribute("gas_burnt", gas_burnt)
             
-            if hasattr(result, 'status'):
+            return self.decode_sign_result(result)
+            
+        except Exception as e:
+            log.error("contract.sign_trade_failed", f"Error calling sign_trade: {str(e)}")
+            return {"error": str(e)} 
+
+    async def submit_sign_quote(self, quote: str) -> str:
+        """Broadcast sign_trade without waiting for it, returns the transaction hash"""
+        if self.worker_account is None:
+            await self.startup()
+
+        args = self.args_encoding.encode("sign_trade", quote.encode('utf-8'))
+        with get_tracer().span("contract.sign_trade", gas=SIGN_TRADE_GAS, deposit=SIGN_TRADE_DEPOSIT,
+                               access_key=self.key_manager is not None, nowait=True, encoding=self.args_encoding.name,
+                               args_bytes=len(serialize_args(args))) as span:
+            tx_hash = await self.function_call(
+                self.args_encoding.method("sign_trade"),
+                args,
+                gas=SIGN_TRADE_GAS,
+                amount=SIGN_TRADE_DEPOSIT,
+                nowait=True
+            )
+            span.set_attribute("tx_hash", tx_hash)
+        return tx_hash
+
+    def decode_sign_result(self, result) -> Dict[str, Any]:
+        """Decode the MPC signature from a final sign_trade transaction"""
+        try:
+            if hasattr(result, 'status') and isinstance(result.status, dict):
+                if 'Failure' in result.status:
+                    return {"error": f"Contract error: {result.status['Failure']}"}
                 success_value = result.status['SuccessValue']
                 decoded_bytes = base64.b64decode(success_value)
                 decoded_json = json.loads(decoded_bytes.decode('utf-8'))
                 return {"result": decoded_json}
-            
-            return {"error": "No response data found"}
-            
         except Exception as e:
-            print(f"[LOG] Error calling sign_trade: {str(e)}")
-            return {"error": str(e)} 
+            return {"error": f"Failed to decode sign_trade result: {e}"}
+        
+        return {"error": "No response data found"}
         
     async def register_worker(self):
         """Main registration method that decides which registration flow to use"""
@@ -76,7 +164,7 @@ class SignIntentContract:
             if self.worker_account is None:
                 await self.startup()
                 
-            print(f"[LOG] Registering worker: {self.worker_account.account_id}")
+            log.info("contract.register", f"Registering worker: {self.worker_account.account_id}")
 
             if self.use_static_account:
                 # Use test registration if static account
@@ -86,7 +174,7 @@ class SignIntentContract:
                 return await self.register()
 
         except Exception as e:
-            print(f"[ERROR] Failed to register worker: {str(e)}")
+            log.error("contract.register_failed", f"Failed to register worker: {str(e)}")
             return {"error": str(e)}
 
     async def register(self):
@@ -96,47 +184,17 @@ class SignIntentContract:
             if self.worker_account is None:
                 await self.startup()
 
-            print("[LOG] Starting worker registration process...")
-            
-            tcb_info_dict = await AsyncTappdClient().get_info()
-            
-            parsed_tcb_info = json.loads(tcb_info_dict["tcb_info"])
-            
-            tcb_info = json.dumps(parsed_tcb_info, ensure_ascii=False, separators=(',', ':'))
+            log.info("contract.register", "Starting worker registration process...")
 
-            random_num_string = str(random.random())
-
-            quote_response = await AsyncTappdClient().tdx_quote(
-                report_data=random_num_string,
-                hash_algorithm='sha256'
-            )
-            
-            quote_hex = quote_response.quote 
-            
-            files = {
-                'hex': (None, quote_hex, 'text/plain')  # (filename, data, content_type)
-            }
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    'https://proof.t16z.com/api/upload',
-                    files=files,
-                    headers={'Accept': 'application/json'}
-                )
-                response.raise_for_status()
-                res_data = response.json()
-                
-                checksum = res_data['checksum']
-                collateral = json.dumps(res_data['quote_collateral'])
+            attestation = await self.prepare_attestation()
         
-            result = await self.worker_account.function_call(
-                self.contract_id,
+            result = await self.function_call(
                 "register_worker",
                 {
-                    "quote_hex": quote_hex,
-                    "collateral": collateral,
-                    "checksum": checksum,
-                    "tcb_info": tcb_info,
+                    "quote_hex": attestation["quote_hex"],
+                    "collateral": json.dumps(attestation["collateral"]),
+                    "checksum": attestation["checksum"],
+                    "tcb_info": attestation["tcb_info"],
                 },
                 gas=300000000000000,
             )
@@ -145,7 +203,10 @@ class SignIntentContract:
                 if isinstance(result.status, dict):
                     if 'Failure' in result.status:
                         error_details = result.status['Failure']
-                        print(f"[ERROR] Contract execution failed: {error_details}")
+                        log.error("contract.register_failed", "Contract execution failed", error=error_details)
+                        # Collateral rejected by the contract must not be replayed on retry
+                        self.collateral_cache.invalidate(attestation["quote_hex"])
+                        self._attestation = None
                         return {"success": False, "error": f"Contract error: {error_details}"}
                     elif 'SuccessValue' in result.status:
                         success_value = result.status['SuccessValue']
@@ -153,32 +214,86 @@ class SignIntentContract:
                             try:
                                 decoded_bytes = base64.b64decode(success_value)
                                 decoded_json = json.loads(decoded_bytes.decode('utf-8'))
+                                self.view_cache.invalidate(self.contract_id, "get_worker")
+                                self.registration.record(
+                                    self.worker_account.account_id,
+                                    attestation["quote_hex"],
+                                    attestation["checksum"],
+                                    attestation["collateral"] if self.verifier.collateral_expires else None
+                                )
                                 return {"success": True, "result": decoded_json}
                             except Exception as e:
-                                print(f"\n[ERROR] Failed to decode success value: {e}")
+                                log.error("contract.register_failed", f"Failed to decode success value: {e}")
                                 return {"success": False, "error": f"Failed to decode response: {e}"}
             
             return {"success": False, "error": "Registration failed - unexpected response format"}
             
         except Exception as e:
-            print(f"[ERROR] Failed to register worker: {str(e)}")
-            print(f"[ERROR] Full error details: {traceback.format_exc()}")
+            log.error("contract.register_failed", f"Failed to register worker: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e)}
         
-    async def generate_payload(self, quote: str) -> Dict[str, Any]:
-        """Generate payload from quote"""
+    async def prepare_attestation(self) -> Dict[str, Any]:
+        """Collect quote, tcb info, checksum and collateral, reusing cached artifacts while they are valid"""
+        if self._attestation is not None:
+            cached = self.collateral_cache.get(self._attestation["quote_hex"])
+            if cached is not None:
+                log.info("contract.attestation_cached", "Reusing cached attestation")
+                return {**self._attestation, "checksum": cached["checksum"], "collateral": cached["collateral"]}
+
+        from src.tappd.tappd import AsyncTappdClient
+
+        # get_info and tdx_quote are independent, each client owns its transport
+        tcb_info_dict, quote_response = await asyncio.gather(
+            AsyncTappdClient().get_info(),
+            AsyncTappdClient().tdx_quote(
+                report_data=str(random.random()),
+                hash_algorithm='sha256'
+            )
+        )
+
+        quote_hex = quote_response.quote
+
+        parsed_tcb_info = json.loads(tcb_info_dict["tcb_info"])
+        tcb_info = json.dumps(parsed_tcb_info, ensure_ascii=False, separators=(',', ':'))
+
+        # Reject a malformed or mismatching quote before paying for the upload and register_worker gas
+        validate_quote(quote_hex, parsed_tcb_info)
+
+        cached = self.collateral_cache.get(quote_hex)
+        if cached is None:
+            uploaded = await self.verifier.upload(quote_hex)
+            cached = self.collateral_cache.put(quote_hex, uploaded["checksum"], uploaded["collateral"],
+                                               expires=self.verifier.collateral_expires)
+
+        self._attestation = {"quote_hex": quote_hex, "tcb_info": tcb_info}
+        return {**self._attestation, "checksum": cached["checksum"], "collateral": cached["collateral"]}
+
+    async def generate_payload(self, quote: Union[str, bytes]) -> Dict[str, Any]:
+        """Generate payload from the ERC-191 message of a quote"""
         try:
             if self.worker_account is None:
                 await self.startup()
 
-            quote_bytes = quote.encode('utf-8')
-            quote_u8_list = list(quote_bytes)
+            quote_bytes = quote if isinstance(quote, bytes) else quote.encode('utf-8')
+            if self.dry_run is not None:
+                payload = self.dry_run.payload(quote_bytes)
+                return {"result": {"payload": payload.hex(), "raw_bytes": list(payload)}}
 
-            result = await self.worker_account.view_function(
-                self.contract_id,
-                "generate_payload",
-                {"data": quote_u8_list}
-            )
+            method_name = self.args_encoding.method("generate_payload")
+            args = self.args_encoding.encode("generate_payload", quote_bytes)
+            # The payload is a pure function of the message, retries reuse it
+            with get_tracer().span("contract.generate_payload", message_bytes=len(quote_bytes),
+                                   encoding=self.args_encoding.name) as span:
+                hits = self.view_cache.hits
+                result = await self.view_cache.call(
+                    self.contract_id,
+                    method_name,
+                    args,
+                    lambda: self.view_function(method_name, args),
+                    ttl=PAYLOAD_CACHE_TTL,
+                    block_aware=False
+                )
+                span.set_attribute("cache_hit", self.view_cache.hits > hits)
             
             if result.result and len(result.result) == 32:
                 payload_hex = bytes(result.result).hex()
@@ -189,17 +304,17 @@ class SignIntentContract:
                     }
                 }
             
-            print(f"[LOG] Invalid result format: {result.result}")  
+            log.warning("contract.payload_invalid", "Invalid result format", result=result.result)  
             return {"error": f"Invalid payload format. Got: {result.result}"}
                 
         except Exception as e:
-            print(f"[LOG] Error generating payload: {str(e)}")
+            log.error("contract.payload_failed", f"Error generating payload: {str(e)}")
             return {"error": str(e)} 
     
     async def register_test(self):
         """Register worker with test values"""
         try:
-            print("[LOG] Using test registration values")
+            log.info("contract.register", "Using test registration values")
             
             checksum = "test_checksum"
 
@@ -213,8 +328,7 @@ class SignIntentContract:
             with open('samples/quote_hex.json', 'r') as file:
                 quote_hex = json.load(file)
 
-            result = await self.worker_account.function_call(
-                self.contract_id,
+            result = await self.function_call(
                 "register_worker",
                 {
                     "quote_hex": quote_hex,
@@ -225,19 +339,19 @@ class SignIntentContract:
                 gas=300000000000000
             )
             
-            print(f"\n[LOG] Full transaction result: {result.__dict__}")
+            # Only rendered at debug level, the result holds every receipt of the transaction
+            if log.get_logger().enabled(log.DEBUG):
+                log.debug("contract.register_result", "Full transaction result", result=result.__dict__)
             
             if hasattr(result, 'logs') and result.logs:
-                print(f"[LOG] Transaction logs:")
-                for log in result.logs:
-                    print(f"  - {log}")
+                log.info("contract.register_logs", "Transaction logs", logs=result.logs)
                 
             if hasattr(result, 'status'):
-                print(f"\n[LOG] Transaction status: {result.status}")
+                log.info("contract.register_status", "Transaction status", status=result.status)
                 if isinstance(result.status, dict):
                     if 'Failure' in result.status:
                         error_details = result.status['Failure']
-                        print(f"[ERROR] Contract execution failed: {error_details}")
+                        log.error("contract.register_failed", "Contract execution failed", error=error_details)
                         return {"success": False, "error": f"Contract error: {error_details}"}
                     elif 'SuccessValue' in result.status:
                         success_value = result.status['SuccessValue']
@@ -245,47 +359,64 @@ class SignIntentContract:
                             try:
                                 decoded_bytes = base64.b64decode(success_value)
                                 decoded_json = json.loads(decoded_bytes.decode('utf-8'))
-                                print("[LOG] Registration successful (TEST)")
+                                log.info("contract.registered", "Registration successful (TEST)")
+                                self.view_cache.invalidate(self.contract_id, "get_worker")
+                                # The sample collateral is long past its nextUpdate, only the TTL applies
+                                self.registration.record(self.worker_account.account_id, quote_hex.get("QUOTE_HEX"), checksum)
                                 return {"success": True, "result": decoded_json}
                             except Exception as e:
-                                print(f"\n[ERROR] Failed to decode success value: {e}")
+                                log.error("contract.register_failed", f"Failed to decode success value: {e}")
                                 return {"success": False, "error": f"Failed to decode response: {e}"}
             
             return {"success": False, "error": "Registration failed - unexpected response format"}
             
         except Exception as e:
-            print(f"[ERROR] Failed to register worker: {str(e)}")
-            print(f"[ERROR] Full error details: {traceback.format_exc()}")
+            log.error("contract.register_failed", f"Failed to register worker: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e)}
         
             
-    async def initialize_worker(self):
-        """Initialize and verify worker account"""
+    async def initialize_worker(self, refresh: bool = False):
+        """Initialize and verify worker account, refresh asks the contract even if the registration is known"""
         try:
             # Initialize worker account
             await self.startup()
+
+            account_id = self.worker_account.account_id
+            if self.dry_run is not None:
+                # Nothing is signed by the contract, the worker never needs to be registered
+                self.registration.record(account_id)
+                return True
+            if refresh:
+                self.view_cache.invalidate(self.contract_id, "get_worker")
+            elif self.registration.is_registered(account_id):
+                return True
             
             try:
-                result = await self.worker_account.view_function(
+                args = {"account_id": account_id}
+                result = await self.view_cache.call(
                     self.contract_id,
                     "get_worker",
-                    {"account_id": self.worker_account.account_id}
+                    args,
+                    lambda: self.worker_account.view_function(self.contract_id, "get_worker", args),
+                    ttl=GET_WORKER_CACHE_TTL
                 )
-                
+
+                self.registration.record(account_id)
                 return True
                     
             except Exception as e:
                 error_message = str(e)
                 
-                if "worker not found" in error_message.lower() or "option::unwrap()" in error_message.lower():
-                    print("\n[LOG] Worker not registered")
+                if is_not_registered_error(error_message):
+                    log.info("contract.not_registered", "Worker not registered")
+                    self.registration.forget(account_id)
                     return False
                 else:
-                    print(f"[LOG] Unexpected error in get_worker: {error_message}")
+                    log.error("contract.get_worker_failed", f"Unexpected error in get_worker: {error_message}")
                     raise  # Re-raise unexpected errors
                     
         except Exception as e:
-            print(f"[LOG] Critical error in initialize_worker: {str(e)}")
+            log.error("contract.initialize_failed", f"Critical error in initialize_worker: {str(e)}")
             raise
         
             
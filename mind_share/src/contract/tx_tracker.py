@@ -0,0 +1,162 @@
+import asyncio
+import json
+import os
+import time
+
+from typing import Any, Callable, Dict, Optional
+
+from src.telemetry import log
+
+DEFAULT_POLL_INTERVAL = 2.0  # seconds between polling rounds
+DEFAULT_MAX_AGE = 30 * 60  # seconds before a pending transaction is given up
+
+
+class PendingTransaction:
+    """Broadcast transaction waiting for its final status"""
+
+    def __init__(self, tx_hash: str, method: str, context: Optional[Dict[str, Any]] = None, submitted_at: float = None):
+        self.tx_hash = tx_hash
+        self.method = method
+        self.context = context or {}
+        self.submitted_at = submitted_at or time.time()
+        self.polls = 0
+        # Set once nobody awaits the result anymore, the method handler resumes it instead
+        self.detached = False
+        self.future = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "tx_hash": self.tx_hash,
+            "method": self.method,
+            "context": self.context,
+            "submitted_at": self.submitted_at,
+        }
+
+
+class TransactionTracker:
+    """Polls the status of broadcast transactions in background rounds and resumes the ones nobody waits for"""
+
+    def __init__(self, provider, sender_id: str, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 max_age: float = DEFAULT_MAX_AGE, path: Optional[str] = None):
+        self.provider = provider
+        self.sender_id = sender_id
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+        self.path = path or os.getenv('PENDING_TX_PATH')
+        self._pending: Dict[str, PendingTransaction] = {}
+        self._handlers: Dict[str, Callable] = {}
+        self._task = None
+        self._load()
+
+    def on_result(self, method: str, handler: Callable):
+        """Register the coroutine resuming detached transactions of a method, called with (tx_result, context)"""
+        self._handlers[method] = handler
+
+    def track(self, tx_hash: str, method: str, context: Optional[Dict[str, Any]] = None) -> PendingTransaction:
+        pending = PendingTransaction(tx_hash, method, context)
+        pending.future = asyncio.get_event_loop().create_future()
+        self._pending[tx_hash] = pending
+        self._save()
+        return pending
+
+    async def wait(self, tx_hash: str, timeout: float) -> Optional[Any]:
+        """Wait for a tracked transaction, on timeout it stays tracked and is handed to the method handler when it lands"""
+        pending = self._pending.get(tx_hash)
+        if pending is None:
+            raise KeyError(f"Transaction not tracked: {tx_hash}")
+        try:
+            return await asyncio.wait_for(asyncio.shield(pending.future), timeout)
+        except asyncio.TimeoutError:
+            pending.detached = True
+            log.info("tx.detached", f"Transaction {tx_hash} still pending, it will be resumed when it lands", tx_hash=tx_hash)
+            return None
+
+    @property
+    def pending(self):
+        return list(self._pending.values())
+
+    async def _fetch(self, pending: PendingTransaction):
+        try:
+            return await self.provider.get_tx(pending.tx_hash, self.sender_id)
+        except Exception:
+            # Unknown yet or RPC timeout, the next round asks again
+            return None
+
+    async def poll_once(self):
+        """Ask the status of every pending transaction in one concurrent round"""
+        pendings = list(self._pending.values())
+        if not pendings:
+            return
+
+        results = await asyncio.gather(*(self._fetch(pending) for pending in pendings))
+
+        for pending, tx_result in zip(pendings, results):
+            pending.polls += 1
+            if tx_result is None or not getattr(tx_result, 'status', None):
+                if time.time() - pending.submitted_at > self.max_age:
+                    log.warning("tx.expired", f"Giving up on transaction {pending.tx_hash} after {pending.polls} polls",
+                                tx_hash=pending.tx_hash, method=pending.method)
+                    self._resolve(pending, None)
+                continue
+            self._resolve(pending, tx_result)
+            await self._resume(pending, tx_result)
+
+        self._save()
+
+    def _resolve(self, pending: PendingTransaction, tx_result):
+        self._pending.pop(pending.tx_hash, None)
+        if pending.future is not None and not pending.future.done():
+            pending.future.set_result(tx_result)
+
+    async def _resume(self, pending: PendingTransaction, tx_result):
+        handler = self._handlers.get(pending.method)
+        if not (pending.detached and handler):
+            return
+        try:
+            log.info("tx.resume", f"Resuming {pending.method} from transaction {pending.tx_hash}", tx_hash=pending.tx_hash)
+            await handler(tx_result, pending.context)
+        except Exception as e:
+            log.error("tx.resume_failed", f"Error resuming transaction {pending.tx_hash}: {str(e)}", tx_hash=pending.tx_hash)
+
+    async def run(self):
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                log.warning("tx.poll_failed", f"Error polling transactions: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _save(self):
+        if not self.path:
+            return
+        with open(self.path, 'w') as file:
+            json.dump([pending.to_dict() for pending in self._pending.values()], file)
+
+    def _load(self):
+        """Pending transactions of a previous run come back detached, so their handler resumes them"""
+        if not self.path or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, 'r') as file:
+                entries = json.load(file)
+        except (OSError, ValueError) as e:
+            log.warning("tx.unreadable_state", f"Ignoring unreadable pending transactions file {self.path}: {str(e)}")
+            return
+        for entry in entries:
+            pending = PendingTransaction(entry['tx_hash'], entry['method'], entry.get('context'), entry.get('submitted_at'))
+            pending.detached = True
+            self._pending[pending.tx_hash] = pending
@@ -1,20 +1,28 @@
-from typing import List, Dict, TypedDict, Union
-from near_api.account import Account
-from eth_keys import keys
+from typing import List, Dict, TypedDict, Union, TYPE_CHECKING
 from decimal import Decimal, ROUND_DOWN, InvalidOperation
 from src.constants import ASSET_MAP
+from src.quote.serializer import SerializedQuote
+from src.scheduler import deadline
+from src.telemetry import log
+from src.timeseries.store import open_store
+from src.telemetry.tracing import get_tracer
 
 import re
-import near_api
 import os
-import requests
-import json
 import base64
 import random
 import base58
 import time
 
+if TYPE_CHECKING:
+    from near_api.account import Account
+
 SOLVER_BUS_URL = "https://solver-relay-v2.chaindefuser.com/rpc"
+SOLVER_QUOTE_TIMEOUT = 10  # seconds
+
+def get_solver_bus_url():
+    """Solver relay endpoint, SOLVER_BUS_URL points it at a stand-in"""
+    return os.getenv('SOLVER_BUS_URL', SOLVER_BUS_URL)
 
 class Trade(TypedDict):
     token_in: str
@@ -114,7 +122,7 @@ def parse_llm_response(response: str, balances: Dict[str, float]) -> List[Trade]
                 continue
             
             if token_in not in ASSET_MAP or token_out not in ASSET_MAP:
-                print(f"[LOG] Skipping trade with unsupported tokens: {token_in} -> {token_out}")
+                log.warning("quote.unsupported_tokens", f"Skipping trade with unsupported tokens: {token_in} -> {token_out}")
                 continue
             
             amount_in = float(amount_str)
@@ -141,32 +149,41 @@ def parse_llm_response(response: str, balances: Dict[str, float]) -> List[Trade]
             continue
     
     if not trades:
-        print("[LOG] No trades were parsed successfully")
+        log.warning("quote.no_trades", "No trades were parsed successfully")
     return trades
 
-def execute_trades(account: Account, trades: List[Trade]):
+def quote_trade(account: "Account", trade: Trade):
+    """Quote one trade on the solver bus, None for trades with nothing to sell"""
+    if trade['amount_in'] <= 0:
+        return None
+
+    log.info("quote.trade", f"Processing trade: {trade['amount_in']} {trade['token_in']} -> {trade['token_out']}")
+
+    with get_tracer().span("quote.intent_swap", token_in=trade["token_in"], token_out=trade["token_out"],
+                           amount_in=trade["amount_in"]):
+        response = intent_swap(
+            account,
+            trade["token_in"],
+            trade["amount_in"],
+            trade["token_out"]
+        )
+
+    return {
+        "trade": trade,
+        "response": response
+    }
+
+def execute_trades(account: "Account", trades: List[Trade]):
     """Execute trades suggested by LLM"""
     responses = []
     for trade in trades:
         try:
-
-            if trade['amount_in'] > 0:
-                print(f"\nProcessing trade: {trade['amount_in']} {trade['token_in']} -> {trade['token_out']}")
-            
-                response = intent_swap(
-                    account,
-                    trade["token_in"],
-                    trade["amount_in"],
-                    trade["token_out"]
-                )
-            
-                responses.append({
-                    "trade": trade,
-                    "response": response
-                })
+            response = quote_trade(account, trade)
+            if response is not None:
+                responses.append(response)
             
         except Exception as e:
-            print(f"Error executing trade: {str(e)}")
+            log.error("quote.trade_failed", f"Error executing trade: {str(e)}")
             responses.append({
                 "trade": trade,
                 "error": str(e)
@@ -177,7 +194,9 @@ def execute_trades(account: Account, trades: List[Trade]):
 def process_llm_suggestion(account_id: str, llm_response: str, balances: Dict[str, float]):
     """Process LLM suggestion and execute trades"""
     try:
-        trades = parse_llm_response(llm_response, balances)
+        with get_tracer().span("quote.parse", response_chars=len(llm_response)) as span:
+            trades = parse_llm_response(llm_response, balances)
+            span.set_attribute("trades", len(trades))
         if not trades:
             return {"error": "No trades found in LLM response"}
             
@@ -200,42 +219,60 @@ def process_llm_suggestion(account_id: str, llm_response: str, balances: Dict[st
     except Exception as e:
         return {"error": f"Error processing trades: {str(e)}"}
     
-def intent_swap(account_id: Account, token_in: str, amount_in: float, token_out: str):
+def intent_swap(account_id: "Account", token_in: str, amount_in: float, token_out: str):
     
     actual_token_in = 'WNEAR' if token_in == 'NEAR' else token_in
     amount_in_yocto = to_decimals(amount_in, ASSET_MAP[token_in]['decimals'])
 
     request = IntentRequest().asset_in(actual_token_in, amount_in).asset_out(token_out)
     
-    options = fetch_options(request)
+    with get_tracer().span("solver.quote") as span:
+        options = fetch_options(request)
+        span.set_attribute("options", len(options or []))
 
     if not options:
         raise Exception("No options returned from solver bus")
     
     
     best_option = select_best_option(options)
+    record_quote_price(token_in, amount_in, token_out, best_option['amount_out'])
     
-    quote = create_token_diff_quote(account_id, token_in, str(request.asset_in["amount"]), token_out, best_option['amount_out'])
+    quote = build_token_diff_quote(account_id, token_in, str(request.asset_in["amount"]), token_out, best_option['amount_out'])
     
     return {
             "success": True,
             "execution_results": [{
-                "quote": quote,
-                "quote_hash": best_option['quote_hash']
+                "quote": quote.text,
+                "quote_hash": best_option['quote_hash'],
+                "serialized": quote
             }]
         }
 
 def fetch_options(request):
     """Fetches the trading options from the solver bus."""
+    import requests
+
     rpc_request = {
         "id": "dontcare",
         "jsonrpc": "2.0",
         "method": "quote",
         "params": [request.serialize()]
     }
-    response = requests.post(SOLVER_BUS_URL, json=rpc_request)
+    # Capped by the trades stage, the quote stage's thread runs in a copy of the cycle's context
+    response = requests.post(get_solver_bus_url(), json=rpc_request, timeout=deadline.call_timeout(SOLVER_QUOTE_TIMEOUT))
     return response.json().get("result", [])
 
+def record_quote_price(token_in: str, amount_in: float, token_out: str, amount_out: str):
+    """Keep the price a solver quote implies in TIMESERIES_DIR, the only prices observed live"""
+    store = open_store()
+    if store is None:
+        return
+    try:
+        amount_out = float(Decimal(amount_out) / Decimal(10) ** ASSET_MAP[token_out]['decimals'])
+        store.record_quote(token_in, float(amount_in), token_out, amount_out)
+    except Exception as e:
+        log.warning("quote.record_failed", f"Error recording quote price: {str(e)}")
+
 def select_best_option(options):
     """Selects the best option from the list of options."""
     best_option = None
@@ -254,15 +291,16 @@ def to_decimals(amount, decimals):
         
         return str(result)
     except Exception as e:
-        print(f"Error in to_decimals - amount: {amount}, decimals: {decimals}")
+        log.error("quote.to_decimals_failed", f"Error in to_decimals - amount: {amount}, decimals: {decimals}")
         raise
 
 
-def create_token_diff_quote(account_id, token_in, amount_in, token_out, amount_out):
+def build_token_diff_quote(account_id, token_in, amount_in, token_out, amount_out) -> SerializedQuote:
+    """Token diff quote in its canonical serialized form, signed and published as these exact bytes"""
     token_in_fmt = get_asset_id(token_in)
     token_out_fmt = get_asset_id(token_out)
     nonce = base64.b64encode(random.getrandbits(256).to_bytes(32, byteorder='big')).decode('utf-8')
-    quote = json.dumps(Quote(
+    return SerializedQuote.of(Quote(
         signer_id=account_id,
         nonce=nonce,
         verifying_contract="intents.near",
@@ -271,24 +309,29 @@ def create_token_diff_quote(account_id, token_in, amount_in, token_out, amount_o
             Intent(intent='token_diff', diff={token_in_fmt: "-" + amount_in, token_out_fmt: amount_out})
         ]
     ))
-    return quote
 
-def publish_intent(signed_intent: Commitment, quote_hashes: List[str]) -> dict:
-    """Publishes the signed intent to the solver bus."""
+def create_token_diff_quote(account_id, token_in, amount_in, token_out, amount_out) -> str:
+    return build_token_diff_quote(account_id, token_in, amount_in, token_out, amount_out).text
 
-    publish_data = {
+def publish_params(signed_intent: Commitment, quote_hashes: List[str]) -> PublishIntent:
+    """Parameters of the relay's publish_intent call"""
+    return {
         "signed_data": signed_intent,
         "quote_hashes": [quote_hashes]
     }
-    
+
+def publish_intent(signed_intent: Commitment, quote_hashes: List[str]) -> dict:
+    """Publishes the signed intent to the solver bus."""
+    import requests
+
     rpc_request = {
         "id": "dontcare",
         "jsonrpc": "2.0",
         "method": "publish_intent",
-        "params": [publish_data]
+        "params": [publish_params(signed_intent, quote_hashes)]
     }
     
-    response = requests.post(SOLVER_BUS_URL, json=rpc_request)
+    response = requests.post(get_solver_bus_url(), json=rpc_request)
     return response.json()
 
 
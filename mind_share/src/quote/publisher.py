@@ -0,0 +1,238 @@
+import asyncio
+import itertools
+import time
+import weakref
+
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+from src.constants import ASSET_MAP
+from src.quote import serializer
+from src.quote.generate_quote import Trade, get_asset_id, get_solver_bus_url, publish_params
+from src.telemetry import log
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_BATCH_WINDOW = 0.02  # seconds an intent waits for others to share the request
+DEFAULT_MAX_WAIT = 2.0  # seconds an intent waits for the rest of its cycle, while more of them are still being signed
+DEFAULT_MAX_BATCH = 20
+DEFAULT_POLL_INTERVAL = 2.0  # seconds between settlement polling rounds
+DEFAULT_MAX_AGE = 10 * 60  # seconds before an unsettled intent is given up
+
+SETTLED = "SETTLED"
+NOT_FOUND = "NOT_FOUND_OR_NOT_VALID"
+
+
+class RelayError(Exception):
+    """JSON-RPC error answered by the solver relay"""
+
+    def __init__(self, error: Dict[str, Any]):
+        super().__init__(error.get('message', str(error)) if isinstance(error, dict) else str(error))
+        self.error = error
+
+
+class RelayClient:
+    """Solver relay JSON-RPC client sending batch requests over one pooled connection per event loop"""
+
+    def __init__(self, url: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT):
+        self.url = url or get_solver_bus_url()
+        self.timeout = timeout
+        self._clients = weakref.WeakKeyDictionary()
+        self._ids = itertools.count(1)
+
+    def _get_client(self):
+        loop = asyncio.get_event_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            import httpx
+
+            client = httpx.AsyncClient(timeout=self.timeout, limits=httpx.Limits(max_keepalive_connections=4))
+            self._clients[loop] = client
+        return client
+
+    async def close(self):
+        """Close the connection opened from the running loop"""
+        client = self._clients.pop(asyncio.get_event_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    async def _post(self, payload):
+        response = await self._get_client().post(
+            self.url, content=serializer.dumps(payload), headers={"Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+        return serializer.loads(response.content)
+
+    async def batch(self, method: str, params: List[Any]) -> List[Dict[str, Any]]:
+        """Call method once per params in a single JSON-RPC batch, responses come back in the order of params"""
+        requests = [{"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": [item]} for item in params]
+        if len(requests) == 1:
+            return [await self._post(requests[0])]
+
+        content = await self._post(requests)
+        if not isinstance(content, list):
+            # A relay without batch support answers the whole batch with one error, send the calls one by one
+            return list(await asyncio.gather(*(self._post(request) for request in requests)))
+
+        by_id = {response.get("id"): response for response in content if isinstance(response, dict)}
+        missing = {"error": {"code": -32603, "message": "No response in batch"}}
+        return [by_id.get(request["id"], {**missing, "id": request["id"]}) for request in requests]
+
+
+class IntentPublisher:
+    """Holds intents published within a short window and sends them to the relay as one batch"""
+
+    def __init__(self, relay: RelayClient, batch_window: float = DEFAULT_BATCH_WINDOW, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait: float = DEFAULT_MAX_WAIT):
+        self.relay = relay
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        # Intents that may still be published this cycle, set while a cycle's pipeline runs
+        self.upstream: Optional[Callable[[], int]] = None
+        self.batches = 0
+        self._queued = []
+        self._timer = None
+
+    async def publish(self, signed_intent, quote_hashes) -> Dict[str, Any]:
+        """Publish one signed intent, answers the relay's JSON-RPC response like publish_intent"""
+        future = asyncio.get_event_loop().create_future()
+        self._queued.append((publish_params(signed_intent, quote_hashes), future))
+        if len(self._queued) >= self.max_batch:
+            self.flush()
+        else:
+            if self._timer is None:
+                # Signing takes seconds per trade, a cycle's intents are held until the last of them is signed
+                window = self.batch_window if self.upstream is None else max(self.batch_window, self.max_wait)
+                self._timer = asyncio.get_event_loop().call_later(window, self.flush)
+            self.poke()
+        return await future
+
+    def poke(self):
+        """Send the held intents once nothing more of the cycle can join them"""
+        if self._queued and self.upstream is not None and self.upstream() == 0:
+            self.flush()
+
+    def flush(self):
+        """Send the queued intents now instead of at the end of the window"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._queued = self._queued, []
+        if batch:
+            asyncio.ensure_future(self._send(batch))
+
+    async def _send(self, batch):
+        self.batches += 1
+        try:
+            responses = await self.relay.batch("publish_intent", [params for params, _ in batch])
+        except Exception as e:
+            responses = [e] * len(batch)
+        for (_, future), response in zip(batch, responses):
+            if future.done():
+                continue
+            if isinstance(response, Exception):
+                future.set_exception(response)
+            else:
+                future.set_result(response)
+
+
+class PublishedIntent:
+    """Intent accepted by the relay, waiting for its settlement on intents.near"""
+
+    def __init__(self, intent_hash: str, trade: Trade, quote: str, published_at: float = None):
+        self.intent_hash = intent_hash
+        self.trade = trade
+        self.quote = quote
+        self.published_at = published_at or time.time()
+        self.polls = 0
+        self.status = None
+        self.tx_hash = None
+
+    def balance_changes(self) -> Dict[str, float]:
+        """What settling moves in token units, the amount out as quoted by the solver"""
+        token_in, token_out = self.trade['token_in'], self.trade['token_out']
+        diff = serializer.loads(self.quote)['intents'][0]['diff']
+        amount_out = Decimal(diff[get_asset_id(token_out)]) / Decimal(str(10 ** ASSET_MAP[token_out]['decimals']))
+        return {token_in: -float(self.trade['amount_in']), token_out: float(amount_out)}
+
+
+class SettlementTracker:
+    """Polls the relay for the status of published intents in batched rounds and hands over the settled ones"""
+
+    def __init__(self, relay: RelayClient, poll_interval: float = DEFAULT_POLL_INTERVAL, max_age: float = DEFAULT_MAX_AGE):
+        self.relay = relay
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+        self._pending: Dict[str, PublishedIntent] = {}
+        # Intents given up unsettled, whether they moved any balance is unknown
+        self.given_up = 0
+        self._handler: Optional[Callable[[PublishedIntent], None]] = None
+        self._task = None
+
+    def on_settled(self, handler: Callable[[PublishedIntent], None]):
+        self._handler = handler
+
+    def track(self, intent_hash: str, trade: Trade, quote: str) -> PublishedIntent:
+        intent = PublishedIntent(intent_hash, trade, quote)
+        self._pending[intent_hash] = intent
+        return intent
+
+    @property
+    def pending(self) -> List[PublishedIntent]:
+        return list(self._pending.values())
+
+    async def poll_once(self):
+        """Ask the status of every pending intent in one batch request"""
+        intents = list(self._pending.values())
+        if not intents:
+            return
+
+        responses = await self.relay.batch("get_status", [{"intent_hash": intent.intent_hash} for intent in intents])
+
+        for intent, response in zip(intents, responses):
+            intent.polls += 1
+            result = response.get("result") or {}
+            intent.status = result.get("status")
+            if intent.status == SETTLED:
+                intent.tx_hash = (result.get("data") or {}).get("hash")
+                self._pending.pop(intent.intent_hash, None)
+                log.info("settlement.settled", f"Intent {intent.intent_hash} settled", tx_hash=intent.tx_hash,
+                         polls=intent.polls)
+                self._settled(intent)
+            elif intent.status == NOT_FOUND:
+                self._pending.pop(intent.intent_hash, None)
+                log.warning("settlement.failed", f"Intent {intent.intent_hash} was not settled", status=intent.status)
+            elif time.time() - intent.published_at > self.max_age:
+                self._pending.pop(intent.intent_hash, None)
+                self.given_up += 1
+                log.warning("settlement.expired", f"Giving up on intent {intent.intent_hash} after {intent.polls} polls",
+                            status=intent.status)
+
+    def _settled(self, intent: PublishedIntent):
+        if self._handler is None:
+            return
+        try:
+            self._handler(intent)
+        except Exception as e:
+            log.error("settlement.handler_failed", f"Error handling settled intent {intent.intent_hash}: {str(e)}")
+
+    async def run(self):
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                log.warning("settlement.poll_failed", f"Error polling intent status: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
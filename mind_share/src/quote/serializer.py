@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON = "orjson"
+STDLIB = "json"
+ERC191_PREFIX = b"\x19Ethereum Signed Message:\n"
+
+
+def get_backend() -> str:
+    """orjson when it is installed, QUOTE_JSON_BACKEND=json forces the standard library"""
+    if orjson is None or os.getenv('QUOTE_JSON_BACKEND', ORJSON).lower() == STDLIB:
+        return STDLIB
+    return ORJSON
+
+
+def dumps(value: Any, backend: str = None) -> bytes:
+    """Canonical JSON: sorted keys, no whitespace, UTF-8 without escapes, the same bytes from either backend"""
+    if (backend or get_backend()) == ORJSON:
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if get_backend() == ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def erc191_message(data: bytes) -> bytes:
+    """ERC-191 personal message of the bytes, what the MPC signature covers"""
+    return ERC191_PREFIX + str(len(data)).encode('utf-8') + data
+
+
+class SerializedQuote:
+    """A quote encoded once, its text, ERC-191 message and digest all derive from the same bytes"""
+
+    __slots__ = ("data", "_text", "_message", "_digest")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self._text = None
+        self._message = None
+        self._digest = None
+
+    @classmethod
+    def of(cls, quote: Union["SerializedQuote", dict, str, bytes]) -> "SerializedQuote":
+        """Wrap a quote, text and bytes are kept as they are since they may already be signed"""
+        if isinstance(quote, SerializedQuote):
+            return quote
+        if isinstance(quote, dict):
+            return cls(dumps(quote))
+        if isinstance(quote, str):
+            serialized = cls(quote.encode('utf-8'))
+            serialized._text = quote
+            return serialized
+        return cls(bytes(quote))
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.data.decode('utf-8')
+        return self._text
+
+    @property
+    def message(self) -> bytes:
+        if self._message is None:
+            self._message = erc191_message(self.data)
+        return self._message
+
+    @property
+    def digest(self) -> str:
+        """sha256 of the quote bytes, one id for the quote across signing and publishing"""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+
+    def to_dict(self) -> dict:
+        return loads(self.data)
@@ -0,0 +1,191 @@
+import asyncio
+import base64
+import json
+
+from typing import Any, Dict, List, Optional, Union
+from src.rpc.endpoints import (
+    ContractExecutionError,
+    RpcEndpointPool,
+    RpcTimeoutError,
+    UnknownTransactionError,
+    get_endpoint_pool,
+)
+from src.rpc.view_cache import ViewCallCache, result_block_height
+
+TX_WAIT_ATTEMPTS = 6
+TX_WAIT_INTERVAL = 5.0  # seconds between status checks after a broadcast timed out
+
+
+def serialize_args(args: Union[Dict[str, Any], bytes]) -> bytes:
+    """Call arguments as sent, compact JSON for a dict and as is for bytes already encoded, Borsh for instance"""
+    if isinstance(args, bytes):
+        return args
+    return json.dumps(args, separators=(',', ':')).encode('utf-8')
+
+
+def encode_args(args: Union[Dict[str, Any], bytes]) -> str:
+    """Serialized call arguments in base64, the form every call_function query and action uses"""
+    return base64.b64encode(serialize_args(args)).decode('utf-8')
+
+
+def decode_result(result: List[int]) -> Any:
+    """JSON value of the raw bytes returned by a view call"""
+    raw = bytes(result)
+    return json.loads(raw) if raw else None
+
+
+class NearRpcClient:
+    """Async NEAR JSON-RPC calls over the shared endpoint pool, raising the typed errors of src.rpc.endpoints"""
+
+    def __init__(self, pool: RpcEndpointPool):
+        self.pool = pool
+        # Shared by every caller of the client, any response at a newer block retires older block aware entries
+        self.view_cache = ViewCallCache()
+
+    async def call(self, method: str, params, hedge: Optional[bool] = None) -> Any:
+        result = await self.pool.call(method, params, hedge=hedge)
+        self.view_cache.observe_block(result_block_height(result))
+        return result
+
+    async def close(self):
+        await self.pool.close()
+
+    async def status(self) -> Dict[str, Any]:
+        return await self.call("status", [])
+
+    async def block(self, finality: str = "final") -> Dict[str, Any]:
+        return await self.call("block", {"finality": finality})
+
+    async def query(self, request_type: str, account_id: str, finality: str = "optimistic",
+                    block_id: Optional[int] = None, **params) -> Dict[str, Any]:
+        query = {"request_type": request_type, "account_id": account_id, **params}
+        if block_id is not None:
+            query["block_id"] = block_id
+        else:
+            query["finality"] = finality
+        return await self.call("query", query)
+
+    async def view_account(self, account_id: str, finality: str = "optimistic") -> Dict[str, Any]:
+        return await self.query("view_account", account_id, finality)
+
+    async def view_access_key(self, account_id: str, public_key: str, finality: str = "optimistic") -> Dict[str, Any]:
+        return await self.query("view_access_key", account_id, finality, public_key=public_key)
+
+    async def view_access_key_list(self, account_id: str, finality: str = "optimistic") -> Dict[str, Any]:
+        return await self.query("view_access_key_list", account_id, finality)
+
+    async def call_function(self, contract_id: str, method_name: str, args_base64: str,
+                            finality: str = "optimistic", block_id: Optional[int] = None) -> Dict[str, Any]:
+        """Raw call_function query, contract panics raise ContractExecutionError"""
+        result = await self.query(
+            "call_function", contract_id, finality, block_id,
+            method_name=method_name, args_base64=args_base64
+        )
+        # Older nodes answer panics inside the result instead of as an RPC error
+        if "error" in result:
+            raise ContractExecutionError({"cause": {"name": "CONTRACT_EXECUTION_ERROR"}, "data": result["error"]})
+        return result
+
+    async def view_function(self, contract_id: str, method_name: str, args: Dict[str, Any],
+                            finality: str = "optimistic", block_id: Optional[int] = None) -> Dict[str, Any]:
+        """View call with the result decoded from JSON, the block height stays alongside for caching"""
+        result = await self.call_function(contract_id, method_name, encode_args(args), finality, block_id)
+        return {**result, "result": decode_result(result["result"])}
+
+    async def broadcast_tx_async(self, signed_tx: str) -> str:
+        return await self.call("broadcast_tx_async", [signed_tx])
+
+    async def broadcast_tx_commit(self, signed_tx: str) -> Dict[str, Any]:
+        return await self.call("broadcast_tx_commit", [signed_tx])
+
+    async def send_tx(self, signed_tx: str, wait_until: str) -> Dict[str, Any]:
+        return await self.call("send_tx", {"signed_tx_base64": signed_tx, "wait_until": wait_until})
+
+    async def tx_status(self, tx_hash: str, sender_id: str) -> Dict[str, Any]:
+        return await self.call("tx", [tx_hash, sender_id])
+
+    async def wait_for_tx(self, tx_hash: str, sender_id: str,
+                          attempts: int = TX_WAIT_ATTEMPTS, interval: float = TX_WAIT_INTERVAL) -> Dict[str, Any]:
+        """Poll the status of a broadcast transaction until the node knows it"""
+        for _ in range(attempts):
+            await asyncio.sleep(interval)
+            try:
+                return await self.tx_status(tx_hash, sender_id)
+            except (UnknownTransactionError, RpcTimeoutError):
+                continue
+        raise RpcTimeoutError({"cause": {"name": "TIMEOUT_ERROR"}, "data": f"Transaction {tx_hash} not found"})
+
+
+class PyNearProvider:
+    """py_near provider interface served by a NearRpcClient, so py_near accounts share its connections and errors"""
+
+    def __init__(self, client: NearRpcClient, sender_id: Optional[str] = None):
+        self.client = client
+        # py_near hands the receiver to send_tx_and_wait, the status of a transaction is looked up by its sender
+        self.sender_id = sender_id
+
+    async def get_status(self):
+        return await self.client.status()
+
+    async def get_account(self, account_id, finality="optimistic"):
+        return await self.client.view_account(account_id, finality)
+
+    async def get_access_key(self, account_id, public_key, finality="optimistic"):
+        return await self.client.view_access_key(account_id, public_key, finality)
+
+    async def get_access_key_list(self, account_id, finality="optimistic"):
+        return await self.client.view_access_key_list(account_id, finality)
+
+    async def view_call(self, account_id, method_name, args: bytes, finality="optimistic", block_id=None, threshold=None):
+        return await self.client.call_function(
+            account_id, method_name, base64.b64encode(args).decode('utf-8'), finality, block_id
+        )
+
+    async def send_tx(self, signed_tx: str):
+        return await self.client.broadcast_tx_async(signed_tx)
+
+    async def send_tx_included(self, signed_tx: str):
+        return await self.client.send_tx(signed_tx, "INCLUDED")
+
+    async def send_tx_and_wait(self, signed_tx: str, trx_hash: Optional[str] = None, receiver_id: Optional[str] = None):
+        from py_near.models import TransactionResult
+
+        try:
+            result = await self.client.broadcast_tx_commit(signed_tx)
+        except RpcTimeoutError:
+            if not (trx_hash and receiver_id):
+                raise
+            result = await self.client.wait_for_tx(trx_hash, self.sender_id or receiver_id)
+        return TransactionResult(**result)
+
+    async def get_tx(self, tx_hash, tx_recipient_id):
+        from py_near.models import TransactionResult
+
+        return TransactionResult(**await self.client.tx_status(tx_hash, tx_recipient_id))
+
+    async def shutdown(self):
+        # The connections belong to the shared pool, not to the account
+        pass
+
+
+_clients: Dict[str, NearRpcClient] = {}
+
+
+def get_rpc_client(network: str) -> NearRpcClient:
+    """Process wide client per network on top of the shared endpoint pool"""
+    network = 'mainnet' if network == 'mainnet' else 'testnet'
+    pool = get_endpoint_pool(network)
+    client = _clients.get(network)
+    if client is None or client.pool is not pool:
+        client = _clients[network] = NearRpcClient(pool)
+    return client
+
+
+def near_account(account_id: str, private_key: str, network: str):
+    """py_near Account whose calls go through the shared client instead of its own provider"""
+    from py_near.account import Account
+
+    client = get_rpc_client(network)
+    account = Account(account_id, private_key, client.pool.ranked())
+    account._provider = PyNearProvider(client, account_id)
+    return account
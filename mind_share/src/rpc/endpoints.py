@@ -0,0 +1,291 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+import weakref
+
+from collections import deque
+from typing import Any, Dict, List, Optional
+from src.constants import RPC_ENDPOINTS
+from src.telemetry import log
+
+DEFAULT_TIMEOUT = 10.0  # seconds per request
+# Calls that wait for execution outlast the node's own wait, after which it answers TIMEOUT_ERROR itself
+METHOD_TIMEOUTS = {"broadcast_tx_commit": 30.0, "send_tx": 30.0}
+DEFAULT_HEDGE_PERCENTILE = 0.9
+MIN_HEDGE_DELAY = 0.05  # seconds, hedging earlier only doubles the load
+MAX_HEDGE_DELAY = 2.0
+LATENCY_WINDOW = 100  # samples kept per endpoint
+COOLDOWN = 30.0  # seconds an endpoint is skipped after repeated failures
+FAILURES_BEFORE_COOLDOWN = 3
+
+# Read-only methods that are safe to send twice
+IDEMPOTENT_METHODS = {"query", "block", "chunk", "status", "tx", "EXPERIMENTAL_tx_status", "gas_price", "validators"}
+
+
+class RpcError(Exception):
+    """Error answered by the node, retrying it on another endpoint gives the same answer"""
+
+    def __init__(self, error: Dict[str, Any]):
+        self.error = error
+        super().__init__(str(error))
+
+    @property
+    def cause(self) -> Optional[str]:
+        cause = self.error.get('cause') if isinstance(self.error, dict) else None
+        return cause.get('name') if isinstance(cause, dict) else None
+
+
+class UnknownAccountError(RpcError):
+    """The account does not exist (yet)"""
+
+
+class UnknownAccessKeyError(RpcError):
+    """The access key is not registered on the account"""
+
+
+class UnknownTransactionError(RpcError):
+    """The transaction is not known to the node yet"""
+
+
+class InvalidTransactionError(RpcError):
+    """The transaction was rejected before execution"""
+
+
+class InvalidNonceError(InvalidTransactionError):
+    """The nonce of the transaction is not above the nonce of its access key"""
+
+
+class ContractExecutionError(RpcError):
+    """A view call panicked in the contract"""
+
+
+class RpcTimeoutError(RpcError):
+    """The node gave up waiting, the transaction may still land"""
+
+
+ERROR_CAUSES = {
+    "UNKNOWN_ACCOUNT": UnknownAccountError,
+    "UNKNOWN_ACCESS_KEY": UnknownAccessKeyError,
+    "UNKNOWN_TRANSACTION": UnknownTransactionError,
+    "INVALID_TRANSACTION": InvalidTransactionError,
+    "CONTRACT_EXECUTION_ERROR": ContractExecutionError,
+    "TIMEOUT_ERROR": RpcTimeoutError,
+}
+
+
+def rpc_error(error) -> RpcError:
+    """Typed exception for an RPC error object"""
+    error_class = RpcError
+    if isinstance(error, dict):
+        cause = error.get('cause')
+        error_class = ERROR_CAUSES.get(cause.get('name') if isinstance(cause, dict) else None, RpcError)
+        if error_class is InvalidTransactionError and "InvalidNonce" in json.dumps(error.get('data')):
+            error_class = InvalidNonceError
+    return error_class(error)
+
+
+class EndpointUnavailable(Exception):
+    """Every endpoint failed at the transport level"""
+
+
+class EndpointStats:
+    """Latency samples and health of one RPC endpoint"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+
+    def record_failure(self):
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= FAILURES_BEFORE_COOLDOWN:
+            self.down_until = time.time() + COOLDOWN
+
+    @property
+    def available(self) -> bool:
+        return self.down_until <= time.time()
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(fraction * len(ordered)))
+        return ordered[index]
+
+    def score(self) -> float:
+        """Lower is better, median latency inflated by the recent failure rate"""
+        if not self.available:
+            return float('inf')
+        median = self.percentile(0.5)
+        if median is None:
+            # Untried endpoints get a chance before slow known ones
+            median = 0.0
+        total = self.successes + self.failures
+        failure_rate = self.failures / total if total else 0.0
+        return median * (1 + 4 * failure_rate) + self.consecutive_failures
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "successes": self.successes,
+            "failures": self.failures,
+            "available": self.available,
+        }
+
+
+class RpcEndpointPool:
+    """NEAR JSON-RPC endpoints ranked by health and latency, with failover and hedged read calls"""
+
+    def __init__(self, urls: List[str], timeout: float = DEFAULT_TIMEOUT, hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+                 method_timeouts: Optional[Dict[str, float]] = None):
+        if not urls:
+            raise ValueError("At least one RPC endpoint is required")
+        self.stats = {url: EndpointStats(url) for url in urls}
+        self.timeout = timeout
+        self.method_timeouts = METHOD_TIMEOUTS if method_timeouts is None else method_timeouts
+        self.hedge_percentile = hedge_percentile
+        # One connection pool per event loop, the simulator runs a loop per thread
+        self._clients = weakref.WeakKeyDictionary()
+        self._ids = itertools.count(1)
+
+    def _get_client(self):
+        loop = asyncio.get_event_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            import httpx
+
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+            )
+            self._clients[loop] = client
+        return client
+
+    async def close(self):
+        """Close the connections opened from the running loop"""
+        client = self._clients.pop(asyncio.get_event_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def ranked(self) -> List[str]:
+        """Endpoints from best to worst, endpoints in cooldown go last"""
+        return sorted(self.stats, key=lambda url: self.stats[url].score())
+
+    def primary(self) -> str:
+        return self.ranked()[0]
+
+    def hedge_delay(self, url: str) -> float:
+        latency = self.stats[url].percentile(self.hedge_percentile)
+        if latency is None:
+            return MAX_HEDGE_DELAY
+        return min(MAX_HEDGE_DELAY, max(MIN_HEDGE_DELAY, latency))
+
+    async def _post(self, url: str, method: str, params) -> Any:
+        import httpx
+
+        payload = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+        timeout = self.method_timeouts.get(method, self.timeout)
+        start = time.perf_counter()
+        try:
+            response = await self._get_client().post(url, json=payload, timeout=timeout)
+            response.raise_for_status()
+            content = response.json()
+        except httpx.TimeoutException as e:
+            if method in self.method_timeouts:
+                # The transaction may still land, the caller polls tx instead of broadcasting it to the next endpoint
+                raise RpcTimeoutError({"cause": {"name": "TIMEOUT_ERROR"}, "data": f"No answer from {url} in {timeout}s"}) from e
+            self.stats[url].record_failure()
+            raise
+        except (httpx.HTTPError, ValueError):
+            self.stats[url].record_failure()
+            raise
+
+        self.stats[url].record_success(time.perf_counter() - start)
+        if "error" in content:
+            raise rpc_error(content["error"])
+        return content.get("result")
+
+    async def call(self, method: str, params, hedge: Optional[bool] = None) -> Any:
+        """Send a JSON-RPC call, failing over on transport errors and hedging idempotent ones"""
+        if hedge is None:
+            hedge = method in IDEMPOTENT_METHODS
+        if hedge and len(self.stats) > 1:
+            return await self._hedged_call(method, params)
+
+        last_error = None
+        for url in self.ranked():
+            try:
+                return await self._post(url, method, params)
+            except RpcError:
+                raise
+            except Exception as e:
+                log.warning("rpc.failover", f"RPC {url} failed for {method}: {str(e)}, failing over", url=url, method=method)
+                last_error = e
+        raise EndpointUnavailable(f"All RPC endpoints failed for {method}: {last_error}")
+
+    async def _hedged_call(self, method: str, params) -> Any:
+        """Start on the best endpoint and send a duplicate to the next one if it is slower than its usual tail"""
+        candidates = self.ranked()
+        pending = set()
+        last_error = None
+        try:
+            while candidates or pending:
+                if candidates:
+                    url = candidates.pop(0)
+                    pending.add(asyncio.ensure_future(self._post(url, method, params)))
+                    wait_for = self.hedge_delay(url) if candidates else None
+                else:
+                    wait_for = None
+
+                done, pending = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    if isinstance(error, RpcError):
+                        raise error
+                    last_error = error
+        finally:
+            for task in pending:
+                task.cancel()
+        raise EndpointUnavailable(f"All RPC endpoints failed for {method}: {last_error}")
+
+    def report(self) -> List[Dict[str, Any]]:
+        return [self.stats[url].to_dict() for url in self.ranked()]
+
+
+_pools: Dict[str, RpcEndpointPool] = {}
+
+
+def get_rpc_endpoints(network: str) -> List[str]:
+    """Endpoints from NEAR_RPC_ENDPOINTS (comma separated) or the defaults of the network"""
+    configured = os.getenv('NEAR_RPC_ENDPOINTS')
+    if configured:
+        return [url.strip() for url in configured.split(',') if url.strip()]
+    return list(RPC_ENDPOINTS['mainnet' if network == 'mainnet' else 'testnet'])
+
+
+def reset_endpoint_pools():
+    """Forget the pools, the next get_endpoint_pool reads NEAR_RPC_ENDPOINTS again"""
+    _pools.clear()
+
+
+def get_endpoint_pool(network: str) -> RpcEndpointPool:
+    """Process wide pool per network, so every caller shares the same health data"""
+    if network not in _pools:
+        _pools[network] = RpcEndpointPool(get_rpc_endpoints(network))
+    return _pools[network]
@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import json
+import time
+
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+DEFAULT_TTL = 1.0  # seconds, about one NEAR block
+
+
+def args_hash(args: Union[Dict[str, Any], bytes]) -> str:
+    if isinstance(args, bytes):
+        return hashlib.sha256(args).hexdigest()
+    return hashlib.sha256(json.dumps(args, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def result_block_height(result) -> Optional[int]:
+    """Block height of a view result, a ViewFunctionResult, a block or a node status, None for anything else"""
+    if isinstance(result, dict):
+        height = result.get('block_height')
+        if height is None:
+            height = (result.get('header') or {}).get('height') or (result.get('sync_info') or {}).get('latest_block_height')
+    else:
+        height = getattr(result, 'block_height', None)
+    try:
+        return int(height) if height is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class CacheEntry:
+    def __init__(self, value, block_height: Optional[int], expires_at: float, block_aware: bool):
+        self.value = value
+        self.block_height = block_height
+        self.expires_at = expires_at
+        self.block_aware = block_aware
+
+
+class ViewCallCache:
+    """Caches view call results by (contract, method, args hash) until a newer block is seen or the TTL expires"""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.latest_block_height = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple[str, str, str], CacheEntry] = {}
+        # Keyed by event loop too, the simulator shares one client between the loops of its threads
+        self._inflight: Dict[Tuple[int, Tuple[str, str, str]], asyncio.Future] = {}
+
+    @staticmethod
+    def key(contract_id: str, method_name: str, args: Dict[str, Any]) -> Tuple[str, str, str]:
+        return (contract_id, method_name, args_hash(args))
+
+    def observe_block(self, block_height: Optional[int]):
+        """Record a block height seen anywhere, entries read at older heights stop being served"""
+        if block_height is not None and block_height > self.latest_block_height:
+            self.latest_block_height = block_height
+
+    def _valid(self, entry: CacheEntry) -> bool:
+        if entry.expires_at <= self.clock():
+            return False
+        if entry.block_aware and entry.block_height is not None:
+            return entry.block_height >= self.latest_block_height
+        return True
+
+    def lookup(self, contract_id: str, method_name: str, args: Dict[str, Any]):
+        """Return (True, value) on a hit and (False, None) on a miss"""
+        key = self.key(contract_id, method_name, args)
+        entry = self._entries.get(key)
+        if entry is not None and self._valid(entry):
+            self.hits += 1
+            return True, entry.value
+        if entry is not None:
+            self._entries.pop(key, None)
+        self.misses += 1
+        return False, None
+
+    def store(self, contract_id: str, method_name: str, args: Dict[str, Any], value,
+              ttl: Optional[float] = None, block_aware: bool = True):
+        block_height = result_block_height(value)
+        self.observe_block(block_height)
+        self._entries[self.key(contract_id, method_name, args)] = CacheEntry(
+            value, block_height, self.clock() + (self.ttl if ttl is None else ttl), block_aware
+        )
+
+    async def call(self, contract_id: str, method_name: str, args: Dict[str, Any],
+                   fetch: Callable[[], Awaitable[Any]], ttl: Optional[float] = None, block_aware: bool = True):
+        """Serve from cache, or run fetch once for all identical concurrent calls"""
+        hit, value = self.lookup(contract_id, method_name, args)
+        if hit:
+            return value
+
+        loop = asyncio.get_event_loop()
+        key = (id(loop), self.key(contract_id, method_name, args))
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        self.store(contract_id, method_name, args, value, ttl=ttl, block_aware=block_aware)
+        future.set_result(value)
+        return value
+
+    def invalidate(self, contract_id: Optional[str] = None, method_name: Optional[str] = None):
+        """Drop entries of a contract and/or method, everything if neither is given"""
+        for key in list(self._entries):
+            if contract_id is not None and key[0] != contract_id:
+                continue
+            if method_name is not None and key[1] != method_name:
+                continue
+            self._entries.pop(key, None)
@@ -0,0 +1,152 @@
+import asyncio
+import contextlib
+import contextvars
+import os
+import time
+
+from typing import Dict, Iterator, List, Optional, Tuple
+from src.telemetry import log
+
+DEFAULT_CYCLE_BUDGET = 240.0  # seconds, leaves a default SCHEDULE_INTERVAL of 300 some slack
+DEFAULT_SETUP_BUDGET = 900.0  # seconds for setup, funding an ephemeral account alone may take 300
+DEFAULT_SHARES = "registration=0.1,agent=0.5,trades=0.4"
+
+_budget: contextvars.ContextVar[Optional["CycleBudget"]] = contextvars.ContextVar("cycle_budget", default=None)
+_deadline: contextvars.ContextVar[Optional["Deadline"]] = contextvars.ContextVar("stage_deadline", default=None)
+
+
+class StageTimeout(TimeoutError):
+    """A stage ran past its share of the cycle budget and was cancelled"""
+
+    def __init__(self, stage: str, seconds: float):
+        super().__init__(f"Stage {stage} ran out of its {seconds:.1f}s budget")
+        self.stage = stage
+        self.seconds = seconds
+
+
+class Deadline:
+    def __init__(self, seconds: Optional[float], clock=time.monotonic, name: str = "cycle"):
+        self.clock = clock
+        self.name = name
+        self.seconds = seconds
+        self.expires_at = None if seconds is None else clock() + seconds
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, None when unlimited"""
+        return None if self.expires_at is None else max(0.0, self.expires_at - self.clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and self.clock() >= self.expires_at
+
+
+def time_left(default: Optional[float] = None) -> Optional[float]:
+    """Timeout for a call, default capped by what is left of the current stage and cycle"""
+    budget = _budget.get()
+    deadlines = (_deadline.get(), budget.deadline if budget is not None else None)
+    left = [deadline.remaining() for deadline in deadlines if deadline is not None and deadline.expires_at is not None]
+    if default is not None:
+        left.append(default)
+    return min(left) if left else None
+
+
+def call_timeout(default: Optional[float] = None) -> Optional[float]:
+    """time_left for a blocking library call, StageTimeout once nothing is left since a zero timeout is rejected or fires at once"""
+    left = time_left(default)
+    if left is not None and left <= 0:
+        budget = _budget.get()
+        spent = [deadline for deadline in (_deadline.get(), budget.deadline if budget is not None else None)
+                 if deadline is not None and deadline.expired]
+        if spent:
+            raise StageTimeout(spent[0].name, spent[0].seconds)
+    return left
+
+
+async def sleep(seconds: float):
+    """Retry pause that never runs past the current stage or cycle"""
+    await asyncio.sleep(time_left(seconds))
+
+
+def current_budget() -> Optional["CycleBudget"]:
+    return _budget.get()
+
+
+class CycleBudget:
+    """Total time of a cycle divided across its stages in order, time a stage leaves unused goes to the ones after it"""
+
+    def __init__(self, total: Optional[float], shares: List[Tuple[str, float]], clock=time.monotonic):
+        self.total = total
+        self.shares = shares
+        self.clock = clock
+        self.deadline = Deadline(total, clock)
+        self.spent: Dict[str, float] = {}
+
+    @classmethod
+    def from_env(cls, total_var: str = 'CYCLE_BUDGET', default_total: float = DEFAULT_CYCLE_BUDGET) -> "CycleBudget":
+        """CYCLE_BUDGET seconds, 0 for no limit, split by CYCLE_BUDGET_SHARES (stage=share, in cycle order)"""
+        total = float(os.getenv(total_var) or default_total)
+        shares = []
+        for part in (os.getenv('CYCLE_BUDGET_SHARES') or DEFAULT_SHARES).split(','):
+            name, _, share = part.partition('=')
+            shares.append((name.strip(), float(share)))
+        return cls(total if total > 0 else None, shares)
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline.expired
+
+    def allowance(self, stage: str) -> Optional[float]:
+        """Share of the remaining budget for a stage, against the shares of the stages still to come"""
+        remaining = self.deadline.remaining()
+        if remaining is None:
+            return None
+        names = [name for name, _ in self.shares]
+        if stage not in names:
+            return remaining
+        later = self.shares[names.index(stage):]
+        return remaining * dict(self.shares)[stage] / sum(share for _, share in later)
+
+    @contextlib.contextmanager
+    def activate(self) -> Iterator["CycleBudget"]:
+        """Make this the budget of the stages run in the block"""
+        token = _budget.set(self)
+        try:
+            yield self
+        finally:
+            _budget.reset(token)
+
+    def report(self) -> Dict[str, float]:
+        return {name: round(seconds, 3) for name, seconds in self.spent.items()}
+
+
+@contextlib.asynccontextmanager
+async def stage(name: str):
+    """Run the block within its allowance of the current budget, cancelling it with StageTimeout once that runs out"""
+    budget = _budget.get()
+    seconds = budget.allowance(name) if budget is not None else None
+    token = _deadline.set(Deadline(seconds, name=name))
+    started = time.monotonic()
+    # Cancel the task from a timer rather than asyncio.timeout, which needs Python 3.11 and the image runs 3.9
+    task = asyncio.current_task()
+    expired = []
+
+    def expire():
+        expired.append(True)
+        task.cancel()
+
+    timer = asyncio.get_running_loop().call_later(seconds, expire) if seconds is not None else None
+    try:
+        yield
+    except asyncio.CancelledError as e:
+        if not expired:
+            raise
+        if hasattr(task, 'uncancel'):
+            task.uncancel()  # 3.11+ counts cancellations, this one ends here
+        log.warning("deadline.stage_timeout", f"Stage {name} cancelled after {seconds:.1f}s", stage=name, budget=seconds)
+        raise StageTimeout(name, seconds) from e
+    finally:
+        if timer is not None:
+            timer.cancel()
+        _deadline.reset(token)
+        if budget is not None:
+            budget.spent[name] = budget.spent.get(name, 0.0) + time.monotonic() - started
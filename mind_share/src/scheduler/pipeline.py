@@ -0,0 +1,145 @@
+import asyncio
+import time
+
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_QUEUE_SIZE = 4  # items waiting between two stages before the upstream one blocks
+
+_DONE = object()
+CANCELLED = "cancelled"  # stopped_at of the items still in flight when the run was cancelled
+
+
+class Stage:
+    """One step of the pipeline, handler returns the value for the next stage or None to stop the item there"""
+
+    def __init__(self, name: str, handler: Callable[[Any], Any], concurrency: int = 1, blocking: bool = False):
+        if concurrency < 1:
+            raise ValueError(f"Stage {name} needs at least one worker")
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        # Blocking handlers run in the default executor so they never stall the loop
+        self.blocking = blocking
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0.0
+        self.max_backlog = 0
+
+    async def call(self, value):
+        if self.blocking:
+            return await asyncio.to_thread(self.handler, value)
+        return await self.handler(value)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "concurrency": self.concurrency,
+            "processed": self.processed,
+            "failed": self.failed,
+            "busy": self.busy,
+            "max_backlog": self.max_backlog,
+        }
+
+
+class PipelineItem:
+    def __init__(self, index: int, value):
+        self.index = index
+        self.value = value
+        self.completed = False
+        self.stopped_at: Optional[str] = None
+        self.error: Optional[str] = None
+        # Stages the item has entered, one past the index of the stage it is in
+        self.position = 0
+
+
+class StagedPipeline:
+    """Runs items through stages joined by bounded queues, so item N+1 is in one stage while item N is in the next"""
+
+    def __init__(self, stages: List[Stage], queue_size: int = DEFAULT_QUEUE_SIZE, on_progress: Optional[Callable[[], None]] = None):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = stages
+        self.queue_size = queue_size
+        # Called whenever an item leaves a stage, moved on or stopped
+        self.on_progress = on_progress
+        self.items: List[PipelineItem] = []
+
+    def upstream_of(self, name: str) -> int:
+        """Items that may still enter the named stage, inside a stage before it or queued for it"""
+        index = [stage.name for stage in self.stages].index(name)
+        return sum(1 for item in self.items if not item.completed and item.stopped_at is None and item.position <= index)
+
+    async def _work(self, stage: Stage, queue: asyncio.Queue, next_stage: Optional[Stage], next_queue: Optional[asyncio.Queue]):
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            try:
+                await self._process(item, stage, next_stage, next_queue)
+            finally:
+                if self.on_progress is not None:
+                    self.on_progress()
+
+    async def _process(self, item: PipelineItem, stage: Stage, next_stage: Optional[Stage], next_queue: Optional[asyncio.Queue]):
+        item.position += 1
+        start = time.perf_counter()
+        try:
+            value = await stage.call(item.value)
+        except Exception as e:
+            stage.failed += 1
+            item.error = str(e)
+            item.stopped_at = stage.name
+            return
+        finally:
+            stage.busy += time.perf_counter() - start
+        stage.processed += 1
+        if value is None:
+            item.stopped_at = stage.name
+            return
+        item.value = value
+        if next_queue is None:
+            item.completed = True
+        else:
+            # Blocks while the next stage is max queue_size items behind, which holds this stage back too
+            await next_queue.put(item)
+            next_stage.max_backlog = max(next_stage.max_backlog, next_queue.qsize())
+
+    async def _run_stage(self, index: int, queues: List[asyncio.Queue]):
+        stage = self.stages[index]
+        last = index + 1 == len(self.stages)
+        next_stage = None if last else self.stages[index + 1]
+        next_queue = None if last else queues[index + 1]
+        await asyncio.gather(*(
+            self._work(stage, queues[index], next_stage, next_queue) for _ in range(stage.concurrency)
+        ))
+        if next_queue is not None:
+            # Every worker of the next stage stops once this stage has drained
+            for _ in range(next_stage.concurrency):
+                await next_queue.put(_DONE)
+
+    async def _feed(self, items: List[PipelineItem], queue: asyncio.Queue):
+        for item in items:
+            await queue.put(item)
+        for _ in range(self.stages[0].concurrency):
+            await queue.put(_DONE)
+
+    async def run(self, values: List[Any]) -> List[PipelineItem]:
+        """Push every value through the stages and return them in input order once all have left the pipeline"""
+        items = [PipelineItem(index, value) for index, value in enumerate(values)]
+        # Readable while the run is cancelled, so the items that made it through are still known
+        self.items = items
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        try:
+            await asyncio.gather(
+                self._feed(items, queues[0]),
+                *(self._run_stage(index, queues) for index in range(len(self.stages)))
+            )
+        except asyncio.CancelledError:
+            for item in items:
+                if not item.completed and item.stopped_at is None:
+                    item.stopped_at = CANCELLED
+            raise
+        return items
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [stage.stats() for stage in self.stages]
@@ -4,59 +4,130 @@ import os
 import json
 import asyncio
 import base58
-import base64
-import hashlib
-import binascii
-import near_api
-
-from hashlib import sha256
-from coincurve import PublicKey
-from datetime import datetime
+
 from dotenv import load_dotenv
-from ecdsa import VerifyingKey, SECP256k1, BadSignatureError, util
-from ecdsa.util import sigdecode_string, sigdecode_der
-from typing import Dict, Any
-from eth_keys import keys
-from eth_utils import decode_hex
-from near_api.providers import JsonProvider, JsonProviderError
+from typing import Dict, Any, Optional
 
+# Crypto and RPC libraries are imported where they are first needed, see src/bench/startup.py
+from src.agent.balances import get_account_balances
 from src.worker.keypair import AgentWorker
-from src.quote.generate_quote import process_llm_suggestion
+from src.quote.generate_quote import parse_llm_response, quote_trade
+from src.contract.dry_run import LocalSigner
 from src.contract.sign_intent import SignIntentContract
+from src.contract.tx_tracker import TransactionTracker
 from src.quote.generate_quote import create_commitment_from_mpc_signature_using_rsv
-from src.quote.generate_quote import publish_intent
 from src.quote.generate_quote import PublishIntent
-from src.constants import AGENT_PATH
+from src.quote.publisher import IntentPublisher, RelayClient, SettlementTracker
+from src.quote.serializer import SerializedQuote
+from src.constants import AGENT_PATH, WORKER_POOL_PATH
+from src.rpc.client import get_rpc_client
+from src.rpc.endpoints import UnknownAccountError, get_endpoint_pool
+from src.scheduler import deadline
+from src.scheduler.deadline import DEFAULT_SETUP_BUDGET, CycleBudget, StageTimeout, current_budget
+from src.scheduler.pipeline import CANCELLED, DEFAULT_QUEUE_SIZE, Stage, StagedPipeline
+from src.telemetry import log
+from src.telemetry.profiling import CycleProfiler
+from src.telemetry.tracing import get_tracer
 load_dotenv(override=True)
 
+AGENT_RETRY_DELAY = 2  # seconds between agent attempts, cut short by the cycle budget
+
 class MindshareScheduler:
-    def __init__(self, interval=300):
+    def __init__(self, interval=300, worker_pool=None, shared=None):
         self.interval = interval
         self.agent_path = AGENT_PATH
         self.api_key = os.getenv('KAITO_API_KEY')
         self.account_id = os.getenv('INTENT_ACCOUNT_ID')
         self.private_key = os.getenv('INTENT_PRIVATE_KEY')
         self.network = os.getenv('NETWORK')
-        self.worker = AgentWorker()
+        # Portfolios run by one sharded replica share its worker, sign contract and tx tracker
+        self.shared = shared
+        self.worker = shared.worker if shared is not None else AgentWorker()
+        self.worker_pool = worker_pool
         self.sign_contract = None 
+        self.tx_tracker = None
+        self.sign_timeout = int(os.getenv('SIGN_TX_TIMEOUT', '60'))
+        self.profiler = CycleProfiler.from_env()
+        # Workers per pipeline stage, signing is further capped by the access keys the contract can use
+        self.pipeline_concurrency = {
+            "quote": int(os.getenv('PIPELINE_QUOTE_CONCURRENCY', '2')),
+            "sign": int(os.getenv('PIPELINE_SIGN_CONCURRENCY') or '0'),
+            "publish": int(os.getenv('PIPELINE_PUBLISH_CONCURRENCY', '8')),
+        }
+        self.pipeline_queue_size = int(os.getenv('PIPELINE_QUEUE_SIZE', str(DEFAULT_QUEUE_SIZE)))
+        # PUBLISH_RELAY_URL sends intents to a stand-in relay while quotes still come from SOLVER_BUS_URL
+        self.relay = RelayClient(os.getenv('PUBLISH_RELAY_URL'))
+        self.publisher = IntentPublisher(
+            self.relay,
+            batch_window=float(os.getenv('PUBLISH_BATCH_WINDOW_MS', '20')) / 1000,
+            max_batch=int(os.getenv('PUBLISH_MAX_BATCH', '20')),
+            max_wait=float(os.getenv('PUBLISH_BATCH_MAX_WAIT_MS', '2000')) / 1000
+        )
+        self.settlements = SettlementTracker(self.relay, poll_interval=float(os.getenv('SETTLEMENT_POLL_INTERVAL', '2')))
+        self.settlements.on_settled(self.apply_settlement)
+        # Balances of the last agent run, moved by every intent that settled since
+        self.balances = {}
+        # Agent runs handed the known balances before they are read from chain again, 0 reads them every cycle
+        self.balances_refresh_cycles = int(os.getenv('BALANCES_REFRESH_CYCLES', '10'))
+        self.cycles_since_read = 0
+        self.given_up_at_read = 0
+        # Set by the sharded runner, cycles only run while this replica holds the portfolio's lease
+        self.lease = None
 
     async def setup(self, max_attempts=3, retry_delay=10):
-        """Initialize everything in the correct order with retries"""
+        """Initialize everything in the correct order with retries, a shared worker is set up by the first portfolio"""
+        if self.shared is None:
+            return await self._setup(max_attempts, retry_delay)
+        async with self.shared.lock:
+            self.sign_contract, self.tx_tracker = self.shared.sign_contract, self.shared.tx_tracker
+            ready = await self._setup(max_attempts, retry_delay)
+            self.shared.sign_contract, self.shared.tx_tracker = self.sign_contract, self.tx_tracker
+        if ready:
+            self.shared.attach(self)
+        return ready
+
+    async def _setup(self, max_attempts, retry_delay):
         for attempt in range(max_attempts):
+            budget = current_budget()
+            if budget is not None and budget.expired:
+                log.error("setup.out_of_budget", "Setup budget spent, giving up")
+                break
             try:
                 account_id = None
                 signing_key = None
                 
-                if not self.worker.use_static_account:
-                    print(f"\nSetting up ephemeral account (Attempt {attempt + 1}/{max_attempts})")
-                    account_id, signing_key = self.worker.derive_ephemeral_account()
-                    
-                    funded = await self.wait_for_funds(timeout=300)
+                sealed = self.worker.identity_store is not None and self.worker.identity_store.exists()
+                # A dry run never sends a transaction, its account needs no funds
+                dry_run = LocalSigner.from_env() is not None
+                if not self.worker.use_static_account and self.worker.account is None:
+                    if self.worker_pool is not None and not sealed and not dry_run:
+                        # The pool hands out accounts that are already funded and registered, and keeps their keys sealed
+                        log.info("setup.pooled_account", f"Waiting for an account of the worker pool (Attempt {attempt + 1}/{max_attempts})",
+                                 pending_funding=self.worker_pool.pending_funding())
+                        pooled = await self.worker_pool.wait_for_ready(timeout=deadline.time_left(300))
+                        if pooled is not None:
+                            log.info("setup.pooled_account", f"Using pooled account {pooled.account_id}, already funded and registered")
+                            self.worker.set_identity(pooled.signing_key)
+                            if self.worker.identity_store is not None:
+                                # A restart restores it from the seal, the pool never hands it out again
+                                self.worker.identity_store.seal(self.worker.account_id, self.worker.signing_key)
+                        funded = pooled is not None
+                    else:
+                        log.info("setup.ephemeral_account", f"Setting up ephemeral account (Attempt {attempt + 1}/{max_attempts})")
+                        self.worker.derive_ephemeral_account()
+                        if dry_run:
+                            log.info("setup.dry_run", "Dry run, the ephemeral account is not funded", account_id=self.worker.account_id)
+                            funded = True
+                        else:
+                            funded = await self.wait_for_funds(timeout=deadline.time_left(300))
+                    account_id = self.worker.account_id
+                    signing_key = self.worker.signing_key
+
                     if not funded:
-                        print("[ERROR] Account funding timeout reached")
+                        log.error("setup.funding_timeout", "Account funding timeout reached")
                         if attempt < max_attempts - 1:
-                            print(f"[LOG] Retrying setup in {retry_delay} seconds...")
-                            await asyncio.sleep(retry_delay)
+                            log.info("setup.retry", f"Retrying setup in {retry_delay} seconds...")
+                            await deadline.sleep(retry_delay)
                             continue
                         raise Exception("Failed to fund account after all attempts")
                 else:
@@ -73,52 +144,77 @@ class MindshareScheduler:
                         worker_account=self.worker.account  
                     )
                     await self.sign_contract.startup()
+
+                if self.tx_tracker is None:
+                    self.tx_tracker = TransactionTracker(
+                        self.worker.account.provider,
+                        self.worker.account_id,
+                        poll_interval=float(os.getenv('TX_POLL_INTERVAL', '2'))
+                    )
+                    self.tx_tracker.on_result("sign_trade", self.shared.resume_sign_trade if self.shared else self.resume_sign_trade)
+                    self.tx_tracker.start()
+                self.settlements.start()
                 
                 registration_success = await self.register_worker(max_attempts=3, retry_delay=10)
                 if registration_success:
-                    print("Setup completed successfully")
+                    await self.setup_access_keys()
+                    log.info("setup.done", "Setup completed successfully")
                     return True
                     
             except Exception as e:
-                print(f"[ERROR] Setup attempt {attempt + 1} failed: {str(e)}")
+                log.error("setup.failed", f"Setup attempt {attempt + 1} failed: {str(e)}")
                 if attempt < max_attempts - 1:
-                    print(f"[LOG] Retrying setup in {retry_delay} seconds...")
-                    await asyncio.sleep(retry_delay)
+                    log.info("setup.retry", f"Retrying setup in {retry_delay} seconds...")
+                    await deadline.sleep(retry_delay)
                 else:
                     raise Exception(f"Setup failed after {max_attempts} attempts: {str(e)}")
         
         return False
 
+    async def setup_access_keys(self):
+        """Provision extra access keys so contract calls can be signed in parallel"""
+        key_count = int(os.getenv('SIGNING_ACCESS_KEYS', '0'))
+        if key_count <= 0 or self.sign_contract.key_manager is not None or self.sign_contract.dry_run is not None:
+            return
+
+        from src.contract.access_keys import DEFAULT_METHOD_NAMES, AccessKeyManager
+
+        # Function call keys only reach the methods they name, sign_trade_borsh for Borsh args
+        method_names = [self.sign_contract.args_encoding.method(name) for name in DEFAULT_METHOD_NAMES]
+        manager = AccessKeyManager(self.worker.account, contract_id=self.sign_contract.contract_id, size=key_count,
+                                   method_names=method_names)
+        try:
+            await manager.provision()
+            self.sign_contract.key_manager = manager
+        except Exception as e:
+            log.warning("setup.access_keys_failed", f"Access key provisioning failed, calls stay on the account key: {str(e)}")
+
     def get_rpc(self):
-        if self.network == 'mainnet':
-            return 'https://rpc.mainnet.near.org'
-        else:
-            return 'https://rpc.testnet.near.org'
+        """Best ranked endpoint of the shared pool"""
+        return get_endpoint_pool('mainnet' if self.network == 'mainnet' else 'testnet').primary()
 
     async def wait_for_funds(self, timeout=300, check_interval=10):
         """Wait for account to be funded with timeout"""
         start_time = time.time()
 
-        rpc = self.get_rpc()
-        provider = JsonProvider(rpc)
+        client = get_rpc_client(self.network)
 
         while time.time() - start_time < timeout:
             try:
-                # Get account state directly from provider
-                account_state = provider.get_account(self.worker.account_id)
+                # Get account state directly from the shared RPC client
+                account_state = await client.view_account(self.worker.account_id)
                 amount = int(account_state['amount']) / 10**24  # Convert yoctoNEAR to NEAR
                 
                 if amount > 0:
-                    print(f"\nFunds detected! Available balance: {amount} NEAR")
+                    log.info("setup.funded", f"Funds detected! Available balance: {amount} NEAR")
                     return True
                     
-                print(f"Waiting for funds... (timeout in {int(timeout - (time.time() - start_time))}s)")
-            except JsonProviderError as e:
+                log.info("setup.waiting_for_funds", f"Waiting for funds... (timeout in {int(timeout - (time.time() - start_time))}s)")
+            except UnknownAccountError:
                 # This will happen if account doesn't exist yet - this is expected
-                if "does not exist" in str(e):
-                    print(f"Account doesn't exist yet. Waiting for first transfer...")
-                else:
-                    print(f"[LOG] Error checking balance: {str(e)}")
+                log.info("setup.waiting_for_funds", "Account doesn't exist yet. Waiting for first transfer...")
+            except Exception as e:
+                log.warning("setup.balance_check_failed", f"Error checking balance: {str(e)}")
             
             await asyncio.sleep(check_interval)
         return False
@@ -126,119 +222,313 @@ class MindshareScheduler:
     async def register_worker(self, max_attempts=3, retry_delay=10):
         """Register worker with retries"""
         for attempt in range(max_attempts):
+            prefetch = None
             try:
+                # Collect the attestation while get_worker is in flight, retries reuse the cached artifacts
+                if not self.worker.use_static_account and self.sign_contract.dry_run is None:
+                    prefetch = asyncio.ensure_future(self.sign_contract.prepare_attestation())
+
                 is_registered = await self.sign_contract.initialize_worker()
                 if is_registered:
-                    print("Worker already registered")
+                    log.info("registration.known", "Worker already registered")
+                    if prefetch is not None:
+                        prefetch.cancel()
                     return True
+
+                if prefetch is not None:
+                    try:
+                        await prefetch
+                    except Exception as e:
+                        log.warning("registration.prefetch_failed", f"Attestation prefetch failed, registration will retry it: {str(e)}")
                     
-                print("Attempting worker registration...")
+                log.info("registration.start", "Attempting worker registration...")
                 registration_result = await self.sign_contract.register_worker()
                 
                 if registration_result.get("success"):
-                    print("Worker registration successful")
+                    log.info("registration.done", "Worker registration successful")
                     return True
                 else:
-                    print(f"[ERROR] Registration failed: {registration_result.get('error')}")
+                    log.error("registration.failed", "Registration failed", error=registration_result.get('error'))
                     if attempt < max_attempts - 1:
-                        print(f"Retrying registration in {retry_delay} seconds...")
-                        await asyncio.sleep(retry_delay)
+                        log.info("registration.retry", f"Retrying registration in {retry_delay} seconds...")
+                        await deadline.sleep(retry_delay)
                         
             except Exception as e:
-                print(f"[ERROR] Registration attempt {attempt + 1} failed: {str(e)}")
+                if prefetch is not None and not prefetch.done():
+                    prefetch.cancel()
+                log.error("registration.failed", f"Registration attempt {attempt + 1} failed: {str(e)}")
                 if attempt < max_attempts - 1:
-                    print(f"Retrying registration in {retry_delay} seconds...")
-                    await asyncio.sleep(retry_delay)
+                    log.info("registration.retry", f"Retrying registration in {retry_delay} seconds...")
+                    await deadline.sleep(retry_delay)
                     
         return False
 
     async def start(self):
         """Start the scheduler after setup"""
         try:
-            setup_success = await self.setup()
+            if self.worker_pool is not None:
+                self.worker_pool.start()
+            self.profiler.install_signal()
+
+            with CycleBudget.from_env('SETUP_BUDGET', DEFAULT_SETUP_BUDGET).activate():
+                async with deadline.stage("setup"):
+                    setup_success = await self.setup()
             if not setup_success:
                 raise Exception("Failed to complete setup")
                 
             while True:
                 try:
-                    await self.execute_with_worker()
+                    if self.lease is not None and not self.lease():
+                        log.warning("shard.cycle_skipped", f"Lease of {self.account_id} not held, skipping the cycle")
+                        await asyncio.sleep(self.interval)
+                        continue
+                    with CycleBudget.from_env().activate():
+                        await self.refresh_registration()
+                        await self.execute_with_worker()
                     await asyncio.sleep(self.interval)
                 except KeyboardInterrupt:
-                    print("\nManual stop of scheduler")
+                    log.info("scheduler.stop", "Manual stop of scheduler")
                     break
                 except Exception as e:
-                    print(f"Critical error in scheduler: {str(e)}")
+                    log.error("scheduler.cycle_failed", f"Critical error in scheduler: {str(e)}", exc_info=True)
                     await asyncio.sleep(10)
         except Exception as e:
-            print(f"Fatal error in scheduler: {str(e)}")
+            log.error("scheduler.fatal", f"Fatal error in scheduler: {str(e)}", exc_info=True)
             raise
 
+    async def stop(self):
+        """Stop the background trackers and close the relay, when this replica hands the portfolio over"""
+        if self.shared is not None:
+            self.shared.detach(self)
+        elif self.tx_tracker is not None:
+            await self.tx_tracker.stop()
+        await self.settlements.stop()
+        await self.relay.close()
+
+    async def refresh_registration(self):
+        """Check the registration between cycles when it is about to expire, so a cycle never has to register"""
+        if not self.sign_contract.registration.needs_refresh(self.worker.account_id):
+            return
+        try:
+            async with deadline.stage("registration"):
+                log.info("registration.refresh", "Worker registration about to expire, checking it with the contract")
+                if not await self.sign_contract.initialize_worker(refresh=True):
+                    await self.register_worker()
+        except Exception as e:
+            log.warning("registration.refresh_failed", f"Error refreshing worker registration: {str(e)}")
+
     async def execute_with_worker(self):
         """Main execution flow"""
         try:
             await self.execute_agent()
                 
         except Exception as e:
-            print(f"[ERROR] Error in worker execution: {str(e)}")
+            log.error("cycle.failed", f"Error in worker execution: {str(e)}", exc_info=True)
 
-    async def sign_quotes(self, response):
-        """Sign each quote in the response"""
-        if not response.get('success'):
-            return response
-            
+    def build_pipeline(self) -> StagedPipeline:
+        """Quote, sign and publish stages, so a trade is signed while the next one is still being quoted"""
+        sign_limit = self.sign_contract.signing_concurrency()
+        return StagedPipeline([
+            Stage("quote", self._quote_stage, self.pipeline_concurrency["quote"], blocking=True),
+            Stage("sign", self._sign_stage, min(self.pipeline_concurrency["sign"] or sign_limit, sign_limit)),
+            Stage("publish", self._publish_stage, self.pipeline_concurrency["publish"]),
+        ], queue_size=self.pipeline_queue_size, on_progress=self.publisher.poke)
+
+    def _quote_stage(self, trade):
+        return quote_trade(self.account_id, trade)
+
+    async def _sign_stage(self, result):
+        await self.sign_execution_result(result)
+        if result.get('pending_tx'):
+            log.info("sign.pending", f"Signature pending in {result['pending_tx']}, it will be published when it lands")
+            return None
+        return result if 'sign_result' in result else None
+
+    async def _publish_stage(self, result):
+        await self.publish_signed_result(result)
+        return result
+
+    def known_balances(self) -> Optional[dict]:
+        """Balances the next agent run can start from instead of reading them, None while they may be off"""
+        if not self.balances or self.cycles_since_read >= self.balances_refresh_cycles:
+            return None
+        if self.settlements.pending or self.settlements.given_up != self.given_up_at_read:
+            return None
+        return self.balances
+
+    async def read_balances(self) -> Optional[dict]:
+        """Balances read through the shared RPC client and its view cache, None when the agent has to read them itself"""
+        if not self.account_id:
+            return None
         try:
-            execution_results = response.get('execution_results', [])
+            async with deadline.stage("balances"):
+                balances = await get_account_balances(get_rpc_client(self.network), self.account_id)
+        except Exception as e:
+            log.warning("balances.read_failed", f"Could not read balances, the agent reads them: {str(e)}")
+            return None
+        return balances or None
+
+    def apply_settlement(self, intent):
+        """Move the known balances by a settled intent, so they are current without reading them again"""
+        for token, change in intent.balance_changes().items():
+            self.balances[token] = self.balances.get(token, 0) + change
+        log.info("balances.settled", f"Balances after intent {intent.intent_hash}", balances=self.balances)
+
+    async def sign_execution_result(self, result):
+        """Sign the quote of one execution result in place"""
+        trade = result.get('trade', {})
+        with get_tracer().span("quote.sign", token_in=trade.get('token_in'), token_out=trade.get('token_out'),
+                               amount_in=trade.get('amount_in')) as span:
+            await self._sign_execution_result(result)
+            span.set_attributes(signed='sign_result' in result, pending_tx=result.get('pending_tx'))
+
+    async def _sign_execution_result(self, result):
+        inner_response = result.get('response', {})
+        inner_execution_results = inner_response.get('execution_results', [])
+        
+        if inner_execution_results and len(inner_execution_results) > 0:
+            quote_data = inner_execution_results[0]
+            quote_hash = quote_data.get('quote_hash')
             
-            for result in execution_results:
-                inner_response = result.get('response', {})
-                inner_execution_results = inner_response.get('execution_results', [])
-                
-                if inner_execution_results and len(inner_execution_results) > 0:
-                    quote_data = inner_execution_results[0]
-                    quote = quote_data.get('quote')
-                    quote_hash = quote_data.get('quote_hash')
+            if not quote_data.get('quote'):
+                log.warning("sign.no_quote", "No quote found in nested result")
+                return
+            serialized = serialized_quote(quote_data)
+            quote = serialized.text
+            get_tracer().current_span().set_attribute("quote.digest", serialized.digest)
+            
+            try:
+                if self.tx_tracker is not None and self.sign_contract.dry_run is None:
+                    tx_hash = await self.sign_contract.submit_sign_quote(quote)
+                    self.tx_tracker.track(tx_hash, "sign_trade", {
+                        "quote": quote, "quote_hash": quote_hash, "trade": result.get('trade'), "portfolio": self.account_id
+                    })
+                    # A signature landing after the budget is still published by the tracker
+                    timeout = deadline.time_left(self.sign_timeout)
+                    with get_tracer().span("tx.wait", tx_hash=tx_hash, timeout=timeout):
+                        tx_result = await self.tx_tracker.wait(tx_hash, timeout=timeout)
+                    if tx_result is None:
+                        result['pending_tx'] = tx_hash
+                        return
+                    sign_result = self.sign_contract.decode_sign_result(tx_result)
+                else:
+                    sign_result = await self.sign_contract.sign_quote(quote)
+
+                if "result" in sign_result:
+                    payload_response = await self.sign_contract.generate_payload(serialized.message)
                     
-                    if not quote:
-                        print("[LOG] No quote found in nested result")
-                        continue
+                    result['sign_result'] = sign_result
+                    result['quote_hash'] = quote_hash
+                    result['payload'] = payload_response
+                else:
+                    log.warning("sign.quote_failed", "Error signing quote", error=sign_result.get('error'))
+                  
+            except Exception as e:
+                log.error("sign.quote_failed", f"Error processing quote: {str(e)}")
+
+    async def publish_signed_result(self, result):
+        """Verify the MPC signature of a signed result, publish its intent and track its settlement"""
+        trade = result.get('trade', {})
+        with get_tracer().span("quote.publish", token_in=trade.get('token_in'), token_out=trade.get('token_out')):
+            await self._publish_signed_result(result)
+
+    async def _publish_signed_result(self, result):
+        execution_results = result.get('response', {}).get('execution_results')
+        quote_data = execution_results[0] if execution_results else {}
+        quote = serialized_quote(quote_data).text if quote_data.get('quote') else None
+        quote_hash = quote_data.get('quote_hash') if execution_results else []
+        
+        sign_result = result.get('sign_result')
+        payload = result.get('payload')
+        
+        if sign_result and isinstance(sign_result, dict):
+            if 'result' in sign_result:
+                signature_data = sign_result['result']
+    
+                log.info("publish.verify", "Signature received from MPC contract, verifying signature...")
+               
+                with get_tracer().span("verify_signature") as span:
+                    is_valid =  verify_signature(payload, signature_data) 
+                    span.set_attribute("valid", is_valid)
+
+                if is_valid:
+                    commitment_rsv = create_commitment_from_mpc_signature_using_rsv(
+                        quote=quote,  
+                        signature=signature_data
+                    )
                     
-                    try:
-                        sign_result = await self.sign_contract.sign_quote(quote)
-                        if "result" in sign_result:
-                            new_format_quote = format_erc191_message(quote)
-                            payload_response = await self.sign_contract.generate_payload(new_format_quote)
-                            
-                            result['sign_result'] = sign_result
-                            result['quote_hash'] = quote_hash
-                            result['payload'] = payload_response
-                        else:
-                            print(f"[LOG] Error signing quote: {sign_result.get('error')}")
-                            continue
-                          
-                    except Exception as e:
-                        print(f"[LOG] Error processing quote: {str(e)}")
-                        continue
-            
-            return response
-            
-        except Exception as e:
-            print(f"[LOG] Error in sign_quotes: {str(e)}")
-            return {"error": str(e), "original_response": response}
+                    log.info("publish.start", "Publishing intent...")
+                    with get_tracer().span("publish_intent", quote_hashes=quote_hash):
+                        response = await self.publisher.publish(commitment_rsv, quote_hash)
+                    log.info("publish.done", "Response from publish_intent", response=response)
+
+                    published = response.get('result') if isinstance(response, dict) else None
+                    if isinstance(published, dict) and published.get('intent_hash') and result.get('trade'):
+                        self.settlements.track(published['intent_hash'], result['trade'], quote)
+                    
+            elif 'error' in sign_result:
+                log.warning("sign.quote_failed", "Error signing quote", error=sign_result['error'])
+
+    async def resume_sign_trade(self, tx_result, context):
+        """Publish the intent of a sign_trade transaction that landed after its cycle stopped waiting"""
+        sign_result = self.sign_contract.decode_sign_result(tx_result)
+        if "result" not in sign_result:
+            log.warning("sign.resume_failed", "Resumed sign_trade failed", error=sign_result.get('error'))
+            return
+
+        quote = context['quote']
+        payload_response = await self.sign_contract.generate_payload(SerializedQuote.of(quote).message)
+        await self.publish_signed_result({
+            'trade': context.get('trade'),
+            'response': {'execution_results': [{'quote': quote, 'quote_hash': context.get('quote_hash')}]},
+            'sign_result': sign_result,
+            'quote_hash': context.get('quote_hash'),
+            'payload': payload_response,
+        })
+
+    def run_agent_process(self, command):
+        """Run the nearai agent task and capture its output, killed when the agent stage runs out of time"""
+        return subprocess.run(command, capture_output=True, text=True, timeout=deadline.call_timeout())
 
     async def execute_agent(self):
-        """Execute agent with retries if no trades are found"""
+        """Execute agent with retries if no trades are found, traced as one cycle within the cycle budget"""
+        tracer = get_tracer()
+        tracer.stage_hook = self.profiler.stage
+        budget = current_budget() or CycleBudget.from_env()
+        with budget.activate(), self.profiler.cycle(), tracer.cycle(portfolio=self.account_id, network=self.network):
+            tracer.current_span().set_attribute("budget", budget.total)
+            await self._execute_agent()
+            tracer.current_span().set_attribute("budget.spent", budget.report())
+
+    async def _execute_agent(self):
+        tracer = get_tracer()
+        budget = current_budget()
         max_retries = 3
+        known_balances = self.known_balances()
+        # Read here rather than in the agent process, so repeated reads are served by the process wide view cache
+        handed_balances = known_balances if known_balances is not None else await self.read_balances()
         for attempt in range(max_retries):
+            if budget is not None and budget.expired:
+                log.error("agent.out_of_budget", f"Cycle budget of {budget.total}s spent after {attempt} attempts")
+                break
+            tracer.current_span().set_attribute("agent.attempts", attempt + 1)
             try:
-                print(f"\nExecuting mindshare agent... (Attempt {attempt + 1}/{max_retries})")
+                log.info("agent.start", f"Executing mindshare agent... (Attempt {attempt + 1}/{max_retries})")
                 
                 env_vars = {
                     "KAITO_API_KEY": self.api_key,
                     "ACCOUNT_ID": self.account_id,
                     "PRIVATE_KEY": self.private_key,
                     "NETWORK": self.network,
+                    "RPC_URL": self.get_rpc(),
                     "DEBUG": "false"
                 }
+                if os.getenv('KAITO_API_URL'):
+                    env_vars["KAITO_API_URL"] = os.getenv('KAITO_API_URL')
+                if os.getenv('TIMESERIES_DIR'):
+                    env_vars["TIMESERIES_DIR"] = os.getenv('TIMESERIES_DIR')
+                if handed_balances is not None:
+                    env_vars["BALANCES"] = json.dumps(handed_balances)
                 
                 command = [
                     "nearai",
@@ -251,14 +541,17 @@ class MindshareScheduler:
                     json.dumps(env_vars)  
                 ]
                 
-                #print("\n[LOG] Executing command:", " ".join(command))
+                log.debug("agent.command", "Executing command", command=" ".join(command))
                 
-                result = subprocess.run(command, capture_output=True, text=True)
+                with tracer.span("agent.run", attempt=attempt + 1) as span:
+                    # In a thread so the stage can be cancelled, the process itself times out with it
+                    async with deadline.stage("agent"):
+                        result = await asyncio.to_thread(self.run_agent_process, command)
+                    span.set_attribute("exit_code", result.returncode)
                 
                 if result.returncode == 0:
-                    print("\nAgent executed successfully")
-
-                    #print(f"\n[LOG] Result: {result.stdout}")
+                    log.info("agent.done", "Agent executed successfully")
+                    log.debug("agent.output", "Agent output", stdout=result.stdout)
 
                     balances = {}
                     for line in result.stdout.split('\n'):
@@ -268,94 +561,77 @@ class MindshareScheduler:
                             break
                     
                     if not balances:
-                        print("\n[LOG] No balances found, retrying...")
+                        log.warning("agent.no_balances", "No balances found, retrying...")
                         continue
+                    self.balances = dict(balances)
+                    if known_balances is None:
+                        self.cycles_since_read, self.given_up_at_read = 0, self.settlements.given_up
+                    self.cycles_since_read += 1
                     
-                    response = process_llm_suggestion(
-                        self.account_id,
-                        result.stdout, 
-                        balances
-                    )
-                    
-                    if "error" in response:
-                        print(f"\n[LOG] Error processing trades: {response['error']}")
+                    with tracer.span("quote.parse", response_chars=len(result.stdout)) as span:
+                        trades = parse_llm_response(result.stdout, balances)
+                        span.set_attribute("trades", len(trades))
+
+                    if not trades:
+                        log.warning("quote.failed", "Error processing trades", error="No trades found in LLM response")
                         if attempt < max_retries - 1:
-                            print(f"\n[LOG] Retrying... ({attempt + 2}/{max_retries})")
-                            time.sleep(2)
+                            log.info("agent.retry", f"Retrying... ({attempt + 2}/{max_retries})")
+                            await deadline.sleep(AGENT_RETRY_DELAY)
                             continue
-                    elif response.get('success', False):
-                        print("\nTrades obtained successfully, obtaining MPC signature...")
-                    
-                        sign_response = await self.sign_quotes(response)
-                        
-                        for result in sign_response.get('execution_results', []):
-                            quote = result.get('response', {}).get('execution_results', [])[0].get('quote') if result.get('response', {}).get('execution_results') else None
-                            quote_hash = result.get('response', {}).get('execution_results', [])[0].get('quote_hash') if result.get('response', {}).get('execution_results') else []
-                            
-                            if isinstance(quote, dict):
-                                quote = json.dumps(quote)
-                            
-                            sign_result = result.get('sign_result')
-                            payload = result.get('payload')
-                            
-                            if sign_result and isinstance(sign_result, dict):
-                                if 'result' in sign_result:
-                                    signature_data = sign_result['result']
-                        
-                                    print("\nSignature received from MPC contract, verifying signature...")
-                                   
-                                    is_valid =  verify_signature(payload, signature_data) 
-
-                                    if is_valid:
-                                        commitment_rsv = create_commitment_from_mpc_signature_using_rsv(
-                                            quote=quote,  
-                                            signature=signature_data
-                                        )
-                                        
-                                        print(f"\nPublishing intent...")
-                                        print("Response from publish_intent: ", publish_intent(commitment_rsv, quote_hash))
-                                        
-                                elif 'error' in sign_result:
-                                    error_str = str(sign_result['error'])
-                                    if "TIMEOUT_ERROR" in error_str:
-                                        print("[LOG] Timeout detected in RPC response...")
-                                        print("[LOG] Transaction might be successful, check the block explorer")
-                                        return response
-                                    else:
-                                        print(f"[LOG] Error signing quote: {sign_result['error']}")
-                                        continue
-                        break  # Exit retry loop on success
-                    else:
-                        print("\n[LOG] No trades were executed successfully")
+                        break
+
+                    pipeline = self.build_pipeline()
+                    with tracer.span("quote.process", tokens=len(balances), trades=len(trades)) as span:
+                        try:
+                            # Intents are held for one relay batch until the last trade of the cycle is signed
+                            self.publisher.upstream = lambda: pipeline.upstream_of("publish")
+                            async with deadline.stage("trades"):
+                                await pipeline.run(trades)
+                        except StageTimeout:
+                            # Published intents stand, the trades still in flight are dropped with this cycle
+                            log.warning("pipeline.timeout", "Trades budget spent, dropping unfinished trades",
+                                        dropped=sum(1 for item in pipeline.items if item.stopped_at == CANCELLED))
+                        finally:
+                            self.publisher.upstream = None
+                            self.publisher.flush()
+                        items = pipeline.items
+                        span.set_attribute("quotes", sum(1 for item in items if item.stopped_at != "quote"))
+
+                    for item in items:
+                        if item.error:
+                            log.error("pipeline.item_failed", f"Error in {item.stopped_at} stage: {item.error}",
+                                      stage=item.stopped_at, trade=trades[item.index])
+                    log.info("pipeline.done", "Trades went through the pipeline",
+                             published=sum(1 for item in items if item.completed), stages=pipeline.stats())
+
+                    if all(item.stopped_at == "quote" for item in items):
+                        log.warning("quote.failed", "Error processing trades", error="All trades failed to execute")
                         if attempt < max_retries - 1:
-                            print(f"\n[LOG] Retrying... ({attempt + 2}/{max_retries})")
-                            time.sleep(2)
+                            log.info("agent.retry", f"Retrying... ({attempt + 2}/{max_retries})")
+                            await deadline.sleep(AGENT_RETRY_DELAY)
                             continue
+                    break  # Exit retry loop on success
                 else:
-                    print(f"\n[LOG] Error executing agent: {result.stderr}")
+                    log.error("agent.failed", "Error executing agent", stderr=result.stderr)
                     if attempt < max_retries - 1:
-                        time.sleep(2)
+                        await deadline.sleep(AGENT_RETRY_DELAY)
                         continue
                 
             except Exception as e:
-                print(f"\n[LOG] Error in execute_agent: {str(e)}")
+                log.error("agent.failed", f"Error in execute_agent: {str(e)}", exc_info=True)
                 if attempt < max_retries - 1:
-                    print(f"\n[LOG] Retrying... ({attempt + 2}/{max_retries})")
-                    time.sleep(2)
+                    log.info("agent.retry", f"Retrying... ({attempt + 2}/{max_retries})")
+                    await deadline.sleep(AGENT_RETRY_DELAY)
                     continue
         
         if attempt == max_retries:
-            print(f"\n[LOG] Failed to execute trades after {max_retries} attempts")
-    
-def format_erc191_message(quote: str) -> str:
-    """Format message according to ERC-191"""
-    quote_data = quote.encode('utf-8')
-    quote_len = len(quote_data)
-    
-    prefix = b"\x19Ethereum Signed Message:\n" + str(quote_len).encode('utf-8')
-    message = prefix + quote_data
+            log.error("agent.exhausted", f"Failed to execute trades after {max_retries} attempts")
     
-    return message.decode('utf-8', errors='replace')
+def serialized_quote(quote_data: dict) -> SerializedQuote:
+    """Serialized form of an execution result's quote, kept on the result so every stage reuses it"""
+    if 'serialized' not in quote_data:
+        quote_data['serialized'] = SerializedQuote.of(quote_data['quote'])
+    return quote_data['serialized']
 
 def near_to_eth_public_key(near_public_key: str) -> bytes:
     stripped_key = near_public_key.split(':')[1]
@@ -364,6 +640,9 @@ def near_to_eth_public_key(near_public_key: str) -> bytes:
 
 def verify_signature(payload: dict, signature: dict) -> bool:
     """Verify signature of payload"""
+    from eth_keys import keys
+    from eth_utils import decode_hex
+
     # Get SIGNER_PUBLIC_KEY from environment variables
     SIGNER_PUBLIC_KEY = os.getenv('SIGNER_PUBLIC_KEY_USING_MINDSHARE_ACCOUNT')
     if not SIGNER_PUBLIC_KEY:
@@ -450,12 +729,24 @@ def main():
         return
     
     interval = int(os.getenv('SCHEDULE_INTERVAL', '300'))
-    scheduler = MindshareScheduler(interval=interval)
+    pool_size = int(os.getenv('WORKER_POOL_SIZE', '0'))
+    worker_pool = None
+    if pool_size > 0:
+        from src.worker.pool import WorkerAccountPool
+        from src.worker.pool_store import SqlitePoolStore
+        worker_pool = WorkerAccountPool(size=pool_size, store=SqlitePoolStore(os.getenv('WORKER_POOL_PATH', WORKER_POOL_PATH)))
+    shard_store = os.getenv('SHARD_STORE_PATH')
+    if shard_store:
+        from src.scheduler.sharding import build_sharded_runner
+        runner = build_sharded_runner(shard_store, interval=interval, worker_pool=worker_pool)
+        run = runner.run()
+    else:
+        run = MindshareScheduler(interval=interval, worker_pool=worker_pool).start()
     
     # Create a single event loop for the entire application
     loop = asyncio.get_event_loop()
     try:
-        loop.run_until_complete(scheduler.start())
+        loop.run_until_complete(run)
     finally:
         loop.close()
 
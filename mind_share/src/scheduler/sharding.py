@@ -0,0 +1,365 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import socket
+import sqlite3
+import time
+
+from typing import Any, Callable, Dict, List, Optional, Set
+from src.telemetry import log
+
+DEFAULT_LEASE_TTL = 30.0  # seconds a lease or a replica heartbeat stays valid without renewal
+DEFAULT_HEARTBEAT_INTERVAL = 10.0  # seconds between heartbeats, well under the ttl so one missed beat is harmless
+
+
+class Lease:
+    def __init__(self, shard: str, owner: str, expires_at: float):
+        self.shard = shard
+        self.owner = owner
+        self.expires_at = expires_at
+
+
+class LeaseStore:
+    """Replica heartbeats and shard leases shared by every replica, subclass it to keep them in another store"""
+
+    def heartbeat(self, replica_id: str, ttl: float):
+        raise NotImplementedError
+
+    def replicas(self) -> List[str]:
+        """Replicas whose heartbeat has not expired"""
+        raise NotImplementedError
+
+    def acquire(self, shard: str, owner: str, ttl: float) -> bool:
+        """Take the lease when it is free, expired or already held by owner (which renews it)"""
+        raise NotImplementedError
+
+    def release(self, shard: str, owner: str):
+        raise NotImplementedError
+
+    def leases(self) -> Dict[str, Lease]:
+        """Leases that have not expired, by shard"""
+        raise NotImplementedError
+
+    def leave(self, replica_id: str):
+        """Drop a replica and its leases at once, so others need not wait for them to expire"""
+        raise NotImplementedError
+
+
+class SqliteLeaseStore(LeaseStore):
+    """Leases in a SQLite file, shared by the replicas of one host or of a volume with working file locks"""
+
+    def __init__(self, path: str, clock=time.time):
+        self.path = path
+        self.clock = clock
+        with self._connect() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS replicas (replica_id TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS leases (shard TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short lived connection per call keeps the store usable from any thread
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _execute(self, query: str, params=()) -> sqlite3.Cursor:
+        connection = self._connect()
+        try:
+            with connection:
+                return connection.execute(query, params)
+        finally:
+            connection.close()
+
+    def heartbeat(self, replica_id: str, ttl: float):
+        self._execute(
+            "INSERT INTO replicas (replica_id, expires_at) VALUES (?, ?) "
+            "ON CONFLICT(replica_id) DO UPDATE SET expires_at = excluded.expires_at",
+            (replica_id, self.clock() + ttl)
+        )
+
+    def replicas(self) -> List[str]:
+        connection = self._connect()
+        try:
+            rows = connection.execute("SELECT replica_id FROM replicas WHERE expires_at > ?", (self.clock(),)).fetchall()
+        finally:
+            connection.close()
+        return [row[0] for row in rows]
+
+    def acquire(self, shard: str, owner: str, ttl: float) -> bool:
+        now = self.clock()
+        # A single upsert is atomic, the WHERE clause only lets it overwrite our own or an expired lease
+        cursor = self._execute(
+            "INSERT INTO leases (shard, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(shard) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.owner = excluded.owner OR leases.expires_at <= ?",
+            (shard, owner, now + ttl, now)
+        )
+        return cursor.rowcount > 0
+
+    def release(self, shard: str, owner: str):
+        self._execute("DELETE FROM leases WHERE shard = ? AND owner = ?", (shard, owner))
+
+    def leases(self) -> Dict[str, Lease]:
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT shard, owner, expires_at FROM leases WHERE expires_at > ?", (self.clock(),)
+            ).fetchall()
+        finally:
+            connection.close()
+        return {shard: Lease(shard, owner, expires_at) for shard, owner, expires_at in rows}
+
+    def leave(self, replica_id: str):
+        self._execute("DELETE FROM leases WHERE owner = ?", (replica_id,))
+        self._execute("DELETE FROM replicas WHERE replica_id = ?", (replica_id,))
+
+
+def assign_shards(shards: List[str], replicas: List[str]) -> Dict[str, str]:
+    """Owner of every shard, at most ceil(shards / replicas) each, computed the same way by every replica"""
+    if not replicas:
+        return {}
+    capacity = math.ceil(len(shards) / len(replicas))
+    counts = {replica: 0 for replica in replicas}
+    assignment = {}
+    for shard in sorted(shards):
+        # Rendezvous order, a replica joining or leaving only moves the shards it takes or gives
+        ranked = sorted(replicas, key=lambda replica: hashlib.sha256(f"{replica}/{shard}".encode('utf-8')).digest())
+        owner = next(replica for replica in ranked if counts[replica] < capacity)
+        counts[owner] += 1
+        assignment[shard] = owner
+    return assignment
+
+
+def default_replica_id() -> str:
+    return os.getenv('REPLICA_ID') or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class ShardCoordinator:
+    """Heartbeats this replica, holds the leases of the shards assigned to it and hands the others back"""
+
+    def __init__(self, store: LeaseStore, shards: List[str], replica_id: Optional[str] = None,
+                 lease_ttl: float = DEFAULT_LEASE_TTL, heartbeat_interval: float = DEFAULT_HEARTBEAT_INTERVAL,
+                 clock=time.time):
+        self.store = store
+        self.shards = list(shards)
+        self.replica_id = replica_id or default_replica_id()
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.clock = clock
+        # Shards held and when our lease on them runs out, as far as this replica knows
+        self._owned: Dict[str, float] = {}
+        self._handler: Optional[Callable[[Set[str], Set[str]], Any]] = None
+        self._task = None
+
+    def on_change(self, handler: Callable[[Set[str], Set[str]], Any]):
+        """Register the coroutine called with (acquired, lost) shards after a heartbeat changed them"""
+        self._handler = handler
+
+    def owns(self, shard: str) -> bool:
+        """Whether the lease is still ours, false once it may have expired even if no heartbeat said so"""
+        expires_at = self._owned.get(shard)
+        return expires_at is not None and expires_at > self.clock()
+
+    @property
+    def owned(self) -> List[str]:
+        return sorted(shard for shard in self._owned if self.owns(shard))
+
+    def _beat(self):
+        started = self.clock()
+        self.store.heartbeat(self.replica_id, self.lease_ttl)
+        replicas = self.store.replicas()
+        if self.replica_id not in replicas:
+            replicas.append(self.replica_id)
+        assignment = assign_shards(self.shards, replicas)
+
+        owned = {}
+        for shard, owner in assignment.items():
+            if owner != self.replica_id:
+                if shard in self._owned:
+                    self.store.release(shard, self.replica_id)
+                continue
+            # Fails while the previous owner still holds it, it is handed back on that replica's next heartbeat
+            if self.store.acquire(shard, self.replica_id, self.lease_ttl):
+                owned[shard] = started + self.lease_ttl
+        return owned
+
+    async def heartbeat(self):
+        """Renew, take and hand back leases once, then tell the handler what changed"""
+        before = set(self.owned)
+        self._owned = await asyncio.to_thread(self._beat)
+        after = set(self.owned)
+        acquired, lost = after - before, before - after
+        if acquired or lost:
+            log.info("shard.rebalanced", f"Replica {self.replica_id} holds {len(after)}/{len(self.shards)} shards",
+                     acquired=sorted(acquired), lost=sorted(lost))
+            if self._handler is not None:
+                await self._handler(acquired, lost)
+
+    async def run(self):
+        while True:
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                # Leases we could not renew lapse on their own through owns()
+                log.warning("shard.heartbeat_failed", f"Error renewing shard leases: {str(e)}")
+                lapsed = set(self._owned) - set(self.owned)
+                if lapsed and self._handler is not None:
+                    await self._handler(set(), lapsed)
+                for shard in lapsed:
+                    self._owned.pop(shard, None)
+            await asyncio.sleep(self.heartbeat_interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self):
+        """Stop heartbeating and hand every lease back, so other replicas take them over right away"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._owned = {}
+        await asyncio.to_thread(self.store.leave, self.replica_id)
+
+
+class SharedWorker:
+    """Worker account, sign contract and tx tracker of a replica, set up once and used by every portfolio it runs"""
+
+    def __init__(self, worker=None):
+        if worker is None:
+            from src.worker.keypair import AgentWorker
+            worker = AgentWorker()
+        self.worker = worker
+        self.sign_contract = None
+        self.tx_tracker = None
+        self.schedulers: Dict[str, Any] = {}
+        # Resumed sign_trades of portfolios whose scheduler is not running here yet
+        self.unclaimed: Dict[str, List[tuple]] = {}
+        self._lock = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        # Created on first use, on Python 3.9 a lock binds to the loop current at construction
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def attach(self, scheduler):
+        self.schedulers[scheduler.account_id] = scheduler
+        for tx_result, context in self.unclaimed.pop(scheduler.account_id, []):
+            asyncio.ensure_future(scheduler.resume_sign_trade(tx_result, context))
+
+    def detach(self, scheduler):
+        if self.schedulers.get(scheduler.account_id) is scheduler:
+            del self.schedulers[scheduler.account_id]
+
+    async def resume_sign_trade(self, tx_result, context):
+        """Hand a landed sign_trade to the scheduler of its portfolio, or keep it until that scheduler starts here"""
+        portfolio = context.get('portfolio')
+        scheduler = self.schedulers.get(portfolio)
+        if scheduler is None:
+            log.warning("shard.resume_deferred", f"Portfolio {portfolio} not running here, its sign_trade waits for it",
+                        portfolio=portfolio)
+            self.unclaimed.setdefault(portfolio, []).append((tx_result, context))
+            return
+        await scheduler.resume_sign_trade(tx_result, context)
+
+    async def stop(self):
+        if self.tx_tracker is not None:
+            await self.tx_tracker.stop()
+
+
+class ShardedRunner:
+    """Runs one scheduler per portfolio whose shard this replica holds, and stops it when the shard moves away"""
+
+    def __init__(self, coordinator: ShardCoordinator, create_scheduler: Callable[[str], Any],
+                 shared: Optional[SharedWorker] = None):
+        self.coordinator = coordinator
+        self.create_scheduler = create_scheduler
+        self.shared = shared
+        self.running: Dict[str, asyncio.Task] = {}
+        self.schedulers: Dict[str, Any] = {}
+        coordinator.on_change(self.rebalance)
+
+    def _launch(self, shard: str):
+        scheduler = self.create_scheduler(shard)
+        # The cycle checks the lease too, a heartbeat may lag behind its expiry
+        scheduler.lease = lambda: self.coordinator.owns(shard)
+        self.schedulers[shard] = scheduler
+        self.running[shard] = asyncio.ensure_future(scheduler.start())
+
+    async def _halt(self, shard: str):
+        task = self.running.pop(shard, None)
+        scheduler = self.schedulers.pop(shard, None)
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except BaseException:
+                pass
+        if scheduler is not None:
+            await scheduler.stop()
+
+    async def rebalance(self, acquired: Set[str], lost: Set[str]):
+        for shard in sorted(lost):
+            await self._halt(shard)
+            log.info("shard.stopped", f"Stopped the scheduler of {shard}, its lease moved away")
+        for shard in sorted(acquired):
+            self._launch(shard)
+            log.info("shard.started", f"Started the scheduler of {shard}")
+
+    async def run(self):
+        self.coordinator.start()
+        try:
+            while True:
+                await asyncio.sleep(self.coordinator.heartbeat_interval)
+                for shard, task in list(self.running.items()):
+                    if task.done() and not task.cancelled() and self.coordinator.owns(shard):
+                        log.error("shard.scheduler_failed", f"Scheduler of {shard} stopped, restarting it: {task.exception()}")
+                        await self._halt(shard)
+                        self._launch(shard)
+        finally:
+            for shard in list(self.running):
+                await self._halt(shard)
+            if self.shared is not None:
+                await self.shared.stop()
+            await self.coordinator.stop()
+
+
+def load_portfolios(path: Optional[str] = None) -> Dict[str, str]:
+    """Private key by account id from SHARD_PORTFOLIOS_PATH, a JSON list of {account_id, private_key}, else the env account"""
+    path = path or os.getenv('SHARD_PORTFOLIOS_PATH')
+    if not path:
+        return {os.getenv('INTENT_ACCOUNT_ID'): os.getenv('INTENT_PRIVATE_KEY')}
+    with open(path) as f:
+        return {portfolio["account_id"]: portfolio["private_key"] for portfolio in json.load(f)}
+
+
+def build_sharded_runner(store_path: str, interval: int = 300, worker_pool=None) -> ShardedRunner:
+    """Runner over the portfolios with leases in the SQLite file, the shard of a portfolio is its account id"""
+    from src.scheduler.scheduler import MindshareScheduler
+
+    portfolios = load_portfolios()
+    coordinator = ShardCoordinator(
+        SqliteLeaseStore(store_path),
+        shards=list(portfolios),
+        lease_ttl=float(os.getenv('SHARD_LEASE_TTL', str(DEFAULT_LEASE_TTL))),
+        heartbeat_interval=float(os.getenv('SHARD_HEARTBEAT_INTERVAL', str(DEFAULT_HEARTBEAT_INTERVAL)))
+    )
+
+    # One worker for all portfolios, so they share its nonces, access keys and pending transactions file
+    shared = SharedWorker()
+
+    def create_scheduler(account_id: str) -> MindshareScheduler:
+        scheduler = MindshareScheduler(interval=interval, worker_pool=worker_pool, shared=shared)
+        scheduler.account_id = account_id
+        scheduler.private_key = portfolios[account_id]
+        return scheduler
+
+    return ShardedRunner(coordinator, create_scheduler, shared)
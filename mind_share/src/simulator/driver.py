@@ -0,0 +1,254 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from src.agent.balances import read_balances
+from src.rpc.client import get_rpc_client
+from src.rpc.endpoints import reset_endpoint_pools
+from src.scheduler.scheduler import MindshareScheduler
+from src.simulator.near_rpc import FakeNearRpc
+from src.simulator.servers import Behavior, FakeKaito, FakeSolverBus, FakeTappd
+
+SIGN_CONTRACT_ID = "sign.simulator.near"
+DEFAULT_PORTFOLIO = {"USDC": 120.0, "NEAR": 35.0, "ETH": 0.04, "SOL": 0.9}
+
+
+class SimulatorStack:
+    """Local stand-ins for NEAR RPC, the solver bus, Kaito and tappd, with the environment pointing at them"""
+
+    def __init__(self, rpc: Optional[Behavior] = None, solver: Optional[Behavior] = None,
+                 kaito: Optional[Behavior] = None, tappd: Optional[Behavior] = None,
+                 block_time: float = 1.0, tx_delay: float = 1.0, poll_interval: float = 0.5):
+        self._workdir = tempfile.TemporaryDirectory(prefix="mindshare-simulator-")
+        self.rpc = FakeNearRpc(SIGN_CONTRACT_ID, rpc, block_time=block_time, tx_delay=tx_delay)
+        self.solver = FakeSolverBus(solver)
+        self.kaito = FakeKaito(kaito)
+        self.tappd = FakeTappd(os.path.join(self._workdir.name, "tappd.sock"), tappd)
+        self.poll_interval = poll_interval
+        self._saved_env: Dict[str, Optional[str]] = {}
+
+    def environment(self) -> Dict[str, str]:
+        return {
+            "NETWORK": "testnet",
+            "NEAR_RPC_ENDPOINTS": self.rpc.url,
+            "SOLVER_BUS_URL": self.solver.url,
+            "KAITO_API_URL": f"{self.kaito.url}/api/v1/mindshare",
+            "KAITO_API_KEY": "simulator",
+            "USE_MOCK_MINDSHARE": "false",
+            "DSTACK_SIMULATOR_ENDPOINT": self.tappd.url,
+            "SIGN_INTENT_CONTRACT": SIGN_CONTRACT_ID,
+            "SIGNER_PUBLIC_KEY_USING_MINDSHARE_ACCOUNT": self.rpc.contract.signer_public_key,
+            "USE_STATIC_ACCOUNT": "false",
+            "USE_LOCAL_VERIFIER": "true",
+            "SEAL_WORKER_IDENTITY": "false",
+            "SIGNING_ACCESS_KEYS": "0",
+            "TX_POLL_INTERVAL": str(self.poll_interval),
+            "PENDING_TX_PATH": "",
+            "REGISTRATION_STATE_PATH": "",
+        }
+
+    def start(self) -> "SimulatorStack":
+        for server in (self.rpc, self.solver, self.kaito, self.tappd):
+            server.start()
+        for name, value in self.environment().items():
+            self._saved_env[name] = os.environ.get(name)
+            os.environ[name] = value
+        reset_endpoint_pools()
+        return self
+
+    def stop(self):
+        for name, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        self._saved_env = {}
+        reset_endpoint_pools()
+        for server in (self.rpc, self.solver, self.kaito, self.tappd):
+            server.stop()
+        self._workdir.cleanup()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "near_rpc": self.rpc.stats(),
+            "solver_bus": self.solver.stats(),
+            "kaito": self.kaito.stats(),
+            "tappd": self.tappd.stats(),
+        }
+
+
+class SimulatedAgent:
+    """Stands in for the nearai agent subprocess: reads balances and mindshare like it and answers with a canned trade"""
+
+    def __init__(self, trade_fraction: float = 0.1):
+        self.trade_fraction = trade_fraction
+
+    def balances(self, rpc_url: str, account_id: str, network: str) -> Dict[str, float]:
+        # The real agent reads them from its own process and event loop, a thread stands in for it
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(read_balances, account_id, network, rpc_url).result()
+
+    def mindshare(self, api_url: str, token: str) -> float:
+        today = datetime.now().strftime("%Y-%m-%d")
+        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+        response = requests.get(f"{api_url}?token={token}&start_date={yesterday}&end_date={today}")
+        response.raise_for_status()
+        return list(response.json()['mindshare'].values())[0]
+
+    def run(self, command: List[str]) -> subprocess.CompletedProcess:
+        env_vars = json.loads(command[command.index("--env_vars") + 1])
+        try:
+            if env_vars.get("BALANCES"):
+                balances = json.loads(env_vars["BALANCES"])
+            else:
+                balances = self.balances(env_vars["RPC_URL"], env_vars["ACCOUNT_ID"], env_vars.get("NETWORK"))
+            held = {token: amount for token, amount in balances.items() if amount > 0 and token != 'WNEAR'}
+            mindshare = {token: self.mindshare(env_vars["KAITO_API_URL"], token) for token in held}
+        except Exception as e:
+            return subprocess.CompletedProcess(command, 1, "", str(e))
+
+        lines = ["Getting account balances", f"Retrieved balances: {balances}"]
+        for token, value in mindshare.items():
+            lines.append(f"I have {held[token]} {token} and mindshare for this token is: {value}")
+
+        if len(mindshare) >= 2:
+            ranked = sorted(mindshare, key=mindshare.get)
+            token_in, token_out = ranked[0], ranked[-1]
+            amount = round(held[token_in] * self.trade_fraction, 6)
+            lines += [
+                "Assistant: ",
+                "TRADE:",
+                f"- token_in: {token_in}",
+                f"- amount_in: {int(self.trade_fraction * 100)}% of current balance ({amount})",
+                f"- token_out: {token_out}",
+            ]
+        return subprocess.CompletedProcess(command, 0, "\n".join(lines) + "\n", "")
+
+
+def portfolio_account(index: int) -> str:
+    return f"portfolio-{index}.simulator.near"
+
+
+async def run_instance(stack: SimulatorStack, index: int, cycles: int) -> Dict[str, Any]:
+    """Set up one scheduler against the stack and time its cycles"""
+    scheduler = MindshareScheduler(interval=0)
+    scheduler.account_id = portfolio_account(index)
+    stack.rpc.set_portfolio(scheduler.account_id, DEFAULT_PORTFOLIO)
+    scheduler.run_agent_process = SimulatedAgent().run
+
+    result = {"instance": index, "setup": None, "cycles": [], "error": None}
+    try:
+        start = time.perf_counter()
+        await scheduler.setup(max_attempts=2, retry_delay=1)
+        result["setup"] = time.perf_counter() - start
+
+        for _ in range(cycles):
+            start = time.perf_counter()
+            await scheduler.execute_agent()
+            result["cycles"].append(time.perf_counter() - start)
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        if scheduler.tx_tracker is not None:
+            await scheduler.tx_tracker.stop()
+        await scheduler.settlements.stop()
+        await scheduler.relay.close()
+        await get_rpc_client(scheduler.network).close()
+    return result
+
+
+def run_load(stack: SimulatorStack, instances: int, cycles: int = 1) -> Dict[str, Any]:
+    """Run N schedulers at once, each in its own thread and event loop like separate workers would"""
+    published_before = stack.solver.published
+    signatures_before = stack.rpc.contract.signatures
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=instances) as executor:
+        results = list(executor.map(lambda index: asyncio.run(run_instance(stack, index, cycles)), range(instances)))
+    duration = time.perf_counter() - start
+
+    cycle_times = [duration for result in results for duration in result["cycles"]]
+    setup_times = [result["setup"] for result in results if result["setup"] is not None]
+    published = stack.solver.published - published_before
+    return {
+        "instances": instances,
+        "cycles": len(cycle_times),
+        "duration": duration,
+        "cycles_per_second": len(cycle_times) / duration if duration else 0.0,
+        "published": published,
+        "published_per_second": published / duration if duration else 0.0,
+        "signatures": stack.rpc.contract.signatures - signatures_before,
+        "setup_p50": statistics.median(setup_times) if setup_times else None,
+        "cycle_p50": statistics.median(cycle_times) if cycle_times else None,
+        "cycle_max": max(cycle_times) if cycle_times else None,
+        "failed_instances": [result for result in results if result["error"]],
+        "servers": stack.stats(),
+    }
+
+
+def parse_behavior(value: Optional[str]) -> Behavior:
+    """LATENCY[,ERROR_RATE[,JITTER]] in seconds and fraction, e.g. 0.2,0.01"""
+    if not value:
+        return Behavior()
+    parts = [float(part) for part in value.split(',')]
+    return Behavior(latency=parts[0], error_rate=parts[1] if len(parts) > 1 else 0.0,
+                    jitter=parts[2] if len(parts) > 2 else 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run N schedulers against local stand-ins of every external service")
+    parser.add_argument("--instances", default="1,2,4,8", help="comma separated instance counts, run one after the other")
+    parser.add_argument("--cycles", type=int, default=2, help="cycles per instance")
+    parser.add_argument("--rpc", help="NEAR RPC LATENCY[,ERROR_RATE[,JITTER]]")
+    parser.add_argument("--solver", help="solver bus LATENCY[,ERROR_RATE[,JITTER]]")
+    parser.add_argument("--kaito", help="Kaito LATENCY[,ERROR_RATE[,JITTER]]")
+    parser.add_argument("--tappd", help="tappd LATENCY[,ERROR_RATE[,JITTER]]")
+    parser.add_argument("--tx-delay", type=float, default=1.0, help="seconds before a transaction is final")
+    parser.add_argument("--verbose", action="store_true", help="keep the scheduler output")
+    args = parser.parse_args()
+
+    stack = SimulatorStack(
+        rpc=parse_behavior(args.rpc),
+        solver=parse_behavior(args.solver),
+        kaito=parse_behavior(args.kaito),
+        tappd=parse_behavior(args.tappd),
+        tx_delay=args.tx_delay,
+    )
+    reports = []
+    with stack:
+        for instances in [int(count) for count in args.instances.split(',')]:
+            if args.verbose:
+                report = run_load(stack, instances, args.cycles)
+            else:
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    report = run_load(stack, instances, args.cycles)
+            reports.append(report)
+            print(f"[LOG] {instances} instances: {report['cycles_per_second']:.2f} cycles/s, "
+                  f"{report['published_per_second']:.2f} intents/s, cycle p50 {report['cycle_p50']}, "
+                  f"{len(report['failed_instances'])} failed")
+
+    best = max(reports, key=lambda report: report["cycles_per_second"])
+    print(json.dumps({"reports": reports, "ceiling": {
+        "instances": best["instances"], "cycles_per_second": best["cycles_per_second"]
+    }}, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
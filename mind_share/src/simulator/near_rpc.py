@@ -0,0 +1,318 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+
+import base58
+
+from typing import Any, Dict, Optional
+from src.constants import ASSET_MAP
+from src.contract.dry_run import LocalSigner
+from src.contract.encoding import decode_call
+from src.quote.serializer import erc191_message
+from src.simulator.servers import Behavior, StandInServer, json_rpc_error, json_rpc_result
+
+INTENTS_CONTRACT = "intents.near"
+DEFAULT_ACCOUNT_BALANCE = str(10 * 10 ** 24)  # yoctoNEAR every simulated account holds
+NOT_REGISTERED_PANIC = "called `Option::unwrap()` on a `None` value"
+
+
+class BorshReader:
+    """Just enough borsh to decode the signed transactions py_near produces"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    def read(self, size: int) -> bytes:
+        if self.offset + size > len(self.data):
+            raise ValueError("Truncated transaction")
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return chunk
+
+    def integer(self, size: int) -> int:
+        return int.from_bytes(self.read(size), 'little')
+
+    def string(self) -> str:
+        return self.read(self.integer(4)).decode('utf-8')
+
+    def public_key(self) -> str:
+        key_type = self.integer(1)
+        if key_type == 0:
+            return "ed25519:" + base58.b58encode(self.read(32)).decode('utf-8')
+        return "secp256k1:" + base58.b58encode(self.read(64)).decode('utf-8')
+
+    def access_key(self) -> Dict[str, Any]:
+        nonce = self.integer(8)
+        if self.integer(1) == 1:
+            return {"nonce": nonce, "permission": "FullAccess"}
+        allowance = str(self.integer(16)) if self.integer(1) else None
+        receiver_id = self.string()
+        method_names = [self.string() for _ in range(self.integer(4))]
+        return {
+            "nonce": nonce,
+            "permission": {"FunctionCall": {
+                "allowance": allowance, "receiver_id": receiver_id, "method_names": method_names
+            }},
+        }
+
+    def action(self) -> Dict[str, Any]:
+        kind = self.integer(1)
+        if kind == 0:
+            return {"CreateAccount": {}}
+        if kind == 1:
+            return {"DeployContract": {"code": base64.b64encode(self.read(self.integer(4))).decode('utf-8')}}
+        if kind == 2:
+            return {"FunctionCall": {
+                "method_name": self.string(),
+                "args": base64.b64encode(self.read(self.integer(4))).decode('utf-8'),
+                "gas": self.integer(8),
+                "deposit": str(self.integer(16)),
+            }}
+        if kind == 3:
+            return {"Transfer": {"deposit": str(self.integer(16))}}
+        if kind == 4:
+            return {"Stake": {"stake": str(self.integer(16)), "public_key": self.public_key()}}
+        if kind == 5:
+            return {"AddKey": {"public_key": self.public_key(), "access_key": self.access_key()}}
+        if kind == 6:
+            return {"DeleteKey": {"public_key": self.public_key()}}
+        if kind == 7:
+            return {"DeleteAccount": {"beneficiary_id": self.string()}}
+        raise ValueError(f"Unsupported action {kind}")
+
+
+def decode_signed_transaction(signed_tx_base64: str) -> Dict[str, Any]:
+    """Decode a base64 borsh SignedTransaction into the shape the RPC returns in tx outcomes"""
+    data = base64.b64decode(signed_tx_base64)
+    reader = BorshReader(data)
+    signer_id = reader.string()
+    public_key = reader.public_key()
+    nonce = reader.integer(8)
+    receiver_id = reader.string()
+    reader.read(32)  # block hash
+    actions = [reader.action() for _ in range(reader.integer(4))]
+    transaction_end = reader.offset
+    signature_type = reader.integer(1)
+    signature = reader.read(64)
+    return {
+        "hash": base58.b58encode(hashlib.sha256(data[:transaction_end]).digest()).decode('utf-8'),
+        "signer_id": signer_id,
+        "public_key": public_key,
+        "nonce": nonce,
+        "receiver_id": receiver_id,
+        "actions": actions,
+        "signature": ("ed25519:" if signature_type == 0 else "secp256k1:") + base58.b58encode(signature).decode('utf-8'),
+    }
+
+
+class ContractPanic(Exception):
+    pass
+
+
+class FakeSignContract:
+    """Sign intent contract: registered workers get sign_trade answered by a local secp256k1 key in MPC shape"""
+
+    def __init__(self, contract_id: str, seed: bytes = b"mindshare simulator mpc key"):
+        self.contract_id = contract_id
+        self.signer = LocalSigner.from_seed(seed)
+        self.workers: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def signer_public_key(self) -> str:
+        return self.signer.public_key
+
+    @property
+    def signatures(self) -> int:
+        return self.signer.signatures
+
+    def view(self, method_name: str, args: Dict[str, Any]) -> Any:
+        if method_name == "get_worker":
+            worker = self.workers.get(args.get("account_id"))
+            if worker is None:
+                raise ContractPanic(NOT_REGISTERED_PANIC)
+            return worker
+        if method_name == "generate_payload":
+            return list(self.signer.payload(bytes(args["data"])))
+        raise ContractPanic(f"Method {method_name} not found")
+
+    def call(self, signer_id: str, method_name: str, args: Dict[str, Any]) -> Any:
+        if method_name == "register_worker":
+            self.workers[signer_id] = {"checksum": args.get("checksum"), "codehash": "simulator"}
+            return True
+        if method_name == "sign_trade":
+            if signer_id not in self.workers:
+                raise ContractPanic(NOT_REGISTERED_PANIC)
+            return self.signer.sign(erc191_message(args["quote"].encode('utf-8')))
+        raise ContractPanic(f"Method {method_name} not found")
+
+
+class FakeNearRpc(StandInServer):
+    """NEAR JSON-RPC with intents.near balances, the sign intent contract, access key nonces and tx outcomes"""
+
+    name = "near-rpc"
+
+    def __init__(self, sign_contract_id: str, behavior: Optional[Behavior] = None,
+                 block_time: float = 1.0, tx_delay: float = 1.0):
+        super().__init__(behavior)
+        self.contract = FakeSignContract(sign_contract_id)
+        self.block_time = block_time
+        self.tx_delay = tx_delay
+        self.started_at = time.time()
+        self.balances: Dict[str, Dict[str, str]] = {}
+        self.access_keys: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.outcomes: Dict[str, Dict[str, Any]] = {}
+        self.transactions = 0
+        self._state_lock = threading.Lock()
+
+    def set_portfolio(self, account_id: str, portfolio: Dict[str, float]):
+        """Seed intents.near balances of an account from token symbols and human amounts"""
+        balances = {}
+        for symbol, amount in portfolio.items():
+            info = ASSET_MAP[symbol]
+            token_id = ('nep141:' + info['token_id']) if symbol == 'NEAR' else info['token_id']
+            balances[token_id] = str(int(amount * 10 ** info['decimals']))
+        self.balances[account_id] = balances
+
+    def block(self) -> Dict[str, Any]:
+        height = 100000000 + int((time.time() - self.started_at) / self.block_time)
+        return {
+            "height": height,
+            "hash": base58.b58encode(hashlib.sha256(str(height).encode('utf-8')).digest()).decode('utf-8'),
+        }
+
+    def _access_key(self, account_id: str, public_key: str) -> Dict[str, Any]:
+        # Every key asked about exists, accounts are funded implicit accounts in the simulator
+        keys_of_account = self.access_keys.setdefault(account_id, {})
+        return keys_of_account.setdefault(public_key, {"nonce": 0, "permission": "FullAccess"})
+
+    def _query(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        block = self.block()
+        request_type = params.get("request_type")
+        account_id = params.get("account_id")
+        if request_type == "view_account":
+            result = {"amount": DEFAULT_ACCOUNT_BALANCE, "locked": "0", "code_hash": "11111111111111111111111111111111",
+                      "storage_usage": 182, "storage_paid_at": 0}
+        elif request_type == "view_access_key":
+            with self._state_lock:
+                result = dict(self._access_key(account_id, params["public_key"]))
+        elif request_type == "view_access_key_list":
+            with self._state_lock:
+                result = {"keys": [
+                    {"public_key": public_key, "access_key": access_key}
+                    for public_key, access_key in self.access_keys.get(account_id, {}).items()
+                ]}
+        elif request_type == "call_function":
+            try:
+                method_name, args = decode_call(params["method_name"], base64.b64decode(params.get("args_base64") or ""))
+                value = self._view(account_id, method_name, args)
+                result = {"result": list(json.dumps(value).encode('utf-8')), "logs": []}
+            except ContractPanic as e:
+                result = {"error": f"wasm execution failed with error: FunctionCallError(HostError(GuestPanic {{ panic_msg: \"{e}\" }}))", "logs": []}
+        else:
+            raise ValueError(f"Unsupported query {request_type}")
+        return {**result, "block_height": block["height"], "block_hash": block["hash"]}
+
+    def _view(self, contract_id: str, method_name: str, args: Dict[str, Any]) -> Any:
+        if contract_id == INTENTS_CONTRACT and method_name == "mt_balance_of":
+            return self.balances.get(args["account_id"], {}).get(args["token_id"], "0")
+        if contract_id == self.contract.contract_id:
+            with self._state_lock:
+                return self.contract.view(method_name, args)
+        raise ContractPanic(f"Contract {contract_id} not found")
+
+    def _execute(self, transaction: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply a transaction and build its final outcome, raises ValueError on an invalid nonce"""
+        with self._state_lock:
+            access_key = self._access_key(transaction["signer_id"], transaction["public_key"])
+            if transaction["nonce"] <= access_key["nonce"]:
+                raise ValueError(json.dumps({"tx_nonce": transaction["nonce"], "ak_nonce": access_key["nonce"]}))
+            access_key["nonce"] = transaction["nonce"]
+            self.transactions += 1
+
+            status = {"SuccessValue": ""}
+            for index, action in enumerate(transaction["actions"]):
+                if "AddKey" in action:
+                    added = action["AddKey"]
+                    self.access_keys.setdefault(transaction["signer_id"], {})[added["public_key"]] = dict(added["access_key"])
+                elif "FunctionCall" in action and transaction["receiver_id"] == self.contract.contract_id:
+                    call = action["FunctionCall"]
+                    try:
+                        value = self.contract.call(transaction["signer_id"],
+                                                   *decode_call(call["method_name"], base64.b64decode(call["args"])))
+                        status = {"SuccessValue": base64.b64encode(json.dumps(value).encode('utf-8')).decode('utf-8')}
+                    except ContractPanic as e:
+                        status = {"Failure": {"ActionError": {"index": index, "kind": {
+                            "FunctionCallError": {"ExecutionError": f"Smart contract panicked: {e}"}
+                        }}}}
+                        break
+
+        outcome = {
+            "logs": [], "metadata": {"version": 1, "gas_profile": None}, "receipt_ids": [],
+            "status": status, "tokens_burnt": "0", "gas_burnt": 0, "executor_id": transaction["signer_id"],
+        }
+        return {
+            "status": status,
+            "transaction": transaction,
+            "transaction_outcome": {"id": transaction["hash"], "outcome": outcome, "block_hash": self.block()["hash"]},
+            "receipts_outcome": [],
+        }
+
+    def _invalid_nonce(self, request, details: str):
+        return json_rpc_error(request, {
+            "name": "HANDLER_ERROR",
+            "cause": {"name": "INVALID_TRANSACTION", "info": {}},
+            "code": -32000,
+            "message": "Server error",
+            "data": {"TxExecutionError": {"InvalidTxError": {"InvalidNonce": json.loads(details)}}},
+        })
+
+    def handle(self, method, path, body):
+        request = json.loads(body)
+        rpc_method = request.get("method")
+        params = request.get("params")
+
+        if rpc_method == "status":
+            block = self.block()
+            return 200, json_rpc_result(request, {"chain_id": "simulator", "sync_info": {
+                "latest_block_hash": block["hash"],
+                "latest_block_height": block["height"],
+                "latest_block_time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime()),
+                "syncing": False,
+            }})
+        if rpc_method == "block":
+            block = self.block()
+            return 200, json_rpc_result(request, {"header": block, "chunks": []})
+        if rpc_method == "query":
+            return 200, json_rpc_result(request, self._query(params))
+        if rpc_method in ("broadcast_tx_async", "broadcast_tx_commit", "send_tx"):
+            signed_tx = params["signed_tx_base64"] if isinstance(params, dict) else params[0]
+            transaction = decode_signed_transaction(signed_tx)
+            try:
+                result = self._execute(transaction)
+            except ValueError as e:
+                return 200, self._invalid_nonce(request, str(e))
+            ready_at = time.time() + self.tx_delay
+            with self._state_lock:
+                self.outcomes[transaction["hash"]] = {"ready_at": ready_at, "result": result}
+            if rpc_method == "broadcast_tx_async":
+                return 200, json_rpc_result(request, transaction["hash"])
+            time.sleep(self.tx_delay)
+            return 200, json_rpc_result(request, result)
+        if rpc_method in ("tx", "EXPERIMENTAL_tx_status"):
+            tx_hash = params[0] if isinstance(params, list) else params.get("tx_hash")
+            with self._state_lock:
+                entry = self.outcomes.get(tx_hash)
+            if entry is None or entry["ready_at"] > time.time():
+                return 200, json_rpc_error(request, {
+                    "name": "HANDLER_ERROR", "cause": {"name": "UNKNOWN_TRANSACTION", "info": {}},
+                    "code": -32000, "message": "Server error", "data": f"Transaction {tx_hash} doesn't exist",
+                })
+            return 200, json_rpc_result(request, entry["result"])
+        return 200, json_rpc_error(request, {"code": -32601, "message": f"Method {rpc_method} not found"})
+
+    def stats(self):
+        return {**super().stats(), "transactions": self.transactions, "signatures": self.contract.signatures,
+                "workers": len(self.contract.workers)}
@@ -0,0 +1,158 @@
+import struct
+
+from typing import Dict, Any, List, Union
+
+# Intel TDX DCAP quote v4 layout, offsets in bytes
+HEADER_SIZE = 48
+TD_REPORT_SIZE = 584
+SIGNATURE_LEN_OFFSET = HEADER_SIZE + TD_REPORT_SIZE
+SIGNATURE_DATA_OFFSET = SIGNATURE_LEN_OFFSET + 4
+
+TDX_QUOTE_VERSION = 4
+TDX_TEE_TYPE = 0x81
+
+# (offset, size) of the TD report fields, relative to the start of the TD report
+TD_REPORT_FIELDS = {
+    'tee_tcb_svn': (0, 16),
+    'mr_seam': (16, 48),
+    'mr_signer_seam': (64, 48),
+    'seam_attributes': (112, 8),
+    'td_attributes': (120, 8),
+    'xfam': (128, 8),
+    'mr_td': (136, 48),
+    'mr_config_id': (184, 48),
+    'mr_owner': (232, 48),
+    'mr_owner_config': (280, 48),
+    'rtmr0': (328, 48),
+    'rtmr1': (376, 48),
+    'rtmr2': (424, 48),
+    'rtmr3': (472, 48),
+    'report_data': (520, 64),
+}
+
+
+class QuoteParseError(ValueError):
+    pass
+
+
+class TdxQuote:
+    """Read-only view over a binary TDX quote, every field is a memoryview slice of the original buffer"""
+
+    __slots__ = ('_buf', 'version', 'attestation_key_type', 'tee_type', 'signature_data_len')
+
+    def __init__(self, raw: Union[bytes, bytearray, memoryview]):
+        buf = memoryview(raw)
+        if len(buf) < SIGNATURE_DATA_OFFSET:
+            raise QuoteParseError(f"Quote too short: {len(buf)} bytes")
+
+        self._buf = buf
+        self.version, self.attestation_key_type, self.tee_type = struct.unpack_from('<HHI', buf, 0)
+        self.signature_data_len, = struct.unpack_from('<I', buf, SIGNATURE_LEN_OFFSET)
+
+        if self.version != TDX_QUOTE_VERSION:
+            raise QuoteParseError(f"Unsupported quote version: {self.version}")
+        if self.tee_type != TDX_TEE_TYPE:
+            raise QuoteParseError(f"Not a TDX quote, tee_type={self.tee_type:#x}")
+        if len(buf) < SIGNATURE_DATA_OFFSET + self.signature_data_len:
+            raise QuoteParseError("Quote truncated inside signature data")
+
+    @classmethod
+    def from_hex(cls, quote_hex: str) -> 'TdxQuote':
+        """Decode the hex returned by tdx_quote, the only copy made while parsing"""
+        try:
+            raw = bytes.fromhex(quote_hex)
+        except ValueError as e:
+            raise QuoteParseError(f"Invalid quote hex: {e}")
+        return cls(raw)
+
+    def _field(self, name: str) -> memoryview:
+        offset, size = TD_REPORT_FIELDS[name]
+        start = HEADER_SIZE + offset
+        return self._buf[start:start + size]
+
+    @property
+    def header(self) -> memoryview:
+        return self._buf[:HEADER_SIZE]
+
+    @property
+    def qe_vendor_id(self) -> memoryview:
+        return self._buf[12:28]
+
+    @property
+    def td_report(self) -> memoryview:
+        return self._buf[HEADER_SIZE:SIGNATURE_LEN_OFFSET]
+
+    @property
+    def signature_data(self) -> memoryview:
+        return self._buf[SIGNATURE_DATA_OFFSET:SIGNATURE_DATA_OFFSET + self.signature_data_len]
+
+    @property
+    def mr_td(self) -> memoryview:
+        return self._field('mr_td')
+
+    @property
+    def report_data(self) -> memoryview:
+        return self._field('report_data')
+
+    @property
+    def td_attributes(self) -> int:
+        return int.from_bytes(self._field('td_attributes'), 'little')
+
+    @property
+    def xfam(self) -> int:
+        return int.from_bytes(self._field('xfam'), 'little')
+
+    @property
+    def debug(self) -> bool:
+        """TUD.DEBUG bit of the TD attributes, a debuggable TD must never be trusted"""
+        return bool(self.td_attributes & 0x1)
+
+    def rtmr(self, index: int) -> memoryview:
+        if index not in range(4):
+            raise IndexError(f"RTMR index out of range: {index}")
+        return self._field(f'rtmr{index}')
+
+    @property
+    def rtmrs(self) -> Dict[int, str]:
+        """RTMRs as hex, in the same shape as TdxQuoteResponse.replay_rtmrs()"""
+        return {idx: self.rtmr(idx).hex() for idx in range(4)}
+
+    def field(self, name: str) -> memoryview:
+        return self._field(name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {
+            "version": self.version,
+            "attestation_key_type": self.attestation_key_type,
+            "tee_type": self.tee_type,
+            "signature_data_len": self.signature_data_len,
+        }
+        for name in TD_REPORT_FIELDS:
+            result[name] = self._field(name).hex()
+        return result
+
+
+def compare_measurements(quote: TdxQuote, tcb_info: Dict[str, Any]) -> List[str]:
+    """Return the measurements in tcb_info (mrtd, rtmr0-3) that do not match the quote"""
+    mismatches = []
+    expected = {'mrtd': quote.mr_td}
+    for idx in range(4):
+        expected[f'rtmr{idx}'] = quote.rtmr(idx)
+
+    for name, value in expected.items():
+        reported = tcb_info.get(name)
+        if reported is not None and reported.lower() != value.hex():
+            mismatches.append(name)
+    return mismatches
+
+
+def validate_quote(quote_hex: str, tcb_info: Dict[str, Any] = None) -> TdxQuote:
+    """Parse a quote and reject it locally before it is sent to the verifier or the contract"""
+    quote = TdxQuote.from_hex(quote_hex)
+    if quote.debug:
+        raise QuoteParseError("Quote comes from a debuggable TD")
+    if tcb_info:
+        mismatches = compare_measurements(quote, tcb_info)
+        if mismatches:
+            raise QuoteParseError(f"Quote measurements do not match tcb_info: {', '.join(mismatches)}")
+    return quote
@@ -7,6 +7,7 @@ import logging
 import base64
 
 from pydantic import BaseModel
+from src.tappd.quote import TdxQuote
 from typing import Union
 import httpx
 
@@ -72,6 +73,9 @@ class TdxQuoteResponse(BaseModel):
     quote: str
     event_log: str
 
+    def parse(self) -> TdxQuote:
+        return TdxQuote.from_hex(self.quote)
+
     def replay_rtmrs(self) -> Dict[int, str]:
         # NOTE: before dstack-0.3.0, event log might not a JSON file.
         parsed_event_log = json.loads(self.event_log)
@@ -0,0 +1,189 @@
+import atexit
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import traceback
+
+from typing import Any, Dict, Optional
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+PREFIXES = {DEBUG: "[DEBUG]", INFO: "[LOG]", WARNING: "[WARN]", ERROR: "[ERROR]"}
+
+DEFAULT_MAX_FIELD = 512  # characters kept of a payload field
+DEFAULT_QUEUE_SIZE = 10000  # records waiting for the writer before new ones are dropped
+FLUSH_TIMEOUT = 2.0
+
+
+def truncate(value: Any, limit: int, keep_tail: bool = False) -> Any:
+    """JSON friendly value capped at limit characters, numbers and booleans pass through"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else repr(value)
+    if len(text) <= limit:
+        return text
+    cut = len(text) - limit
+    if keep_tail:
+        return f"...(-{cut} chars){text[-limit:]}"
+    return f"{text[:limit]}...(+{cut} chars)"
+
+
+def parse_sample_rates(spec: Optional[str]) -> Dict[str, float]:
+    """Rates from "event=rate,event=rate", rates outside [0, 1] are clamped"""
+    rates = {}
+    for item in (spec or "").split(','):
+        if '=' not in item:
+            continue
+        event, rate = item.split('=', 1)
+        try:
+            rates[event.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+class EventLogger:
+    """Structured events formatted and written by a background thread, so callers never block on stdout"""
+
+    def __init__(self, level: int = INFO, json_mode: bool = False, max_field: int = DEFAULT_MAX_FIELD,
+                 sample_rates: Optional[Dict[str, float]] = None, stream=None,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, rng=random.random):
+        self.level = level
+        self.json_mode = json_mode
+        self.max_field = max_field
+        self.sample_rates = sample_rates or {}
+        self.stream = stream
+        self.rng = rng
+        self.dropped = 0
+        self.sampled_out = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    def log(self, level: int, event: str, message: str = "", sample: Optional[float] = None,
+            exc_info: bool = False, **fields):
+        """Queue one event, fields are capped here so the record holds no reference to large objects"""
+        if not self.enabled(level):
+            return
+        rate = self.sample_rates.get(event, 1.0 if sample is None else sample)
+        if rate < 1.0 and self.rng() >= rate:
+            self.sampled_out += 1
+            return
+
+        record = {"ts": time.time(), "level": level, "event": event, "message": truncate(message, self.max_field)}
+        for key, value in fields.items():
+            record[key] = truncate(value, self.max_field)
+        if exc_info:
+            # The raising frame is at the bottom, keep that end of long tracebacks
+            record["traceback"] = truncate(traceback.format_exc(), self.max_field * 4, keep_tail=True)
+
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def debug(self, event: str, message: str = "", **fields):
+        self.log(DEBUG, event, message, **fields)
+
+    def info(self, event: str, message: str = "", **fields):
+        self.log(INFO, event, message, **fields)
+
+    def warning(self, event: str, message: str = "", **fields):
+        self.log(WARNING, event, message, **fields)
+
+    def error(self, event: str, message: str = "", **fields):
+        self.log(ERROR, event, message, **fields)
+
+    def format(self, record: Dict[str, Any]) -> str:
+        if self.json_mode:
+            return json.dumps({**record, "level": LEVEL_NAMES[record["level"]]}, separators=(',', ':'), default=str)
+        extras = " ".join(
+            f"{key}={value}" for key, value in record.items() if key not in ("ts", "level", "event", "message", "traceback")
+        )
+        line = " ".join(part for part in (PREFIXES[record["level"]], record["message"] or record["event"], extras) if part)
+        if "traceback" in record:
+            line += "\n" + record["traceback"]
+        return line
+
+    def _ensure_writer(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="event-logger", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            if isinstance(record, threading.Event):
+                record.set()
+                continue
+            try:
+                stream = self.stream or sys.stdout
+                stream.write(self.format(record) + "\n")
+                stream.flush()
+            except Exception:
+                # A logger that raises would take the cycle down with it
+                pass
+
+    def flush(self, timeout: float = FLUSH_TIMEOUT) -> bool:
+        """Wait until everything queued so far is written"""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+
+_logger: Optional[EventLogger] = None
+
+
+def logger_from_env() -> EventLogger:
+    return EventLogger(
+        level=LEVELS.get(os.getenv('LOG_LEVEL', 'info').lower(), INFO),
+        json_mode=os.getenv('LOG_FORMAT', 'text').lower() == 'json',
+        max_field=int(os.getenv('LOG_MAX_FIELD', str(DEFAULT_MAX_FIELD))),
+        sample_rates=parse_sample_rates(os.getenv('LOG_SAMPLE_RATES')),
+    )
+
+
+def get_logger() -> EventLogger:
+    """Process wide logger configured from LOG_LEVEL, LOG_FORMAT, LOG_MAX_FIELD and LOG_SAMPLE_RATES"""
+    global _logger
+    if _logger is None:
+        _logger = logger_from_env()
+        atexit.register(_logger.flush)
+    return _logger
+
+
+def debug(event: str, message: str = "", **fields):
+    get_logger().log(DEBUG, event, message, **fields)
+
+
+def info(event: str, message: str = "", **fields):
+    get_logger().log(INFO, event, message, **fields)
+
+
+def warning(event: str, message: str = "", **fields):
+    get_logger().log(WARNING, event, message, **fields)
+
+
+def error(event: str, message: str = "", **fields):
+    get_logger().log(ERROR, event, message, **fields)
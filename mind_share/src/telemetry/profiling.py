@@ -0,0 +1,227 @@
+import collections
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+
+from typing import Callable, List, Optional
+from src.telemetry import log
+
+CPROFILE = "cprofile"
+SAMPLE = "sample"
+PROFILE_MODES = (CPROFILE, SAMPLE)
+
+DEFAULT_DIR = "profiles"
+DEFAULT_INTERVAL = 0.005  # seconds between stack samples
+SUMMARY_LINES = 40
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread from a background thread and keeps folded stacks for flame graphs"""
+
+    def __init__(self, thread_id: int, interval: float = DEFAULT_INTERVAL, prefix: Callable[[], List[str]] = list):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.prefix = prefix
+        self.counts = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        stack = []
+        while frame is not None:
+            stack.append(frame_label(frame))
+            frame = frame.f_back
+        stack.reverse()
+        self.counts[";".join(self.prefix() + stack)] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cycle-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def folded(self) -> str:
+        """One "frame;frame;frame count" line per stack, the input of flamegraph.pl and speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+class CycleProfiler:
+    """Profiles the next N scheduler cycles, or only their selected stages, once armed by env or signal"""
+
+    def __init__(self, output_dir: str = DEFAULT_DIR, mode: str = CPROFILE, stages: Optional[List[str]] = None,
+                 interval: float = DEFAULT_INTERVAL, armed: int = 0, cycles_per_signal: int = 1):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode}, expected one of {PROFILE_MODES}")
+        self.output_dir = output_dir
+        self.mode = mode
+        self.stages = set(stages or [])
+        self.interval = interval
+        self.armed = armed
+        self.cycles_per_signal = cycles_per_signal
+        self.written: List[str] = []
+        self._cycles = 0
+        self._active = False
+        self._stage_stack: List[str] = []
+        self._selected = 0
+        self._profile = None
+        self._sampler = None
+        self._owner = None
+        # cProfile only sees the thread that enabled it, stages the pipeline runs in worker threads get their own
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._thread_state = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "CycleProfiler":
+        stages = [stage.strip() for stage in os.getenv('PROFILE_STAGES', '').split(',') if stage.strip()]
+        return cls(
+            output_dir=os.getenv('PROFILE_DIR', DEFAULT_DIR),
+            mode=os.getenv('PROFILE_MODE', CPROFILE).lower(),
+            stages=stages,
+            interval=float(os.getenv('PROFILE_INTERVAL_MS', str(DEFAULT_INTERVAL * 1000))) / 1000,
+            armed=int(os.getenv('PROFILE_CYCLES', '0')),
+            cycles_per_signal=int(os.getenv('PROFILE_SIGNAL_CYCLES', '1')),
+        )
+
+    def arm(self, cycles: int = 1):
+        """Profile the next cycles, adding to any already armed"""
+        self.armed += cycles
+        log.info("profile.armed", f"Profiling armed for the next {self.armed} cycles ({self.mode})")
+
+    def install_signal(self, signum=getattr(signal, 'SIGUSR1', None)) -> bool:
+        """kill -USR1 <pid> arms profiling of the next cycles without a redeploy"""
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signum, lambda *_: self.arm(self.cycles_per_signal))
+        return True
+
+    def _start(self):
+        if self.mode == CPROFILE:
+            self._profile = self._profile or cProfile.Profile()
+            self._profile.enable()
+        else:
+            if self._sampler is None:
+                self._sampler = SamplingProfiler(threading.get_ident(), self.interval, lambda: list(self._stage_stack))
+            self._sampler.start()
+
+    def _stop(self):
+        if self.mode == CPROFILE:
+            self._profile.disable()
+        else:
+            self._sampler.stop()
+
+    @contextlib.contextmanager
+    def cycle(self, label: str = "cycle"):
+        """Profile the wrapped cycle while armed, whole or only the selected stages"""
+        if self.armed <= 0 or self._active:
+            yield
+            return
+        self.armed -= 1
+        self._cycles += 1
+        self._active = True
+        self._owner = threading.get_ident()
+        whole = not self.stages
+        if whole:
+            self._start()
+        try:
+            yield
+        finally:
+            if whole:
+                self._stop()
+            self._active = False
+            self._write(label)
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Profile a selected stage of an armed cycle, overlapping selected stages share one window"""
+        if not self._active:
+            yield
+            return
+        selected = name in self.stages
+        if threading.get_ident() != self._owner:
+            with self._thread_stage(selected or not self.stages):
+                yield
+            return
+        # Samples are prefixed with the active stages, so one flame graph splits the cycle by stage
+        self._stage_stack.append(name)
+        if selected:
+            self._selected += 1
+            if self._selected == 1:
+                self._start()
+        try:
+            yield
+        finally:
+            if selected:
+                self._selected -= 1
+                if self._selected == 0:
+                    self._stop()
+            # Concurrent quotes can leave their stages out of order
+            self._stage_stack.remove(name)
+
+    @contextlib.contextmanager
+    def _thread_stage(self, wanted: bool):
+        """Profile a stage running in a worker thread with a profile of its own, merged when the cycle is written"""
+        if not wanted or self.mode != CPROFILE or getattr(self._thread_state, 'profile', None) is not None:
+            yield
+            return
+        profile = cProfile.Profile()
+        self._thread_state.profile = profile
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._thread_state.profile = None
+            with self._lock:
+                self._thread_profiles.append(profile)
+
+    def _write(self, label: str):
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{label}-{time.strftime('%Y%m%d-%H%M%S')}-{self._cycles}")
+        if self.mode == CPROFILE:
+            with self._lock:
+                profiles = [profile for profile in [self._profile] + self._thread_profiles if profile is not None]
+                self._thread_profiles = []
+            if not profiles:
+                return
+            summary = io.StringIO()
+            stats = pstats.Stats(*profiles, stream=summary)
+            stats.dump_stats(base + ".prof")
+            stats.sort_stats("cumulative").print_stats(SUMMARY_LINES)
+            with open(base + ".txt", 'w') as file:
+                file.write(summary.getvalue())
+            self.written += [base + ".prof", base + ".txt"]
+            self._profile = None
+        else:
+            if self._sampler is None:
+                return
+            with open(base + ".folded", 'w') as file:
+                file.write(self._sampler.folded())
+            self.written.append(base + ".folded")
+            self._sampler = None
+        log.info("profile.written", f"Profile of {label} written to {base}")
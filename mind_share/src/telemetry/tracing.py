@@ -0,0 +1,248 @@
+import contextlib
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+
+from typing import Any, Dict, List, Optional
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024  # bytes of a trace file before it is rotated
+DEFAULT_BACKUPS = 3
+SERVICE_NAME = "mindshare-scheduler"
+SCOPE_NAME = "src.telemetry.tracing"
+
+STATUS_UNSET = "STATUS_CODE_UNSET"
+STATUS_OK = "STATUS_CODE_OK"
+STATUS_ERROR = "STATUS_CODE_ERROR"
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def otel_value(value: Any) -> Dict[str, Any]:
+    """OTLP/JSON AnyValue of a Python value, unknown types are sent as their string"""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [otel_value(item) for item in value]}}
+    return {"stringValue": value if isinstance(value, str) else str(value)}
+
+
+def otel_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": otel_value(value)} for key, value in attributes.items() if value is not None]
+
+
+class Span:
+    """One timed stage of a cycle, ended by the tracer that started it"""
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = STATUS_UNSET
+        self.status_message = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def set_error(self, message: str):
+        self.status = STATUS_ERROR
+        self.status_message = message
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.status == STATUS_UNSET:
+            self.status = STATUS_OK
+        self.tracer.finish(self)
+
+    @property
+    def duration(self) -> Optional[float]:
+        return (self.end_ns - self.start_ns) / 1e9 if self.end_ns is not None else None
+
+    def to_otel(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": otel_attributes(self.attributes),
+            "status": {"code": self.status},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+class NoopSpan:
+    """Stands in for a span while tracing is off, so instrumented code needs no checks"""
+
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def set_error(self, message: str):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class RotatingJsonlExporter:
+    """Appends one OTLP/JSON ExportTraceServiceRequest per line and rotates the file past max_bytes"""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, backups: int = DEFAULT_BACKUPS,
+                 service_name: str = SERVICE_NAME):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def request(self, spans: List[Span]) -> Dict[str, Any]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": otel_attributes({"service.name": self.service_name})},
+            "scopeSpans": [{"scope": {"name": SCOPE_NAME}, "spans": [span.to_otel() for span in spans]}],
+        }]}
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def export(self, spans: List[Span]):
+        line = json.dumps(self.request(spans), separators=(',', ':')) + "\n"
+        with self._lock:
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                self._rotate()
+            with open(self.path, 'a') as file:
+                file.write(line)
+
+
+class Tracer:
+    """Parents spans through a context variable, so concurrent quotes of one cycle each keep their own branch"""
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+        # Finished spans of traces whose root is still open
+        self._buffers: Dict[str, List[Span]] = {}
+        self._lock = threading.Lock()
+        # Context manager factory entered around every span by name, the cycle profiler uses it to select stages
+        self.stage_hook = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def current_span(self):
+        return _current_span.get() or NOOP_SPAN
+
+    def start_span(self, name: str, parent=None, new_trace: bool = False, **attributes):
+        """Start a span under parent (the current span by default), the caller ends it"""
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = parent if parent is not None else _current_span.get()
+        if new_trace or not isinstance(parent, Span):
+            span = Span(self, name, secrets.token_hex(16), None, attributes)
+            with self._lock:
+                self._buffers[span.trace_id] = []
+            return span
+        return Span(self, name, parent.trace_id, parent.span_id, attributes)
+
+    @contextlib.contextmanager
+    def span(self, name: str, new_trace: bool = False, **attributes):
+        """Time the block as a child of the current span, exceptions mark it as failed"""
+        with self.stage_hook(name) if self.stage_hook is not None else contextlib.nullcontext():
+            span = self.start_span(name, new_trace=new_trace, **attributes)
+            if span is NOOP_SPAN:
+                yield span
+                return
+            token = _current_span.set(span)
+            try:
+                yield span
+            except BaseException as e:
+                span.set_error(f"{type(e).__name__}: {e}")
+                raise
+            finally:
+                _current_span.reset(token)
+                span.end()
+
+    @contextlib.contextmanager
+    def cycle(self, **attributes):
+        """Root span of one rebalance, its trace id doubles as the cycle id"""
+        with self.span("cycle", new_trace=True, **attributes) as span:
+            span.set_attribute("cycle.id", span.trace_id)
+            yield span
+
+    def finish(self, span: Span):
+        """Buffer spans of a trace and export them in one line when its root ends"""
+        with self._lock:
+            if span.parent_id is None:
+                spans = self._buffers.pop(span.trace_id, []) + [span]
+            elif span.trace_id in self._buffers:
+                self._buffers[span.trace_id].append(span)
+                return
+            else:
+                # The root already ended, e.g. a sign_trade resumed after its cycle stopped waiting
+                spans = [span]
+        try:
+            self.exporter.export(spans)
+        except Exception:
+            # Tracing must never fail a cycle
+            pass
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """Process wide tracer, exporting to TRACE_PATH when it is set and a no-op otherwise"""
+    global _tracer
+    if _tracer is None:
+        path = os.getenv('TRACE_PATH')
+        exporter = None
+        if path:
+            exporter = RotatingJsonlExporter(
+                path,
+                max_bytes=int(os.getenv('TRACE_MAX_BYTES', str(DEFAULT_MAX_BYTES))),
+                backups=int(os.getenv('TRACE_BACKUPS', str(DEFAULT_BACKUPS))),
+            )
+        _tracer = Tracer(exporter)
+    return _tracer
+
+
+def reset_tracer():
+    """Forget the tracer, the next get_tracer reads TRACE_PATH again"""
+    global _tracer
+    _tracer = None
@@ -0,0 +1,219 @@
+import contextlib
+import fcntl
+import os
+
+import numpy as np
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+TIMESTAMPS = "ts.i8"  # unix seconds, non-decreasing
+VALUES = "value.f8"
+LOCK = ".lock"
+MINDSHARE = "mindshare"
+PRICE = "price"
+STABLE_TOKENS = ("USDC",)  # priced at one dollar, the quotes against them price the other side
+
+
+class Column:
+    """One append-only column file, read through a memory map that grows with the file"""
+
+    def __init__(self, path: str, dtype):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self._map = None
+
+    def __len__(self) -> int:
+        try:
+            return os.stat(self.path).st_size // self.dtype.itemsize
+        except FileNotFoundError:
+            return 0
+
+    def view(self, length: int) -> np.ndarray:
+        """First length rows, remapped only when another writer grew the file"""
+        if length == 0:
+            return np.empty(0, self.dtype)
+        if self._map is None or len(self._map) < length:
+            # A plain ndarray over the mapping, slicing a np.memmap costs more than the read itself
+            self._map = np.asarray(np.memmap(self.path, dtype=self.dtype, mode='r', shape=(length,)))
+        return self._map[:length]
+
+    def append(self, values: np.ndarray):
+        with open(self.path, 'ab') as file:
+            file.write(np.ascontiguousarray(values, dtype=self.dtype).tobytes())
+
+    def truncate(self, length: int):
+        os.truncate(self.path, length * self.dtype.itemsize)
+        self._map = None
+
+    def overwrite_last(self, value):
+        with open(self.path, 'r+b') as file:
+            file.seek(-self.dtype.itemsize, os.SEEK_END)
+            file.write(np.asarray(value, dtype=self.dtype).tobytes())
+
+
+class Series:
+    """Timestamps and values of one token in two column files, windows are found by binary search on the map"""
+
+    def __init__(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self.timestamps = Column(os.path.join(path, TIMESTAMPS), np.int64)
+        self.values = Column(os.path.join(path, VALUES), np.float64)
+        self.lock_path = os.path.join(path, LOCK)
+
+    def __len__(self) -> int:
+        # Values are written before timestamps, a row exists once both are on disk
+        return min(len(self.timestamps), len(self.values))
+
+    def columns(self) -> Tuple[np.ndarray, np.ndarray]:
+        length = len(self)
+        return self.timestamps.view(length), self.values.view(length)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Exclusive write lock, agents of several portfolios may share one store"""
+        with open(self.lock_path, 'a') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def _repair(self):
+        """Cut the rows a crashed writer left in one column only, or every later row would pair with the wrong value"""
+        length = len(self)
+        for column in (self.timestamps, self.values):
+            if os.path.exists(column.path) and os.stat(column.path).st_size != length * column.dtype.itemsize:
+                column.truncate(length)
+
+    def append(self, timestamps, values) -> int:
+        """Append observations newer than the last one, a repeated last timestamp updates its value"""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        order = np.argsort(timestamps, kind='stable')
+        timestamps, values = timestamps[order], values[order]
+
+        with self._locked():
+            self._repair()
+            return self._append(timestamps, values)
+
+    def _append(self, timestamps: np.ndarray, values: np.ndarray) -> int:
+        stored, _ = self.columns()
+        if len(stored):
+            last = stored[-1]
+            if (timestamps == last).any():
+                self.values.overwrite_last(values[timestamps == last][-1])
+            newer = timestamps > last
+            timestamps, values = timestamps[newer], values[newer]
+        # Later duplicates of a timestamp win, as they would have overwritten it one by one
+        keep = np.append(timestamps[1:] != timestamps[:-1], True) if len(timestamps) else np.zeros(0, bool)
+        timestamps, values = timestamps[keep], values[keep]
+        if len(timestamps):
+            self.values.append(values)
+            self.timestamps.append(timestamps)
+        return len(timestamps)
+
+    def window(self, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Observations with start <= ts < end, views on the map rather than copies"""
+        timestamps, values = self.columns()
+        low = 0 if start is None else np.searchsorted(timestamps, start, side='left')
+        high = len(timestamps) if end is None else np.searchsorted(timestamps, end, side='left')
+        return timestamps[low:high], values[low:high]
+
+    def at(self, timestamp: int, columns: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Optional[float]:
+        """Last value observed at or before the timestamp"""
+        timestamps, values = columns or self.columns()
+        position = np.searchsorted(timestamps, timestamp, side='right') - 1
+        return float(values[position]) if position >= 0 else None
+
+    def latest(self) -> Optional[Tuple[int, float]]:
+        timestamps, values = self.columns()
+        return (int(timestamps[-1]), float(values[-1])) if len(timestamps) else None
+
+    def rolling_mean(self, seconds: int, end: Optional[int] = None) -> Optional[float]:
+        """Mean of the observations in the seconds before end, up to the latest one by default"""
+        timestamps, values = self.columns()
+        if not len(timestamps):
+            return None
+        end = int(timestamps[-1]) + 1 if end is None else end
+        low, high = np.searchsorted(timestamps, [end - seconds, end], side='left')
+        return float(values[low:high].mean()) if high > low else None
+
+    def delta(self, seconds: int, end: Optional[int] = None) -> Optional[float]:
+        """Change of the value over the seconds before end, up to the latest one by default"""
+        columns = self.columns()
+        if not len(columns[0]):
+            return None
+        end = int(columns[0][-1]) if end is None else end
+        now, before = self.at(end, columns), self.at(end - seconds, columns)
+        return None if now is None or before is None else now - before
+
+    def resample(self, timestamps: np.ndarray) -> np.ndarray:
+        """Last observed value at each timestamp, NaN before the first observation"""
+        stored, values = self.columns()
+        positions = np.searchsorted(stored, timestamps, side='right') - 1
+        resampled = values[np.maximum(positions, 0)] if len(values) else np.zeros(len(positions))
+        return np.where(positions >= 0, resampled, np.nan)
+
+
+class TimeSeriesStore:
+    """Mindshare and price series per token under one directory, appended by the agent and read by strategies"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._series: Dict[str, Series] = {}
+
+    def series(self, kind: str, token: str) -> Series:
+        key = f"{kind}/{token}"
+        if key not in self._series:
+            self._series[key] = Series(os.path.join(self.root, kind, token))
+        return self._series[key]
+
+    def tokens(self, kind: str) -> List[str]:
+        path = os.path.join(self.root, kind)
+        return sorted(os.listdir(path)) if os.path.isdir(path) else []
+
+    def record_mindshare(self, token: str, by_date: Dict[str, float]) -> int:
+        """Kaito mindshare values keyed by YYYY-MM-DD, the whole window the API returned"""
+        return self.series(MINDSHARE, token).append(
+            [to_timestamp(date) for date in by_date], [float(value) for value in by_date.values()]
+        )
+
+    def price(self, token: str) -> Optional[float]:
+        """Dollar price of a token, one for stablecoins and the latest recorded price otherwise"""
+        if token in STABLE_TOKENS:
+            return 1.0
+        latest = self.series(PRICE, token).latest()
+        return latest[1] if latest else None
+
+    def record_quote(self, token_in: str, amount_in: float, token_out: str, amount_out: float,
+                     observed_at: Optional[int] = None) -> int:
+        """Price a solver quote implies for one side, from the known price of the other side, observed now by default"""
+        if amount_in <= 0 or amount_out <= 0:
+            return 0
+        observed_at = now() if observed_at is None else observed_at
+        price_out = self.price(token_out)
+        if token_in not in STABLE_TOKENS and price_out is not None:
+            return self.series(PRICE, token_in).append([observed_at], [amount_out * price_out / amount_in])
+        price_in = self.price(token_in)
+        if token_out not in STABLE_TOKENS and price_in is not None:
+            return self.series(PRICE, token_out).append([observed_at], [amount_in * price_in / amount_out])
+        return 0
+
+
+def to_timestamp(value: str) -> int:
+    """Unix seconds of a YYYY-MM-DD date or an ISO 8601 time, UTC when no offset is given"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def now() -> int:
+    return int(datetime.now(timezone.utc).timestamp())
+
+
+def open_store(root: Optional[str] = None) -> Optional[TimeSeriesStore]:
+    """Store at root or TIMESERIES_DIR, None when neither is set"""
+    root = root or os.getenv('TIMESERIES_DIR')
+    return TimeSeriesStore(root) if root else None
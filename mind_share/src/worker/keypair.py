@@ -1,6 +1,6 @@
-from py_near.account import Account
-from near_api.signer import KeyPair
-from src.tappd.tappd import TappdClient
+from src.worker.sealed_identity import SealedIdentityStore
+from src.rpc.client import near_account
+from src.telemetry import log
 from nacl.signing import SigningKey
 from nacl.encoding import RawEncoder
 import secrets
@@ -8,6 +8,25 @@ import hashlib
 import os
 import base58
 
+def derive_ephemeral_key():
+    """Derive a fresh base58 ed25519 secret key from local randomness mixed with TEE entropy"""
+    from src.tappd.tappd import TappdClient
+
+    client = TappdClient()
+    
+    random_array = secrets.token_bytes(32) 
+    random_string = random_array.hex()
+    key_from_tee = client.derive_key(random_string, random_string)
+    
+    tee_bytes = key_from_tee.toBytes(32)
+    combined = random_array + tee_bytes
+    
+    hash_bytes = hashlib.sha256(combined).digest()
+    signing_key = SigningKey(seed=hash_bytes, encoder=RawEncoder)
+    verify_key = signing_key.verify_key
+    secret_key_bytes = signing_key.encode() + verify_key.encode()
+    return base58.b58encode(secret_key_bytes).decode('utf-8')
+
 class AgentWorker:
     def __init__(self):
         self.use_static_account = os.getenv('USE_STATIC_ACCOUNT', 'false').lower() == 'true'
@@ -15,7 +34,11 @@ class AgentWorker:
         self.signing_key = os.getenv('AGENT_KEY') if self.use_static_account else None
         self.account = None
         self.public_key = None
+        self.seal_identity = os.getenv('SEAL_WORKER_IDENTITY', 'false').lower() == 'true'
+        self.identity_store = SealedIdentityStore() if self.seal_identity and not self.use_static_account else None
+        self.restored_identity = False
         if self.use_static_account:
+            from near_api.signer import KeyPair
             keypair = KeyPair(self.signing_key)
             self.public_key = keypair._public_key
 
@@ -25,37 +48,36 @@ class AgentWorker:
             if not signing_key.startswith("ed25519:"):
                 signing_key = f"ed25519:{signing_key}"
             
-            self.account = Account(
-                account_id,
-                signing_key,  
-                self.get_provider(network)
-            )
+            # Calls go through the shared RPC client, failing over across the endpoint pool
+            self.account = near_account(account_id, signing_key, network)
             await self.account.startup()
-
-    def get_provider(self, network):
-        if network == 'testnet':
-            return 'https://rpc.testnet.near.org'
-        else:
-            return 'https://rpc.mainnet.near.org'
             
     def derive_ephemeral_account(self):
-        """Generate ephemeral account using TEE entropy"""
-        print(f"\n Deriving ephemeral account")
-        
-        client = TappdClient()
+        """Generate ephemeral account using TEE entropy, or restore the sealed one if enabled"""
+        if self.identity_store is not None:
+            identity = self.identity_store.unseal()
+            if identity is not None:
+                self.set_identity(identity['signing_key'])
+                self.restored_identity = True
+                log.info("worker.restored", f"Restored sealed ephemeral account: {self.account_id}")
+                return self.account_id, self.signing_key
+
+        log.info("worker.derive", "Deriving ephemeral account")
         
-        random_array = secrets.token_bytes(32) 
-        random_string = random_array.hex()
-        key_from_tee = client.derive_key(random_string, random_string)
+        secret_key = derive_ephemeral_key()
+
+        self.set_identity(secret_key)
         
-        tee_bytes = key_from_tee.toBytes(32)
-        combined = random_array + tee_bytes
+        if self.identity_store is not None:
+            self.identity_store.seal(self.account_id, self.signing_key)
+            log.info("worker.sealed", f"Sealed ephemeral account to {self.identity_store.path}")
         
-        hash_bytes = hashlib.sha256(combined).digest()
-        signing_key = SigningKey(seed=hash_bytes, encoder=RawEncoder)
-        verify_key = signing_key.verify_key
-        secret_key_bytes = signing_key.encode() + verify_key.encode()
-        secret_key = base58.b58encode(secret_key_bytes).decode('utf-8')
+        log.info("worker.created", f"Created ephemeral account: {self.account_id}")
+        return self.account_id, self.signing_key
+
+    def set_identity(self, secret_key):
+        """Set signing key, public key and implicit account ID from a base58 secret key"""
+        from near_api.signer import KeyPair
 
         keypair = KeyPair(secret_key)
 
@@ -64,9 +86,6 @@ class AgentWorker:
         
         # Generate implicit account ID from public key
         self.account_id = self.get_implicit_account_id()
-        
-        print(f"Created ephemeral account: {self.account_id}")
-        return self.account_id, self.signing_key
 
     def get_implicit_account_id(self):
         """Convert public key to implicit account ID
@@ -0,0 +1,181 @@
+import asyncio
+import os
+import time
+
+from typing import Callable, Dict, List, Optional
+from src.worker.keypair import derive_ephemeral_key
+from src.worker.pool_store import PoolStore
+from src.contract.sign_intent import SignIntentContract
+from src.rpc.client import get_rpc_client, near_account
+from src.rpc.endpoints import UnknownAccountError
+from src.scheduler.sharding import default_replica_id
+from src.telemetry import log
+
+DERIVED = "derived"
+FUNDED = "funded"
+REGISTERED = "registered"
+
+
+class PooledAccount:
+    """Ephemeral account kept warm in the pool"""
+
+    def __init__(self, signing_key: str, state: str = DERIVED, created_at: float = None):
+        from near_api.signer import KeyPair
+
+        keypair = KeyPair(signing_key)
+        self.signing_key = signing_key
+        self.public_key = "ed25519:" + keypair.encoded_public_key()
+        self.account_id = keypair.public_key.hex()
+        self.state = state
+        self.created_at = created_at or time.time()
+        self.error = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == REGISTERED
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"account_id": self.account_id, "signing_key": self.signing_key, "state": self.state,
+                "created_at": self.created_at}
+
+    @classmethod
+    def from_dict(cls, entry: Dict[str, str]) -> "PooledAccount":
+        return cls(entry["signing_key"], entry.get("state", DERIVED), entry.get("created_at"))
+
+
+class WorkerAccountPool:
+    """Derives ephemeral accounts ahead of time and advances them to funded and registered, replicas sharing a store share the pool"""
+
+    def __init__(
+            self,
+            size: int = None,
+            network: str = None,
+            derive_key: Callable[[], str] = derive_ephemeral_key,
+            check_funded=None,
+            register=None,
+            poll_interval: float = 10,
+            store: Optional[PoolStore] = None,
+            owner: str = None
+        ):
+        self.size = size if size is not None else int(os.getenv('WORKER_POOL_SIZE', '2'))
+        self.network = network or os.getenv('NETWORK')
+        self.derive_key = derive_key
+        self.check_funded = check_funded or self._check_funded
+        self.register = register or self._register
+        self.poll_interval = poll_interval
+        # Keys of accounts the operator may already have funded, they must survive a restart
+        self.store = store or PoolStore()
+        # Accounts handed to this owner stay its own, no replica is ever handed them again
+        self.owner = owner or default_replica_id()
+        self._task = None
+
+    def spare(self) -> List[PooledAccount]:
+        """Accounts of the pool not handed out yet"""
+        return [PooledAccount.from_dict(entry) for entry in self.store.spare()]
+
+    async def _check_funded(self, account: PooledAccount) -> bool:
+        try:
+            account_state = await get_rpc_client(self.network).view_account(account.account_id)
+            return int(account_state['amount']) > 0
+        except UnknownAccountError:
+            return False
+
+    async def _register(self, account: PooledAccount) -> bool:
+        worker_account = near_account(account.account_id, f"ed25519:{account.signing_key}", self.network)
+        await worker_account.startup()
+
+        contract = SignIntentContract(worker_public_key=account.public_key, worker_account=worker_account)
+        if await contract.initialize_worker():
+            return True
+
+        result = await contract.register_worker()
+        return bool(result.get("success"))
+
+    async def _advance(self, account: PooledAccount):
+        try:
+            if account.state == DERIVED and await self.check_funded(account):
+                account.state = FUNDED
+                log.info("pool.funded", f"Pooled account funded: {account.account_id}", account_id=account.account_id)
+
+            if account.state == FUNDED and await self.register(account):
+                account.state = REGISTERED
+                log.info("pool.registered", f"Pooled account registered: {account.account_id}", account_id=account.account_id)
+            account.error = None
+        except Exception as e:
+            account.error = str(e)
+            log.error("pool.advance_failed", f"Error advancing pooled account {account.account_id}: {str(e)}",
+                      account_id=account.account_id)
+
+    async def replenish(self):
+        """Top the pool up to its size and move every pending account one step forward"""
+        loop = asyncio.get_event_loop()
+        while len(self.store.spare()) < self.size:
+            # derive_key talks to tappd synchronously
+            signing_key = await loop.run_in_executor(None, self.derive_key)
+            account = PooledAccount(signing_key)
+            # Stored before the account is announced, so no transfer can reach a key that is not on disk.
+            # Another replica may have filled the pool meanwhile, the key is then dropped unannounced
+            if not self.store.add(account.to_dict(), self.size):
+                break
+            log.info("pool.derived", f"Pooled account derived, waiting for funds: {account.account_id}",
+                     account_id=account.account_id)
+
+        # One replica at a time advances an account, so no two send its registration
+        pending = [account for account in self.spare()
+                   if not account.ready and self.store.lock(account.account_id, self.owner)]
+        states = [account.state for account in pending]
+        await asyncio.gather(*(self._advance(account) for account in pending))
+        for account, state in zip(pending, states):
+            if account.state != state:
+                self.store.set_state(account.account_id, account.state)
+
+    async def run(self):
+        while True:
+            try:
+                await self.replenish()
+            except Exception as e:
+                log.error("pool.replenish_failed", f"Error replenishing worker pool: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """Replenish the pool in a background task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def acquire(self) -> Optional[PooledAccount]:
+        """Hand out a funded and registered account, or None if none is ready yet"""
+        entry = self.store.claim(self.owner, REGISTERED)
+        if entry is None:
+            return None
+        log.info("pool.acquired", f"Pooled account handed out: {entry['account_id']}", account_id=entry['account_id'],
+                 owner=self.owner)
+        return PooledAccount.from_dict(entry)
+
+    async def wait_for_ready(self, timeout: float = 300, check_interval: float = 1) -> Optional[PooledAccount]:
+        start_time = time.time()
+        while time.time() - start_time < timeout:
+            account = self.acquire()
+            if account is not None:
+                return account
+            await asyncio.sleep(check_interval)
+        return None
+
+    def pending_funding(self) -> List[str]:
+        """Account ids that still need a transfer before they can be registered"""
+        return [account.account_id for account in self.spare() if account.state == DERIVED]
+
+    def stats(self) -> Dict[str, int]:
+        counts = {DERIVED: 0, FUNDED: 0, REGISTERED: 0}
+        for account in self.spare():
+            counts[account.state] += 1
+        return counts
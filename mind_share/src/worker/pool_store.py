@@ -0,0 +1,149 @@
+import contextlib
+import json
+import sqlite3
+import time
+
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+from src.telemetry import log
+
+if TYPE_CHECKING:
+    from src.tappd.tappd import TappdClient
+
+DEFAULT_LOCK_TTL = 120.0  # seconds one replica advances an account before another may take over
+
+
+class PoolStore:
+    """Pooled accounts of one process, subclass it to share them between replicas"""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._accounts: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, tuple] = {}
+
+    def add(self, entry: Dict[str, Any], limit: int) -> bool:
+        """Add an account while fewer than limit are spare, False when the pool is already full"""
+        if len(self.spare()) >= limit:
+            return False
+        self._accounts[entry["account_id"]] = {**entry, "owner": None}
+        return True
+
+    def spare(self) -> List[Dict[str, Any]]:
+        """Accounts not handed out yet, oldest first"""
+        return sorted((entry for entry in self._accounts.values() if entry["owner"] is None),
+                      key=lambda entry: entry["created_at"])
+
+    def set_state(self, account_id: str, state: str):
+        self._accounts[account_id]["state"] = state
+
+    def lock(self, account_id: str, owner: str, ttl: float = DEFAULT_LOCK_TTL) -> bool:
+        """Take the right to advance a spare account when it is free, expired or already ours"""
+        now = self.clock()
+        holder, expires_at = self._locks.get(account_id, (owner, 0.0))
+        if holder != owner and expires_at > now:
+            return False
+        self._locks[account_id] = (owner, now + ttl)
+        return True
+
+    def claim(self, owner: str, state: str) -> Optional[Dict[str, Any]]:
+        """Hand owner the account it already holds, or the oldest spare one in state, never one held by another"""
+        held = [entry for entry in self._accounts.values() if entry["owner"] == owner]
+        if held:
+            return held[0]
+        for entry in self.spare():
+            if entry["state"] == state:
+                entry["owner"] = owner
+                return entry
+        return None
+
+
+class SqlitePoolStore(PoolStore):
+    """Pooled accounts in a SQLite file shared by every replica, keys sealed with the enclave key"""
+
+    def __init__(self, path: str, client: Optional["TappdClient"] = None, clock=time.time):
+        super().__init__(clock)
+        self.path = path
+        self.client = client
+        self._box = None
+        with self._transaction() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS accounts (account_id TEXT PRIMARY KEY, sealed_key BLOB NOT NULL, "
+                "state TEXT NOT NULL, created_at REAL NOT NULL, owner TEXT, locked_by TEXT, locked_until REAL)"
+            )
+
+    def _get_box(self):
+        if self._box is None:
+            from src.worker.sealed_identity import seal_box
+
+            self._box = seal_box(self.client)
+        return self._box
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so a read and the write it decides run as one step
+        connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+    def _entry(self, row) -> Optional[Dict[str, Any]]:
+        from nacl.exceptions import CryptoError
+
+        account_id, sealed_key, state, created_at, owner = row
+        try:
+            signing_key = json.loads(self._get_box().decrypt(sealed_key).decode('utf-8'))
+        except CryptoError:
+            log.warning("pool.unseal_failed", f"Pooled account {account_id} was sealed by another enclave, ignoring it",
+                        account_id=account_id)
+            return None
+        return {"account_id": account_id, "signing_key": signing_key, "state": state, "created_at": created_at, "owner": owner}
+
+    def _entries(self, connection, where: str, params=()) -> List[Dict[str, Any]]:
+        rows = connection.execute(
+            f"SELECT account_id, sealed_key, state, created_at, owner FROM accounts WHERE {where} ORDER BY created_at", params
+        ).fetchall()
+        return [entry for entry in map(self._entry, rows) if entry is not None]
+
+    def add(self, entry: Dict[str, Any], limit: int) -> bool:
+        sealed_key = self._get_box().encrypt(json.dumps(entry["signing_key"]).encode('utf-8'))
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "INSERT INTO accounts (account_id, sealed_key, state, created_at) SELECT ?, ?, ?, ? "
+                "WHERE (SELECT COUNT(*) FROM accounts WHERE owner IS NULL) < ?",
+                (entry["account_id"], sealed_key, entry["state"], entry["created_at"], limit)
+            )
+            return cursor.rowcount > 0
+
+    def spare(self) -> List[Dict[str, Any]]:
+        with self._transaction() as connection:
+            return self._entries(connection, "owner IS NULL")
+
+    def set_state(self, account_id: str, state: str):
+        with self._transaction() as connection:
+            connection.execute("UPDATE accounts SET state = ? WHERE account_id = ?", (state, account_id))
+
+    def lock(self, account_id: str, owner: str, ttl: float = DEFAULT_LOCK_TTL) -> bool:
+        now = self.clock()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE accounts SET locked_by = ?, locked_until = ? WHERE account_id = ? AND owner IS NULL "
+                "AND (locked_by IS NULL OR locked_by = ? OR locked_until <= ?)",
+                (owner, now + ttl, account_id, owner, now)
+            )
+            return cursor.rowcount > 0
+
+    def claim(self, owner: str, state: str) -> Optional[Dict[str, Any]]:
+        with self._transaction() as connection:
+            held = self._entries(connection, "owner = ?", (owner,))
+            if held:
+                return held[0]
+            for entry in self._entries(connection, "owner IS NULL AND state = ?", (state,)):
+                connection.execute("UPDATE accounts SET owner = ? WHERE account_id = ?", (owner, entry["account_id"]))
+                return {**entry, "owner": owner}
+        return None
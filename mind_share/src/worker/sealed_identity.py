@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+
+from nacl.secret import SecretBox
+from nacl.exceptions import CryptoError
+from typing import Any, Dict, Optional, TYPE_CHECKING
+from src.constants import SEALED_IDENTITY_PATH
+from src.telemetry import log
+
+if TYPE_CHECKING:
+    from src.tappd.tappd import TappdClient
+
+SEAL_KEY_PATH = "mindshare/worker-identity-seal"
+
+
+def seal_box(client: Optional["TappdClient"] = None) -> SecretBox:
+    """Box keyed by the enclave, the same key for every replica of the app"""
+    from src.tappd.tappd import TappdClient
+
+    client = client or TappdClient()
+    # derive_key is deterministic for the same app and path, the DER is hashed to a 32 byte secret
+    key_from_tee = client.derive_key(SEAL_KEY_PATH, SEAL_KEY_PATH)
+    return SecretBox(hashlib.sha256(key_from_tee.toBytes()).digest())
+
+
+class SealedIdentityStore:
+    """Keeps the worker identity on disk, encrypted with a key only this enclave can derive"""
+
+    def __init__(self, path: str = SEALED_IDENTITY_PATH, client: Optional["TappdClient"] = None):
+        self.path = path
+        self.client = client
+        self._box = None
+
+    def _get_box(self) -> SecretBox:
+        if self._box is None:
+            self._box = seal_box(self.client)
+        return self._box
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def seal(self, account_id: str, signing_key: str):
+        """Encrypt and persist the identity, the file is replaced atomically"""
+        self._write({"account_id": account_id, "signing_key": signing_key})
+
+    def unseal(self) -> Optional[Dict[str, str]]:
+        """Return the sealed identity, or None if there is none or it was sealed by another enclave"""
+        identity = self._read()
+        if not identity or not identity.get('account_id') or not identity.get('signing_key'):
+            return None
+        return identity
+
+    def _write(self, payload: Any):
+        sealed = self._get_box().encrypt(json.dumps(payload).encode('utf-8'))
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as file:
+            file.write(sealed)
+        os.replace(tmp_path, self.path)
+
+    def _read(self) -> Optional[Any]:
+        if not self.exists():
+            return None
+
+        with open(self.path, 'rb') as file:
+            sealed = file.read()
+
+        try:
+            payload = self._get_box().decrypt(sealed)
+        except CryptoError:
+            log.warning("identity.unseal_failed", f"Sealed file at {self.path} cannot be decrypted by this enclave, ignoring it")
+            return None
+        return json.loads(payload.decode('utf-8'))
+
+    def clear(self):
+        if self.exists():
+            os.remove(self.path)
@@ -0,0 +1,82 @@
+import asyncio
+import base58
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from src.contract.access_keys import AccessKeyManager, FULL_ACCESS_SCOPE, FUNCTION_CALL_SCOPE
+from src.contract.sign_intent import SIGN_TRADE_DEPOSIT
+
+BLOCK_HASH = base58.b58encode(b"\x01" * 32).decode('utf-8')
+
+
+@pytest.fixture
+def account():
+    account = Mock()
+    account.account_id = "worker.near"
+    account.signer = b"\x02" * 64
+    account.sign_and_submit_tx = AsyncMock()
+    account.function_call = AsyncMock(return_value="primary")
+
+    provider = Mock()
+    provider.get_access_key_list = AsyncMock(return_value={"keys": []})
+    provider.get_access_key = AsyncMock(return_value={"nonce": 100})
+    provider.get_status = AsyncMock(return_value={"sync_info": {"latest_block_hash": BLOCK_HASH}})
+    provider.send_tx_and_wait = AsyncMock(return_value="sent")
+    account.provider = provider
+    return account
+
+
+def test_provision_adds_missing_keys_in_one_transaction(account):
+    manager = AccessKeyManager(account, contract_id="sign.near", size=3)
+    asyncio.run(manager.provision())
+
+    account.sign_and_submit_tx.assert_awaited_once()
+    receiver_id, actions = account.sign_and_submit_tx.call_args[0]
+    assert receiver_id == "worker.near"
+    assert len(actions) == 3
+    assert [key.nonce for key in manager.keys] == [100, 100, 100]
+
+
+def test_provision_is_idempotent(account):
+    first = AccessKeyManager(account, contract_id="sign.near", size=2)
+    asyncio.run(first.provision())
+
+    account.provider.get_access_key_list.return_value = {
+        "keys": [{"public_key": key.public_key} for key in first.keys]
+    }
+    account.sign_and_submit_tx.reset_mock()
+    asyncio.run(AccessKeyManager(account, contract_id="sign.near", size=2).provision())
+
+    account.sign_and_submit_tx.assert_not_awaited()
+
+
+def test_calls_are_spread_round_robin(account):
+    manager = AccessKeyManager(account, contract_id="sign.near", size=2, scope=FULL_ACCESS_SCOPE)
+
+    async def scenario():
+        await manager.provision()
+        await asyncio.gather(*(manager.function_call("sign_trade", {"quote": "q"}, gas=1, amount=1) for _ in range(4)))
+
+    asyncio.run(scenario())
+
+    assert account.provider.send_tx_and_wait.await_count == 4
+    assert [key.nonce for key in manager.keys] == [102, 102]
+
+
+def test_default_keys_can_sign_trades(account, monkeypatch):
+    monkeypatch.delenv('SIGNING_ACCESS_KEY_SCOPE', raising=False)
+    manager = AccessKeyManager(account, contract_id="sign.near", size=2)
+    asyncio.run(manager.provision())
+
+    assert manager.can_sign(SIGN_TRADE_DEPOSIT)
+
+
+def test_deposit_calls_fall_back_to_account_key(account):
+    manager = AccessKeyManager(account, contract_id="sign.near", size=2, scope=FUNCTION_CALL_SCOPE)
+
+    async def scenario():
+        await manager.provision()
+        return await manager.function_call("sign_trade", {"quote": "q"}, gas=1, amount=1)
+
+    assert asyncio.run(scenario()) == "primary"
+    account.provider.send_tx_and_wait.assert_not_awaited()
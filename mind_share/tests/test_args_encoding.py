@@ -0,0 +1,41 @@
+import pytest
+
+from src.bench.args import run
+from src.contract.encoding import ARGS_ENCODINGS, ArgsEncoding, borsh_bytes, decode_call
+from src.rpc.client import serialize_args
+from src.simulator.driver import SimulatorStack, run_load
+
+QUOTE = '{"signer_id":"alice.near","intents":[{"intent":"token_diff","diff":{"nep141:wrap.near":"-1"}}]}'
+
+
+@pytest.mark.parametrize("name", ARGS_ENCODINGS)
+def test_every_encoding_decodes_to_the_original_args(name):
+    encoding = ArgsEncoding(name)
+    message = b"\x19Ethereum Signed Message:\n" + QUOTE.encode('utf-8')
+
+    payload_call = decode_call(encoding.method("generate_payload"), serialize_args(encoding.encode("generate_payload", message)))
+    sign_call = decode_call(encoding.method("sign_trade"), serialize_args(encoding.encode("sign_trade", QUOTE.encode('utf-8'))))
+
+    assert payload_call == ("generate_payload", {"data": list(message)})
+    assert sign_call == ("sign_trade", {"quote": QUOTE})
+    assert encoding.method("register_worker") == "register_worker"
+
+
+def test_borsh_args_are_the_length_prefixed_bytes():
+    assert borsh_bytes(b"abc") == b"\x03\x00\x00\x00abc"
+    with pytest.raises(ValueError):
+        decode_call("sign_trade_borsh", b"\x05\x00\x00\x00abc")
+
+
+def test_compact_encodings_shrink_the_payload_args():
+    sizes = {name: stats["args_bytes"] for name, stats in run(repeat=1)["methods"]["generate_payload"].items()}
+    assert sizes["borsh"] < sizes["base64"] < sizes["json"] < sizes["json-spaced"]
+
+
+def test_borsh_args_work_end_to_end(monkeypatch):
+    monkeypatch.setenv('CONTRACT_ARGS_ENCODING', 'borsh')
+    with SimulatorStack(tx_delay=0.05, poll_interval=0.05) as stack:
+        report = run_load(stack, instances=1, cycles=1)
+
+    assert report["failed_instances"] == []
+    assert report["signatures"] == 1 and report["published"] == 1
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch, Mock
+
+from src.contract.attestation import CollateralCache, LocalProofVerifier, collateral_expiry, quote_hash
+from src.contract.sign_intent import SignIntentContract
+
+with open('samples/quote_hex.json', 'r') as file:
+    QUOTE_HEX = json.load(file)['QUOTE_HEX']
+# Before the nextUpdate of the sample collateral (2025-04-09T23:38:16Z)
+NOW = 1743000000.0
+
+
+@pytest.fixture
+def collateral():
+    with open('samples/quote_collateral.json', 'r') as file:
+        return json.load(file)
+
+
+def test_collateral_expiry_uses_earliest_next_update(collateral):
+    # qe_identity expires before tcb_info in the sample
+    assert collateral_expiry(collateral) == 1744241896.0
+
+
+def test_cache_hit_until_ttl(collateral):
+    clock = Mock(return_value=NOW)
+    cache = CollateralCache(ttl=60, clock=clock)
+    cache.put(QUOTE_HEX, "checksum", collateral)
+
+    assert cache.get(QUOTE_HEX)["checksum"] == "checksum"
+
+    clock.return_value = NOW + 61
+    assert cache.get(QUOTE_HEX) is None
+
+
+def test_cache_expires_at_collateral_next_update(collateral):
+    clock = Mock(return_value=NOW)
+    cache = CollateralCache(ttl=10**9, clock=clock)
+    entry = cache.put(QUOTE_HEX, "checksum", collateral)
+
+    assert entry["expires_at"] == collateral_expiry(collateral)
+
+
+def test_local_verifier_checksum(collateral):
+    verifier = LocalProofVerifier(collateral=collateral)
+    result = asyncio.run(verifier.upload(QUOTE_HEX))
+
+    assert result["checksum"] == quote_hash(QUOTE_HEX)
+    assert verifier.uploads == 1
+
+
+class FakeTappdClient:
+    quotes = 0
+
+    async def get_info(self):
+        with open('samples/tcb_info.json', 'r') as file:
+            return {"tcb_info": file.read()}
+
+    async def tdx_quote(self, report_data, hash_algorithm=''):
+        FakeTappdClient.quotes += 1
+        return Mock(quote=QUOTE_HEX)
+
+
+def test_prepare_attestation_reuses_cached_artifacts(collateral):
+    contract = SignIntentContract(worker_public_key="ed25519:test", worker_account=Mock())
+    contract.verifier = LocalProofVerifier(collateral=collateral)
+    contract.collateral_cache = CollateralCache(clock=lambda: NOW)
+    FakeTappdClient.quotes = 0
+
+    with patch('src.tappd.tappd.AsyncTappdClient', FakeTappdClient):
+        first = asyncio.run(contract.prepare_attestation())
+        second = asyncio.run(contract.prepare_attestation())
+
+    assert first == second
+    assert first["tcb_info"].startswith('{"rootfs_hash":')
+    assert FakeTappdClient.quotes == 1
+    assert contract.verifier.uploads == 1
+
+
+def test_local_verifier_artifacts_outlive_the_sample_next_update(collateral):
+    # The sample collateral's nextUpdate is in the past, the real clock is after it
+    contract = SignIntentContract(worker_public_key="ed25519:test", worker_account=Mock())
+    contract.verifier = LocalProofVerifier(collateral=collateral)
+
+    with patch('src.tappd.tappd.AsyncTappdClient', FakeTappdClient):
+        asyncio.run(contract.prepare_attestation())
+        asyncio.run(contract.prepare_attestation())
+
+    assert contract.verifier.uploads == 1
@@ -0,0 +1,74 @@
+import numpy as np
+
+from src.backtest.engine import Backtester, MarketHistory, param_grid
+from src.backtest.strategies import MindshareMomentum, RecordedResponses, Strategy
+from src.backtest.sweep import sweep
+from src.bench.harness import SAMPLE_CASSETTE_PATH
+
+TOKENS = ["USDC", "NEAR", "ETH"]
+
+
+class SwapOnce(Strategy):
+    """Swaps a share of USDC into ETH at the first step"""
+
+    def __init__(self, shares):
+        super().__init__({"share": shares})
+
+    def decide(self, step, history, balances):
+        fractions = np.zeros((self.sets, 3, 3))
+        if step == 0:
+            fractions[:, 0, 2] = self.params["share"]
+        return fractions
+
+
+def flat_history(steps=4):
+    prices = np.tile([1.0, 3.0, 2000.0], (steps, 1))
+    return MarketHistory(TOKENS, prices, np.full((steps, 3), 0.1))
+
+
+def test_fills_charge_the_fee_and_keep_the_rest_of_the_value():
+    result = Backtester(flat_history(), fee_bps=100).run(SwapOnce([0.5, 0.0005]), {"USDC": 100.0, "ETH": 0.01})
+
+    assert np.allclose(result.balances[0], [50.0, 0.0, 0.01 + 50 * 0.99 / 2000])
+    assert np.allclose(result.fees, [0.5, 0.0]) and result.trades.tolist() == [1, 0]  # the second swap is dust
+    assert np.allclose(result.values[:, -1], [119.5, 120.0])
+
+
+def test_parameter_sets_run_together_match_separate_runs():
+    history = MarketHistory.synthetic(TOKENS, steps=300, seed=3)
+    grid = param_grid(lookback=[2, 8], threshold=[0.01, 0.03], fraction=[0.1, 0.5])
+    backtester = Backtester(history, decide_every=2)
+    together = backtester.run(MindshareMomentum(**grid), {"USDC": 100.0, "NEAR": 20.0})
+
+    for i in range(4):
+        alone = backtester.run(MindshareMomentum(**{name: values[i:i + 1] for name, values in grid.items()}),
+                               {"USDC": 100.0, "NEAR": 20.0})
+        assert np.allclose(together.values[i], alone.values[0])
+    assert together.trades.sum() > 0
+
+
+def test_synthetic_wnear_follows_near():
+    history = MarketHistory.synthetic(steps=50, seed=1)
+    near, wnear = history.index("NEAR"), history.index("WNEAR")
+
+    assert np.array_equal(history.prices[:, near], history.prices[:, wnear])
+    assert np.array_equal(history.mindshare[:, near], history.mindshare[:, wnear])
+
+
+def test_recorded_responses_replay_the_parsed_trades():
+    strategy = RecordedResponses.from_cassettes([SAMPLE_CASSETTE_PATH], ["USDC", "NEAR", "ETH", "SOL"], sets=2)
+
+    decision = strategy.decisions[0]
+    assert np.isclose(decision[0, 2], 0.4) and np.isclose(decision[1, 3], 0.2)
+    history = MarketHistory.synthetic(["USDC", "NEAR", "ETH", "SOL"], steps=2)
+    assert strategy.decide(0, history, np.zeros((2, 4))).shape == (2, 4, 4)
+    assert not strategy.decide(1, history, np.zeros((2, 4))).any()
+
+
+def test_sweep_ranks_the_grid_against_holding():
+    report = sweep(MarketHistory.synthetic(TOKENS, steps=200), grid={"lookback": [1, 4], "threshold": [0.01], "fraction": [0.2]},
+                   balances={"USDC": 50.0}, cassettes=[SAMPLE_CASSETTE_PATH])
+
+    assert report["parameter_sets"] == 2 and len(report["top"]) == 2
+    assert report["hold"]["trades"] == 0
+    assert report["recorded"]["trades"] == 1
@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+from src.bench.cassette import Cassette, CassetteExhausted, SOLVER_PUBLISH, SOLVER_QUOTE, SIGN_TRADE
+from src.bench.harness import (
+    LOCAL, BenchmarkStore, CycleHarness, LatencyProfile, SAMPLE_CASSETTE_PATH, replay, replay_scheduler
+)
+
+
+def test_replay_runs_the_full_cycle_from_the_sample_cassette():
+    summary = asyncio.run(replay(SAMPLE_CASSETTE_PATH, runs=2, latency=LatencyProfile(scale=0)))
+
+    assert summary["runs"] == 2
+    # Both trades were signed, verified against the recorded signer key and published
+    assert summary["stages"][SIGN_TRADE]["calls"] == 2
+    assert summary["stages"][SOLVER_PUBLISH]["calls"] == 2
+
+
+def test_injected_latency_shows_in_its_stage():
+    latency = LatencyProfile(scale=0, fixed={SIGN_TRADE: 0.05})
+    harness = CycleHarness(replay_scheduler(), Cassette.load(SAMPLE_CASSETTE_PATH), latency=latency)
+
+    result = asyncio.run(harness.run_cycle())
+
+    assert sum(result["stages"][SIGN_TRADE]) >= 0.1
+    assert result["total"] >= 0.1
+
+
+def test_local_time_is_measured_while_stages_overlap():
+    latency = LatencyProfile(scale=0, fixed={SOLVER_QUOTE: 0.05, SIGN_TRADE: 0.05})
+    harness = CycleHarness(replay_scheduler(), Cassette.load(SAMPLE_CASSETTE_PATH), latency=latency)
+
+    result = asyncio.run(harness.run_cycle())
+
+    # The second quote runs while the first trade is signed, so the stages add up to more than the cycle
+    assert sum(sum(durations) for stage, durations in result["stages"].items() if stage != LOCAL) > result["total"]
+    assert 0 < result["stages"][LOCAL][0] < result["total"]
+
+
+def test_cassette_round_trip_and_exhaustion(tmp_path):
+    cassette = Cassette(meta={"network": "testnet"})
+    cassette.add(SIGN_TRADE, {"result": {"s": "1"}}, 0.5)
+    path = str(tmp_path / "cassette.json")
+    cassette.save(path)
+
+    loaded = Cassette.load(path)
+    assert loaded.next(SIGN_TRADE).latency == 0.5
+    try:
+        loaded.next(SIGN_TRADE)
+        assert False, "expected CassetteExhausted"
+    except CassetteExhausted:
+        pass
+    loaded.rewind()
+    assert loaded.next(SIGN_TRADE).result == {"result": {"s": "1"}}
+
+
+def make_summary(total, stage):
+    return {
+        "cassette": "cycle_cassette.json",
+        "latency": {"scale": 1.0, "fixed": {}},
+        "total": {"p50": total},
+        "stages": {SIGN_TRADE: {"p50": stage}},
+    }
+
+
+def test_store_reports_regressions_against_last_matching_run(tmp_path):
+    store = BenchmarkStore(str(tmp_path / "results.jsonl"))
+    assert store.compare(make_summary(1.0, 0.5)) == []
+
+    store.append(make_summary(1.0, 0.5))
+    assert store.compare(make_summary(1.1, 0.5)) == []
+
+    regressions = store.compare(make_summary(1.5, 0.9))
+    assert [regression.split(':')[0] for regression in regressions] == ["total", SIGN_TRADE]
+
+    other_settings = make_summary(5.0, 5.0)
+    other_settings["latency"] = {"scale": 2.0, "fixed": {}}
+    assert store.compare(other_settings) == []
+    assert len([json.loads(line) for line in open(store.path)]) == 1
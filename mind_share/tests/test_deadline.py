@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+import pytest
+
+from unittest.mock import Mock
+from src.quote.generate_quote import fetch_options
+from src.scheduler import deadline
+from src.scheduler.deadline import CycleBudget, StageTimeout
+from src.scheduler.pipeline import CANCELLED, Stage, StagedPipeline
+from src.scheduler.scheduler import MindshareScheduler
+from src.simulator.driver import SimulatorStack, run_load
+from src.simulator.servers import Behavior
+
+SHARES = [("registration", 0.1), ("agent", 0.5), ("trades", 0.4)]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_unused_time_goes_to_later_stages():
+    clock = Clock()
+    budget = CycleBudget(100, SHARES, clock=clock)
+
+    assert budget.allowance("registration") == pytest.approx(10)
+    clock.now = 2  # registration finished early
+    assert budget.allowance("agent") == pytest.approx(98 * 0.5 / 0.9)
+    clock.now = 30
+    assert budget.allowance("trades") == pytest.approx(70)
+    assert CycleBudget(None, SHARES).allowance("agent") is None
+
+
+def test_stage_cancels_a_hung_call_and_caps_timeouts():
+    async def scenario():
+        with CycleBudget(0.5, SHARES).activate() as budget:
+            async with deadline.stage("registration"):
+                assert deadline.time_left(10) <= 0.05
+            with pytest.raises(StageTimeout) as raised:
+                async with deadline.stage("agent"):
+                    await asyncio.sleep(10)
+            return budget, raised.value
+
+    started = time.monotonic()
+    budget, error = asyncio.run(scenario())
+
+    assert time.monotonic() - started < 1
+    assert error.stage == "agent" and set(budget.report()) == {"registration", "agent"}
+    assert deadline.time_left(3) == 3  # no budget outside the cycle
+
+
+def test_stage_does_not_need_asyncio_timeout(monkeypatch):
+    monkeypatch.delattr(asyncio, 'timeout', raising=False)  # the image runs Python 3.9
+
+    async def scenario():
+        with CycleBudget(0.2, SHARES).activate():
+            with pytest.raises(StageTimeout):
+                async with deadline.stage("agent"):
+                    await asyncio.sleep(10)
+        await asyncio.sleep(0.05)  # the fired timer leaves nothing behind to cancel later
+
+    asyncio.run(scenario())
+
+
+def test_spent_budget_times_out_blocking_calls_instead_of_passing_them_zero():
+    clock = Clock()
+    scheduler = MindshareScheduler(interval=0)
+
+    with CycleBudget(10, SHARES, clock=clock).activate():
+        clock.now = 10
+        with pytest.raises(StageTimeout) as quote_timeout:
+            fetch_options(Mock())
+        with pytest.raises(StageTimeout):
+            scheduler.run_agent_process(["true"])
+
+    assert quote_timeout.value.stage == "cycle"
+
+
+def test_cancelled_pipeline_keeps_the_items_that_made_it_through():
+    async def slow(value):
+        if value:
+            await asyncio.sleep(10)
+        return value
+
+    async def scenario():
+        pipeline = StagedPipeline([Stage("only", slow)])
+        with CycleBudget(0.2, SHARES).activate():
+            with pytest.raises(StageTimeout):
+                async with deadline.stage("trades"):
+                    await pipeline.run([0, 1, 2])
+        return pipeline.items
+
+    items = asyncio.run(scenario())
+
+    assert [item.completed for item in items] == [True, False, False]
+    assert [item.stopped_at for item in items] == [None, CANCELLED, CANCELLED]
+
+
+def test_hung_solver_cannot_stall_the_cycle(monkeypatch):
+    monkeypatch.setenv('CYCLE_BUDGET', '1.5')
+    with SimulatorStack(solver=Behavior(latency=30), tx_delay=0.05, poll_interval=0.05) as stack:
+        report = run_load(stack, instances=1, cycles=1)
+
+    assert report["failed_instances"] == []
+    assert report["published"] == 0 and report["cycle_max"] < 3
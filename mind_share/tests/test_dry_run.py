@@ -0,0 +1,48 @@
+from src.contract.dry_run import LocalSigner
+from src.quote.generate_quote import create_commitment_from_mpc_signature_using_rsv
+from src.quote.serializer import SerializedQuote
+from src.scheduler.scheduler import MindshareScheduler, verify_signature
+from src.simulator.driver import SimulatorStack, run_load
+from src.simulator.near_rpc import FakeSignContract
+from src.simulator.servers import FakeSolverBus
+
+QUOTE = '{"deadline":"2026-10-19T00:00:00.000Z","signer_id":"alice.near"}'
+
+
+def test_local_signature_has_the_contract_shape_and_verifies(monkeypatch):
+    signer = LocalSigner.from_seed(b"dry run")
+    contract = FakeSignContract("sign.near", seed=b"dry run")
+    contract.call("worker.near", "register_worker", {"checksum": "c"})
+    message = SerializedQuote.of(QUOTE).message
+
+    signature = signer.sign(message)
+    payload = signer.payload(message)
+
+    assert signature == contract.call("worker.near", "sign_trade", {"quote": QUOTE})
+    assert list(payload) == contract.view("generate_payload", {"data": list(message)})
+    monkeypatch.setenv('SIGNER_PUBLIC_KEY_USING_MINDSHARE_ACCOUNT', signer.public_key)
+    assert verify_signature({"result": {"payload": payload.hex()}}, signature)
+    assert create_commitment_from_mpc_signature_using_rsv(QUOTE, signature)["payload"] == QUOTE
+
+
+def test_dry_run_signs_locally_and_publishes_to_the_stand_in_relay(monkeypatch):
+    signer = LocalSigner.from_seed(b"dry run")
+
+    async def never_funded(self, timeout=300, check_interval=10):
+        return False
+
+    # The ephemeral account of a dry run is used without waiting for funds
+    monkeypatch.setattr(MindshareScheduler, "wait_for_funds", never_funded)
+    relay = FakeSolverBus().start()
+    try:
+        with SimulatorStack(tx_delay=0.05, poll_interval=0.05) as stack:
+            monkeypatch.setenv('DRY_RUN_SIGNER_KEY', signer.private_key.to_hex())
+            monkeypatch.setenv('SIGNER_PUBLIC_KEY_USING_MINDSHARE_ACCOUNT', signer.public_key)
+            monkeypatch.setenv('PUBLISH_RELAY_URL', relay.url)
+            report = run_load(stack, instances=1, cycles=1)
+    finally:
+        relay.stop()
+
+    assert report["failed_instances"] == []
+    assert report["signatures"] == 0 and stack.rpc.transactions == 0
+    assert report["published"] == 0 and relay.published == 1
@@ -0,0 +1,68 @@
+import io
+import json
+
+from src.telemetry.log import DEBUG, ERROR, INFO, EventLogger, parse_sample_rates, truncate
+
+
+def written(logger):
+    assert logger.flush()
+    return logger.stream.getvalue().splitlines()
+
+
+def test_truncate_caps_strings_and_reprs():
+    assert truncate("abcdef", 3) == "abc...(+3 chars)"
+    assert truncate("abcdef", 3, keep_tail=True) == "...(-3 chars)def"
+    assert truncate({"a": 1}, 100) == "{'a': 1}"
+    assert truncate(12, 1) == 12 and truncate(None, 1) is None
+
+
+def test_text_mode_keeps_the_log_prefixes():
+    logger = EventLogger(level=INFO, stream=io.StringIO())
+    logger.info("cycle.start", "Starting cycle", portfolio="alice.near")
+    logger.error("cycle.failed", "Cycle failed")
+    logger.debug("cycle.detail", "Not shown")
+
+    assert written(logger) == ["[LOG] Starting cycle portfolio=alice.near", "[ERROR] Cycle failed"]
+
+
+def test_json_mode_writes_one_object_per_line_with_capped_fields():
+    logger = EventLogger(level=DEBUG, json_mode=True, max_field=8, stream=io.StringIO())
+    logger.debug("agent.kaito_response", "Kaito API response", body="x" * 100, status=200)
+
+    record = json.loads(written(logger)[0])
+    assert record["level"] == "debug" and record["event"] == "agent.kaito_response"
+    assert record["body"] == "xxxxxxxx...(+92 chars)"
+    assert record["status"] == 200
+
+
+def test_sampling_uses_configured_then_call_site_rates():
+    draws = iter([0.05, 0.5, 0.5, 0.5])
+    logger = EventLogger(sample_rates=parse_sample_rates("agent.prompt=0.1, bad=x"), stream=io.StringIO(), rng=lambda: next(draws))
+    logger.info("agent.prompt", "kept")
+    logger.info("agent.prompt", "dropped")
+    logger.log(INFO, "setup.waiting_for_funds", "dropped too", sample=0.2)
+    logger.info("other", "always kept")
+
+    assert written(logger) == ["[LOG] kept", "[LOG] always kept"]
+    assert logger.sampled_out == 2
+
+
+def test_full_queue_drops_instead_of_blocking():
+    logger = EventLogger(queue_size=1, stream=io.StringIO())
+    # Occupy the queue before the writer starts draining it
+    logger._ensure_writer = lambda: None
+    logger.info("a", "first")
+    logger.info("b", "second")
+
+    assert logger.dropped == 1
+
+
+def test_tracebacks_keep_their_last_frames():
+    logger = EventLogger(level=ERROR, json_mode=True, max_field=20, stream=io.StringIO())
+    try:
+        raise ValueError("the actual cause")
+    except ValueError:
+        logger.error("cycle.failed", "Cycle failed", exc_info=True)
+
+    record = json.loads(written(logger)[0])
+    assert record["traceback"].rstrip().endswith("ValueError: the actual cause")
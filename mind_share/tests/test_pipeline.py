@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+from src.scheduler.pipeline import Stage, StagedPipeline
+
+
+def test_stages_overlap_across_items():
+    def quote(trade):
+        time.sleep(0.05)
+        return trade
+
+    async def sign(trade):
+        await asyncio.sleep(0.05)
+        return trade
+
+    pipeline = StagedPipeline([Stage("quote", quote, blocking=True), Stage("sign", sign)])
+    start = time.perf_counter()
+    items = asyncio.run(pipeline.run(list(range(4))))
+    elapsed = time.perf_counter() - start
+
+    assert [item.value for item in items] == [0, 1, 2, 3] and all(item.completed for item in items)
+    # Serially 4 quotes and 4 signatures take 0.4s, pipelined the signatures hide behind the next quotes
+    assert elapsed < 0.33
+
+
+def test_full_queue_holds_the_upstream_stage_back():
+    quoted = []
+    release = asyncio.Event()
+
+    async def quote(trade):
+        quoted.append(trade)
+        return trade
+
+    async def sign(trade):
+        await release.wait()
+        return trade
+
+    async def run():
+        pipeline = StagedPipeline([Stage("quote", quote), Stage("sign", sign)], queue_size=2)
+        task = asyncio.ensure_future(pipeline.run(list(range(10))))
+        await asyncio.sleep(0.05)
+        # One item being signed, two queued for signing and one quoted item waiting to be queued
+        assert len(quoted) == 4
+        release.set()
+        return await task, pipeline
+
+    items, pipeline = asyncio.run(run())
+    assert all(item.completed for item in items)
+    assert pipeline.stats()[1]["max_backlog"] == 2
+
+
+def test_failed_or_dropped_items_do_not_stop_the_others():
+    async def quote(trade):
+        if trade == 1:
+            raise ValueError("no options returned")
+        return None if trade == 2 else trade
+
+    async def publish(trade):
+        return trade
+
+    pipeline = StagedPipeline([Stage("quote", quote), Stage("publish", publish)])
+    items = asyncio.run(pipeline.run([0, 1, 2, 3]))
+
+    assert [item.completed for item in items] == [True, False, False, True]
+    assert items[1].stopped_at == "quote" and items[1].error == "no options returned"
+    assert items[2].stopped_at == "quote" and items[2].error is None
+    assert pipeline.stats()[0]["failed"] == 1
+
+
+def test_stage_never_runs_more_than_its_workers():
+    running = 0
+    peak = 0
+
+    async def sign(trade):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return trade
+
+    async def quote(trade):
+        return trade
+
+    pipeline = StagedPipeline([Stage("quote", quote, concurrency=4), Stage("sign", sign, concurrency=2)])
+    items = asyncio.run(pipeline.run(list(range(8))))
+
+    assert all(item.completed for item in items)
+    assert peak == 2
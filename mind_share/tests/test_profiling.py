@@ -0,0 +1,84 @@
+import asyncio
+import os
+import pstats
+import signal
+import time
+
+import pytest
+
+from src.bench.cassette import Cassette
+from src.bench.harness import CycleHarness, LatencyProfile, SAMPLE_CASSETTE_PATH, replay_scheduler
+from src.telemetry import tracing
+from src.telemetry.profiling import SAMPLE, CycleProfiler
+from src.telemetry.tracing import Tracer
+
+
+@pytest.fixture(autouse=True)
+def tracer(monkeypatch):
+    tracer = Tracer()
+    monkeypatch.setattr(tracing, "_tracer", tracer)
+    return tracer
+
+
+def run_cycle(profiler):
+    scheduler = replay_scheduler()
+    scheduler.profiler = profiler
+    harness = CycleHarness(scheduler, Cassette.load(SAMPLE_CASSETTE_PATH), latency=LatencyProfile(scale=0))
+    asyncio.run(harness.run_cycle())
+
+
+def profiled_functions(path):
+    return {name for _, _, name in pstats.Stats(path).stats}
+
+
+def test_unarmed_profiler_writes_nothing(tmp_path):
+    profiler = CycleProfiler(str(tmp_path))
+    run_cycle(profiler)
+    assert profiler.written == [] and not os.listdir(tmp_path)
+
+
+def test_armed_cycles_are_dumped_as_pstats(tmp_path):
+    profiler = CycleProfiler(str(tmp_path), armed=1)
+    run_cycle(profiler)
+    run_cycle(profiler)
+
+    prof, summary = profiler.written
+    assert prof.endswith(".prof") and summary.endswith(".txt")
+    functions = profiled_functions(prof)
+    assert "parse_llm_response" in functions and "verify_signature" in functions
+    assert profiler.armed == 0
+
+
+def test_selected_stages_limit_the_profile(tmp_path):
+    profiler = CycleProfiler(str(tmp_path), stages=["verify_signature"], armed=1)
+    run_cycle(profiler)
+
+    functions = profiled_functions(profiler.written[0])
+    assert "verify_signature" in functions
+    assert "parse_llm_response" not in functions
+
+
+def test_sampled_stacks_are_rooted_at_their_stage(tmp_path, tracer):
+    profiler = CycleProfiler(str(tmp_path), mode=SAMPLE, stages=["busy"], interval=0.001, armed=1)
+    tracer.stage_hook = profiler.stage
+    with profiler.cycle("bench"):
+        with tracer.span("busy"):
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+    with open(profiler.written[0]) as file:
+        lines = file.read().splitlines()
+    assert lines and all(line.startswith("busy;") for line in lines)
+
+
+def test_signal_arms_the_next_cycles(tmp_path):
+    profiler = CycleProfiler(str(tmp_path), cycles_per_signal=2)
+    previous = signal.getsignal(signal.SIGUSR1)
+    try:
+        assert profiler.install_signal()
+        os.kill(os.getpid(), signal.SIGUSR1)
+        time.sleep(0.01)
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
+    assert profiler.armed == 2
@@ -0,0 +1,138 @@
+import asyncio
+import json
+
+import pytest
+
+from src.quote.generate_quote import create_token_diff_quote
+from src.quote.publisher import IntentPublisher, PublishedIntent, RelayClient, SettlementTracker
+from src.scheduler.pipeline import Stage, StagedPipeline
+from src.scheduler.scheduler import MindshareScheduler
+from src.simulator.servers import FakeSolverBus, json_rpc_error
+
+
+class UnbatchedSolverBus(FakeSolverBus):
+    """Relay rejecting batch requests like one without batch support would"""
+
+    def handle(self, method, path, body):
+        if isinstance(json.loads(body), list):
+            return 200, json_rpc_error({}, {"code": -32600, "message": "Invalid request"})
+        return super().handle(method, path, body)
+
+
+@pytest.fixture
+def solver_bus():
+    server = FakeSolverBus().start()
+    yield server
+    server.stop()
+
+
+def commitment(index):
+    return {"standard": "erc191", "payload": f'{{"nonce":"{index}"}}', "signature": f"secp256k1:{index}"}
+
+
+async def publish_all(publisher, count):
+    try:
+        return await asyncio.gather(*(publisher.publish(commitment(index), f"hash-{index}") for index in range(count)))
+    finally:
+        await publisher.relay.close()
+
+
+def test_intents_of_one_window_share_a_batch(solver_bus):
+    publisher = IntentPublisher(RelayClient(solver_bus.url), batch_window=0.05)
+    responses = asyncio.run(publish_all(publisher, 3))
+
+    assert solver_bus.published == 3 and solver_bus.batches == 1 and solver_bus.requests == 1
+    hashes = {response["result"]["intent_hash"] for response in responses}
+    assert len(hashes) == 3 and all(response["result"]["status"] == "OK" for response in responses)
+
+
+def test_full_batch_is_sent_before_the_window_ends(solver_bus):
+    publisher = IntentPublisher(RelayClient(solver_bus.url), batch_window=60, max_batch=2)
+    asyncio.run(asyncio.wait_for(publish_all(publisher, 4), timeout=5))
+    assert publisher.batches == 2 and solver_bus.published == 4
+
+
+def test_a_cycles_intents_wait_for_its_slower_signatures(solver_bus):
+    publisher = IntentPublisher(RelayClient(solver_bus.url), batch_window=0.02, max_wait=5)
+
+    async def sign(index):
+        # Each signature takes longer than the batch window
+        await asyncio.sleep(0.05)
+        return index
+
+    async def run():
+        pipeline = StagedPipeline([
+            Stage("sign", sign, 1),
+            Stage("publish", lambda index: publisher.publish(commitment(index), f"hash-{index}"), 4),
+        ], on_progress=publisher.poke)
+        publisher.upstream = lambda: pipeline.upstream_of("publish")
+        try:
+            return await asyncio.wait_for(pipeline.run(list(range(3))), timeout=2)
+        finally:
+            publisher.upstream = None
+            await publisher.relay.close()
+
+    items = asyncio.run(run())
+
+    assert all(item.completed for item in items)
+    assert publisher.batches == 1 and solver_bus.published == 3
+
+
+def test_relay_without_batches_gets_the_calls_one_by_one():
+    server = UnbatchedSolverBus().start()
+    try:
+        publisher = IntentPublisher(RelayClient(server.url), batch_window=0.05)
+        responses = asyncio.run(publish_all(publisher, 2))
+    finally:
+        server.stop()
+
+    assert server.published == 2 and server.requests == 3
+    assert all(response["result"]["status"] == "OK" for response in responses)
+
+
+def test_settled_intents_move_the_scheduler_balances(solver_bus):
+    scheduler = MindshareScheduler(interval=0)
+    scheduler.balances = {"SOL": 1.0, "ETH": 0.5}
+    relay = RelayClient(solver_bus.url)
+    tracker = SettlementTracker(relay)
+    tracker.on_settled(scheduler.apply_settlement)
+    trade = {"token_in": "SOL", "amount_in": 0.25, "token_out": "ETH"}
+    quote = create_token_diff_quote("alice.near", "SOL", str(250000000), "ETH", str(10 ** 16))
+
+    async def run():
+        try:
+            response = await IntentPublisher(relay).publish(commitment(0), "hash-0")
+            tracker.track(response["result"]["intent_hash"], trade, quote)
+            tracker.track("unknown", trade, quote)
+            await tracker.poll_once()
+        finally:
+            await relay.close()
+
+    asyncio.run(run())
+
+    assert tracker.pending == []
+    assert scheduler.balances == {"SOL": 0.75, "ETH": pytest.approx(0.51)}
+
+
+def test_balance_changes_use_the_quoted_amount_out():
+    quote = create_token_diff_quote("alice.near", "NEAR", str(10 ** 24), "USDC", "2500000")
+    intent = PublishedIntent("h", {"token_in": "NEAR", "amount_in": 1.0, "token_out": "USDC"}, quote)
+    assert intent.balance_changes() == {"NEAR": -1.0, "USDC": 2.5}
+
+
+def test_settled_balances_are_handed_to_the_next_runs_until_a_refresh():
+    scheduler = MindshareScheduler(interval=0)
+    assert scheduler.known_balances() is None
+    scheduler.balances = {"SOL": 1.0}
+    scheduler.cycles_since_read = 1
+    assert scheduler.known_balances() == {"SOL": 1.0}
+
+    scheduler.settlements.track("hash-0", {"token_in": "SOL", "amount_in": 0.5, "token_out": "ETH"}, "")
+    assert scheduler.known_balances() is None
+    scheduler.settlements._pending.clear()
+    scheduler.settlements.given_up += 1
+    assert scheduler.known_balances() is None
+
+    scheduler.given_up_at_read = scheduler.settlements.given_up
+    scheduler.cycles_since_read = scheduler.balances_refresh_cycles
+    assert scheduler.known_balances() is None
@@ -0,0 +1,61 @@
+import json
+import pytest
+
+from src.tappd.quote import TdxQuote, QuoteParseError, compare_measurements, validate_quote
+
+
+@pytest.fixture
+def quote_hex():
+    with open('samples/quote_hex.json', 'r') as file:
+        return json.load(file)['QUOTE_HEX']
+
+
+@pytest.fixture
+def tcb_info():
+    with open('samples/tcb_info.json', 'r') as file:
+        return json.load(file)
+
+
+def test_parse_header(quote_hex):
+    quote = TdxQuote.from_hex(quote_hex)
+
+    assert quote.version == 4
+    assert quote.tee_type == 0x81
+    assert quote.debug is False
+
+
+def test_fields_are_views_of_the_quote(quote_hex):
+    raw = bytearray.fromhex(quote_hex)
+    quote = TdxQuote(raw)
+
+    report_data = quote.report_data
+    assert isinstance(report_data, memoryview)
+    assert len(report_data) == 64
+
+    raw[48 + 520] ^= 0xff
+    assert report_data[0] == raw[48 + 520]
+
+
+def test_measurements_match_tcb_info(quote_hex, tcb_info):
+    quote = TdxQuote.from_hex(quote_hex)
+
+    assert quote.mr_td.hex() == tcb_info['mrtd']
+    assert quote.rtmrs[3] == tcb_info['rtmr3']
+    assert compare_measurements(quote, tcb_info) == []
+
+
+def test_validate_rejects_mismatching_rtmr(quote_hex, tcb_info):
+    tcb_info['rtmr1'] = '00' * 48
+
+    with pytest.raises(QuoteParseError, match='rtmr1'):
+        validate_quote(quote_hex, tcb_info)
+
+
+def test_rejects_truncated_quote(quote_hex):
+    with pytest.raises(QuoteParseError):
+        TdxQuote.from_hex(quote_hex[:1000])
+
+
+def test_rejects_invalid_hex():
+    with pytest.raises(QuoteParseError):
+        TdxQuote.from_hex('zz')
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock
+
+from src.contract.registration import RegistrationTracker, is_not_registered_error
+from src.contract.sign_intent import SignIntentContract
+from src.rpc.endpoints import reset_endpoint_pools
+
+
+def test_record_expires_at_collateral_next_update():
+    clock = Mock(return_value=1000.0)
+    tracker = RegistrationTracker("sign.near", ttl=3600, refresh_margin=60, clock=clock)
+    collateral = {"tcb_info": json.dumps({"nextUpdate": "1970-01-01T00:30:00Z"})}
+
+    state = tracker.record("worker.near", "00ff", "checksum", collateral)
+
+    assert state.expires_at == 1800.0
+    assert state.checksum == "checksum"
+    assert tracker.is_registered("worker.near")
+    assert not tracker.needs_refresh("worker.near")
+
+    clock.return_value = 1750.0
+    assert tracker.needs_refresh("worker.near")
+
+    clock.return_value = 1800.0
+    assert not tracker.is_registered("worker.near")
+
+
+def test_state_survives_restart_and_ignores_other_contracts(tmp_path):
+    path = str(tmp_path / "registration.json")
+    RegistrationTracker("sign.near", ttl=3600, path=path).record("worker.near", "00ff", "checksum")
+
+    assert RegistrationTracker("sign.near", ttl=3600, path=path).is_registered("worker.near")
+    assert not RegistrationTracker("other.near", ttl=3600, path=path).is_registered("worker.near")
+
+
+def test_not_registered_error_detection():
+    assert is_not_registered_error(Exception("Smart contract panicked: called `Option::unwrap()` on a `None` value"))
+    assert not is_not_registered_error(Exception("Timeout"))
+
+
+def make_contract(view_function):
+    account = Mock(account_id="worker.near")
+    account.view_function = view_function
+    contract = SignIntentContract(worker_public_key="ed25519:key", worker_account=account)
+    contract.registration = RegistrationTracker("sign.near", ttl=3600)
+    contract.contract_id = "sign.near"
+    return contract
+
+
+def test_initialize_worker_skips_get_worker_while_registration_is_known():
+    view_function = AsyncMock(return_value=Mock(result={}, block_height=1))
+    contract = make_contract(view_function)
+
+    async def scenario():
+        first = await contract.initialize_worker()
+        contract.view_cache.invalidate()
+        second = await contract.initialize_worker()
+        refreshed = await contract.initialize_worker(refresh=True)
+        return first, second, refreshed
+
+    assert asyncio.run(scenario()) == (True, True, True)
+    assert view_function.await_count == 2
+
+
+def test_initialize_worker_forgets_state_when_contract_does_not_know_worker():
+    view_function = AsyncMock(side_effect=Exception("called `Option::unwrap()` on a `None` value"))
+    contract = make_contract(view_function)
+    contract.registration.record("worker.near")
+
+    assert asyncio.run(contract.initialize_worker(refresh=True)) is False
+    assert not contract.registration.is_registered("worker.near")
+
+
+def test_get_worker_is_read_again_once_a_newer_block_is_seen():
+    view_function = AsyncMock(return_value=Mock(result={}, block_height=100))
+    contract = make_contract(view_function)
+
+    async def scenario():
+        contract.view_cache.invalidate()
+        await contract.initialize_worker()
+        contract.registration.forget("worker.near")
+        await contract.initialize_worker()
+        # Any response of the shared client at a later block, a balance read for instance
+        contract.view_cache.observe_block(101)
+        contract.registration.forget("worker.near")
+        await contract.initialize_worker()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        reset_endpoint_pools()
+
+    assert view_function.await_count == 2
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import base58
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
+from nacl.signing import SigningKey
+from py_near import transactions
+from py_near.models import TransactionResult
+from src.agent.balances import get_account_balances, read_balances
+from src.rpc.client import NearRpcClient, PyNearProvider, encode_args
+from src.rpc.endpoints import (
+    ContractExecutionError,
+    InvalidNonceError,
+    RpcEndpointPool,
+    RpcError,
+    UnknownAccountError,
+    UnknownTransactionError,
+    reset_endpoint_pools,
+    rpc_error,
+)
+from src.scheduler.scheduler import MindshareScheduler
+from src.simulator.near_rpc import FakeNearRpc
+
+SIGN_CONTRACT = "sign.near"
+
+
+@pytest.fixture
+def rpc():
+    server = FakeNearRpc(SIGN_CONTRACT, tx_delay=0).start()
+    yield server
+    server.stop()
+
+
+def client_for(rpc):
+    return NearRpcClient(RpcEndpointPool([rpc.url]))
+
+
+def signed_call(nonce, block_hash):
+    signing_key = SigningKey(b"\x03" * 32)
+    secret_key = signing_key.encode() + signing_key.verify_key.encode()
+    actions = [transactions.create_function_call_action("register_worker", b'{"checksum":"c"}', 300000000000000, 0)]
+    signed = transactions.sign_and_serialize_transaction("worker.near", secret_key, SIGN_CONTRACT, nonce, actions, block_hash)
+    trx_hash = transactions.calc_trx_hash("worker.near", secret_key, SIGN_CONTRACT, nonce, actions, block_hash)
+    return signed, trx_hash
+
+
+def test_errors_are_typed_by_their_cause():
+    assert isinstance(rpc_error({"cause": {"name": "UNKNOWN_ACCOUNT"}, "data": "x"}), UnknownAccountError)
+    assert isinstance(rpc_error({"cause": {"name": "INVALID_TRANSACTION"}, "data": {
+        "TxExecutionError": {"InvalidTxError": {"InvalidNonce": {"tx_nonce": 1, "ak_nonce": 2}}}
+    }}), InvalidNonceError)
+    error = rpc_error({"code": -32601, "message": "Method not found"})
+    assert type(error) is RpcError and error.cause is None
+
+
+def test_encoded_args_are_compact():
+    assert encode_args({"a": 1, "b": [1, 2]}) == "eyJhIjoxLCJiIjpbMSwyXX0="
+
+
+def test_view_function_decodes_results_and_raises_panics(rpc):
+    rpc.set_portfolio("alice.near", {"USDC": 12.5})
+    client = client_for(rpc)
+
+    async def scenario():
+        try:
+            balance = await client.view_function("intents.near", "mt_balance_of", {
+                "account_id": "alice.near",
+                "token_id": "nep141:eth-0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48.omft.near",
+            })
+            with pytest.raises(ContractExecutionError, match="not found"):
+                await client.view_function("missing.near", "get_worker", {})
+            with pytest.raises(UnknownTransactionError):
+                await client.tx_status("unknown", "alice.near")
+            return balance, await get_account_balances(client, "alice.near")
+        finally:
+            await client.close()
+
+    balance, balances = asyncio.run(scenario())
+    assert balance["result"] == "12500000" and balance["block_height"] > 0
+    assert balances["USDC"] == 12.5 and balances["NEAR"] == 0
+
+
+def test_py_near_provider_shares_the_client_and_error_model(rpc):
+    provider = PyNearProvider(client_for(rpc))
+
+    async def scenario():
+        try:
+            status = await provider.get_status()
+            block_hash = base58.b58decode(status["sync_info"]["latest_block_hash"])
+            signed, trx_hash = signed_call(1, block_hash)
+            result = await provider.send_tx_and_wait(signed, trx_hash=trx_hash, receiver_id=SIGN_CONTRACT)
+            with pytest.raises(InvalidNonceError):
+                await provider.send_tx_and_wait(signed, trx_hash=trx_hash, receiver_id=SIGN_CONTRACT)
+            return result, await provider.get_tx(trx_hash, "worker.near")
+        finally:
+            await provider.client.close()
+
+    result, fetched = asyncio.run(scenario())
+    assert isinstance(result, TransactionResult)
+    assert fetched.transaction.hash == result.transaction.hash
+
+
+def test_pool_keeps_one_connection_pool_per_event_loop(rpc):
+    pool = RpcEndpointPool([rpc.url])
+    clients = []
+
+    async def use_pool():
+        await pool.call("status", [])
+        clients.append(pool._get_client())
+        await pool.close()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(lambda _: asyncio.run(use_pool()), range(2)))
+
+    assert len(clients) == 2 and clients[0] is not clients[1]
+
+
+def test_read_balances_runs_without_an_event_loop(rpc):
+    rpc.set_portfolio("bob.near", {"NEAR": 2})
+    balances = read_balances("bob.near", "mainnet", rpc.url)
+    # NEAR and WNEAR are the same intents token
+    assert balances["NEAR"] == 2 and balances["WNEAR"] == 2
+
+
+def test_client_cache_serves_repeat_reads_until_any_response_shows_a_newer_block(rpc):
+    rpc.set_portfolio("carol.near", {"USDC": 3})
+    rpc.block_time = 3600  # no block passes unless the test moves the chain
+    client = client_for(rpc)
+
+    async def scenario():
+        try:
+            first = await get_account_balances(client, "carol.near")
+            requests = rpc.stats()["requests"]
+            again = await get_account_balances(client, "carol.near")
+            cached = rpc.stats()["requests"] - requests
+            rpc.started_at -= 2 * rpc.block_time
+            # A response that is no view call still moves the cache to the newer block
+            await client.status()
+            requests = rpc.stats()["requests"]
+            await get_account_balances(client, "carol.near")
+            return first, again, cached, rpc.stats()["requests"] - requests
+        finally:
+            await client.close()
+
+    first, again, cached, refreshed = asyncio.run(scenario())
+    assert first == again and first["USDC"] == 3
+    assert cached == 0 and refreshed > 0
+
+
+def test_scheduler_hands_the_agent_balances_read_through_the_shared_client(rpc):
+    rpc.set_portfolio("dave.near", {"NEAR": 4})
+    rpc.block_time = 3600
+    with patch.dict('os.environ', {'NEAR_RPC_ENDPOINTS': rpc.url}):
+        reset_endpoint_pools()
+        try:
+            scheduler = MindshareScheduler(interval=0)
+            scheduler.account_id, scheduler.network = "dave.near", "mainnet"
+            agent = Mock(return_value=Mock(returncode=1, stdout="", stderr="failed"))
+            scheduler.run_agent_process = agent
+
+            async def scenario():
+                with patch('src.scheduler.scheduler.AGENT_RETRY_DELAY', 0):
+                    await scheduler.execute_agent()
+                requests = rpc.stats()["requests"]
+                # Another portfolio loop of the process reading the same account is served by the cache
+                await scheduler.read_balances()
+                return rpc.stats()["requests"] - requests
+
+            assert asyncio.run(scenario()) == 0
+        finally:
+            reset_endpoint_pools()
+
+    env_vars = json.loads(agent.call_args[0][0][-1])
+    assert json.loads(env_vars["BALANCES"])["NEAR"] == 4
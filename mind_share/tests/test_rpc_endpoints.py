@@ -0,0 +1,122 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.rpc.endpoints import RpcEndpointPool, RpcError, RpcTimeoutError, EndpointUnavailable
+
+
+class StandInRpc:
+    """Local JSON-RPC server answering every call after a configurable delay"""
+
+    def __init__(self, name, delay=0.0, status=200, error=None):
+        self.name = name
+        self.delay = delay
+        self.status = status
+        self.error = error
+        self.calls = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stand_in.calls += 1
+                time.sleep(stand_in.delay)
+                if stand_in.error:
+                    body = {"jsonrpc": "2.0", "id": request["id"], "error": stand_in.error}
+                else:
+                    body = {"jsonrpc": "2.0", "id": request["id"], "result": stand_in.name}
+                data = json.dumps(body).encode()
+                self.send_response(stand_in.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(*args, **kwargs):
+        server = StandInRpc(*args, **kwargs)
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.close()
+
+
+def call(pool, method, params=None, **kwargs):
+    async def run():
+        try:
+            return await pool.call(method, params or [], **kwargs)
+        finally:
+            await pool.close()
+    return asyncio.run(run())
+
+
+def test_fails_over_to_next_endpoint(servers):
+    broken = servers("broken", status=503)
+    healthy = servers("healthy")
+    pool = RpcEndpointPool([broken.url, healthy.url])
+
+    assert call(pool, "broadcast_tx_commit") == "healthy"
+    assert pool.stats[broken.url].failures == 1
+    assert pool.ranked()[0] == healthy.url
+
+
+def test_hedged_read_returns_fastest_answer(servers):
+    slow = servers("slow", delay=1.0)
+    fast = servers("fast")
+    pool = RpcEndpointPool([slow.url, fast.url])
+    # slow ranks first on its history, fast only gets the hedged duplicate
+    pool.stats[slow.url].latencies.extend([0.01] * 10)
+    pool.stats[fast.url].latencies.extend([0.05] * 10)
+
+    start = time.perf_counter()
+    assert call(pool, "query") == "fast"
+    assert time.perf_counter() - start < 0.9
+    assert slow.calls == 1
+
+
+def test_slow_broadcast_is_left_to_land_instead_of_rebroadcast(servers):
+    slow = servers("slow", delay=0.5)
+    other = servers("other")
+    pool = RpcEndpointPool([slow.url, other.url], method_timeouts={"broadcast_tx_commit": 0.1})
+
+    with pytest.raises(RpcTimeoutError):
+        call(pool, "broadcast_tx_commit")
+    assert other.calls == 0
+    assert pool.stats[slow.url].failures == 0
+
+
+def test_node_errors_are_not_retried(servers):
+    first = servers("first", error={"name": "HANDLER_ERROR", "cause": {"name": "UNKNOWN_ACCOUNT"}})
+    second = servers("second")
+    pool = RpcEndpointPool([first.url, second.url])
+
+    with pytest.raises(RpcError):
+        call(pool, "query", hedge=False)
+    assert second.calls == 0
+
+
+def test_all_endpoints_down(servers):
+    pool = RpcEndpointPool([servers("a", status=500).url, servers("b", status=500).url])
+
+    with pytest.raises(EndpointUnavailable):
+        call(pool, "status")
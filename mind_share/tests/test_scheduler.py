@@ -1,5 +1,7 @@
+import asyncio
 import pytest
 from unittest.mock import patch, Mock
+from src.constants import AGENT_PATH
 from src.scheduler.scheduler import MindshareScheduler
 
 @pytest.fixture
@@ -14,8 +16,7 @@ def scheduler():
 def test_scheduler_initialization(scheduler):
     assert scheduler.interval == 1
     assert scheduler.api_key == 'test_key'
-    assert scheduler.account_path == 'test_path'
-    assert scheduler.agent_path == 'test_agent_path'
+    assert scheduler.agent_path == AGENT_PATH
 
 @patch('subprocess.run')
 def test_execute_agent_success(mock_run, scheduler):
@@ -25,10 +26,10 @@ def test_execute_agent_success(mock_run, scheduler):
     mock_process.stdout = "Success output"
     mock_run.return_value = mock_process
     
-    scheduler.execute_agent()
+    asyncio.run(scheduler.execute_agent())
     
-    # Verificar que subprocess.run fue llamado con los argumentos correctos
-    mock_run.assert_called_once()
+    # Sin balances en la salida el agente se reintenta, cada intento llama a subprocess.run
+    assert mock_run.call_count == 3
     args = mock_run.call_args[0][0]
     assert "nearai" in args
     assert "agent" in args
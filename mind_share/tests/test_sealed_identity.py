@@ -0,0 +1,48 @@
+import pytest
+from unittest.mock import patch, Mock
+
+from src.tappd.tappd import DeriveKeyResponse
+from src.worker.sealed_identity import SealedIdentityStore
+from src.worker.keypair import AgentWorker
+
+
+def tee_client(secret):
+    client = Mock()
+    client.derive_key.return_value = DeriveKeyResponse(key=secret, certificate_chain=[])
+    return client
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SealedIdentityStore(path=str(tmp_path / "identity.sealed"), client=tee_client("c2VhbC1rZXk="))
+
+
+def test_seal_roundtrip(store):
+    store.seal("alice.near", "secret")
+
+    assert store.unseal() == {"account_id": "alice.near", "signing_key": "secret"}
+
+
+def test_other_enclave_cannot_unseal(store):
+    store.seal("alice.near", "secret")
+    other = SealedIdentityStore(path=store.path, client=tee_client("b3RoZXIta2V5"))
+
+    assert other.unseal() is None
+
+
+def test_worker_restores_sealed_identity(store):
+    with patch.dict('os.environ', {'USE_STATIC_ACCOUNT': 'false', 'SEAL_WORKER_IDENTITY': 'true'}):
+        first = AgentWorker()
+    first.identity_store = store
+
+    with patch('src.tappd.tappd.TappdClient', return_value=tee_client("ZW50cm9weQ==")):
+        account_id, signing_key = first.derive_ephemeral_account()
+
+    with patch.dict('os.environ', {'USE_STATIC_ACCOUNT': 'false', 'SEAL_WORKER_IDENTITY': 'true'}):
+        restarted = AgentWorker()
+    restarted.identity_store = store
+
+    with patch('src.tappd.tappd.TappdClient') as client:
+        assert restarted.derive_ephemeral_account() == (account_id, signing_key)
+        client.assert_not_called()
+    assert restarted.restored_identity
@@ -0,0 +1,45 @@
+import pytest
+
+from src.quote import serializer
+from src.quote.generate_quote import build_token_diff_quote
+from src.quote.serializer import ORJSON, STDLIB, SerializedQuote
+from src.scheduler.scheduler import verify_signature
+from src.simulator.near_rpc import FakeSignContract
+
+
+def test_backends_agree_on_the_canonical_form():
+    if serializer.orjson is None:
+        pytest.skip("orjson is not installed")
+    value = {"signer_id": "alice.near", "intents": [{"diff": {"b": "-1", "a": "2"}, "intent": "token_diff"}], "memo": "café"}
+
+    assert serializer.dumps(value, ORJSON) == serializer.dumps(value, STDLIB)
+    assert serializer.dumps(value, STDLIB) == (
+        '{"intents":[{"diff":{"a":"2","b":"-1"},"intent":"token_diff"}],"memo":"café","signer_id":"alice.near"}'
+    ).encode('utf-8')
+
+
+def test_backend_can_be_forced_to_the_standard_library(monkeypatch):
+    monkeypatch.setenv('QUOTE_JSON_BACKEND', 'json')
+    assert serializer.get_backend() == STDLIB
+
+
+def test_existing_text_is_kept_byte_for_byte():
+    text = '{"nonce": "n", "signer_id": "alice.near"}'
+    quote = SerializedQuote.of(text)
+
+    assert quote.text is text and quote.data == text.encode('utf-8')
+    assert quote.message == b"\x19Ethereum Signed Message:\n" + str(len(text)).encode('utf-8') + text.encode('utf-8')
+    assert SerializedQuote.of(quote) is quote
+
+
+def test_built_quote_signs_and_publishes_the_same_bytes(monkeypatch):
+    contract = FakeSignContract("sign.near")
+    contract.call("worker.near", "register_worker", {"checksum": "c"})
+    quote = build_token_diff_quote("alice.near", "NEAR", str(10 ** 24), "USDC", "2500000")
+
+    signature = contract.call("worker.near", "sign_trade", {"quote": quote.text})
+    payload = bytes(contract.view("generate_payload", {"data": list(quote.message)}))
+
+    monkeypatch.setenv('SIGNER_PUBLIC_KEY_USING_MINDSHARE_ACCOUNT', contract.signer_public_key)
+    assert verify_signature({"result": {"payload": payload.hex()}}, signature)
+    assert b" " not in quote.data and quote.to_dict()["signer_id"] == "alice.near"
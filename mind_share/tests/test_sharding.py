@@ -0,0 +1,146 @@
+import asyncio
+import json
+
+from src.scheduler.sharding import (
+    ShardCoordinator, ShardedRunner, SharedWorker, SqliteLeaseStore, assign_shards, build_sharded_runner
+)
+
+SHARDS = [f"portfolio-{i}.near" for i in range(6)]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def replicas(tmp_path, clock, *names):
+    store = SqliteLeaseStore(str(tmp_path / "leases.db"), clock=clock)
+    return store, [ShardCoordinator(store, SHARDS, replica_id=name, lease_ttl=30, clock=clock) for name in names]
+
+
+async def beat(*coordinators, rounds=2):
+    for _ in range(rounds):
+        for coordinator in coordinators:
+            await coordinator.heartbeat()
+
+
+def test_assignment_is_even_and_the_same_for_every_replica():
+    assignment = assign_shards(SHARDS, ["b", "a", "c"])
+
+    assert assignment == assign_shards(list(reversed(SHARDS)), ["c", "a", "b"])
+    assert sorted(list(assignment.values()).count(replica) for replica in "abc") == [2, 2, 2]
+
+
+def test_replicas_split_the_shards_without_overlap(tmp_path):
+    clock = Clock()
+    store, (a, b) = replicas(tmp_path, clock, "a", "b")
+
+    asyncio.run(beat(a, b))
+
+    assert len(a.owned) == len(b.owned) == 3
+    assert set(a.owned) | set(b.owned) == set(SHARDS)
+    assert {lease.owner for lease in store.leases().values()} == {"a", "b"}
+
+
+def test_lease_of_a_live_owner_cannot_be_taken(tmp_path):
+    clock = Clock()
+    store = SqliteLeaseStore(str(tmp_path / "leases.db"), clock=clock)
+
+    assert store.acquire("p.near", "a", 30)
+    assert not store.acquire("p.near", "b", 30)
+    assert store.acquire("p.near", "a", 30)
+    clock.now += 31
+    assert store.acquire("p.near", "b", 30)
+
+
+def test_survivor_takes_over_when_a_replica_dies(tmp_path):
+    clock = Clock()
+    _, (a, b) = replicas(tmp_path, clock, "a", "b")
+    asyncio.run(beat(a, b))
+
+    # b stops heartbeating, its leases lapse after the ttl
+    clock.now += 31
+    assert not any(b.owns(shard) for shard in SHARDS)
+    asyncio.run(beat(a))
+
+    assert a.owned == sorted(SHARDS)
+
+
+def test_joining_replica_gets_its_share_handed_over(tmp_path):
+    clock = Clock()
+    _, (a, b) = replicas(tmp_path, clock, "a", "b")
+    asyncio.run(beat(a))
+    assert a.owned == sorted(SHARDS)
+
+    asyncio.run(beat(b, a, b, rounds=1))
+
+    assert len(a.owned) == len(b.owned) == 3 and not set(a.owned) & set(b.owned)
+
+
+def test_runner_starts_and_stops_schedulers_with_the_leases(tmp_path):
+    clock = Clock()
+    _, (a, b) = replicas(tmp_path, clock, "a", "b")
+    events = []
+
+    class FakeScheduler:
+        def __init__(self, shard):
+            self.shard = shard
+
+        async def start(self):
+            events.append(("start", self.shard, self.lease()))
+            await asyncio.sleep(3600)
+
+        async def stop(self):
+            events.append(("stop", self.shard))
+
+    async def scenario():
+        runner = ShardedRunner(a, FakeScheduler)
+        await a.heartbeat()
+        await asyncio.sleep(0)
+        await b.heartbeat()
+        await a.heartbeat()
+        return runner
+
+    runner = asyncio.run(scenario())
+
+    assert [event for event in events if event[0] == "start"] == [("start", shard, True) for shard in sorted(SHARDS)]
+    assert sorted(shard for _, shard in (event for event in events if event[0] == "stop")) == sorted(set(SHARDS) - set(a.owned))
+    assert sorted(runner.running) == a.owned
+
+
+def test_portfolios_of_a_replica_share_one_worker(tmp_path, monkeypatch):
+    portfolios = tmp_path / "portfolios.json"
+    portfolios.write_text(json.dumps([{"account_id": shard, "private_key": "key"} for shard in SHARDS[:2]]))
+    monkeypatch.setenv('SHARD_PORTFOLIOS_PATH', str(portfolios))
+
+    runner = build_sharded_runner(str(tmp_path / "leases.db"))
+    first, second = (runner.create_scheduler(shard) for shard in SHARDS[:2])
+
+    assert first.worker is second.worker is runner.shared.worker
+    assert (first.account_id, second.account_id) == tuple(SHARDS[:2])
+
+
+def test_resumed_sign_trade_waits_for_its_portfolio():
+    resumed = []
+
+    class FakeScheduler:
+        account_id = SHARDS[0]
+
+        async def resume_sign_trade(self, tx_result, context):
+            resumed.append((tx_result, context["portfolio"]))
+
+    async def scenario():
+        shared = SharedWorker(worker=object())
+        # A pending transaction of the previous run lands before its portfolio's scheduler is set up
+        await shared.resume_sign_trade("tx", {"portfolio": SHARDS[0]})
+        assert resumed == []
+        shared.attach(FakeScheduler())
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+
+    assert resumed == [("tx", SHARDS[0])]
+
@@ -0,0 +1,49 @@
+import base58
+
+from nacl.signing import SigningKey
+from py_near import transactions
+from src.quote.serializer import erc191_message
+from src.scheduler.scheduler import verify_signature
+from src.simulator.driver import SimulatorStack, run_load
+from src.simulator.near_rpc import FakeSignContract, decode_signed_transaction
+
+
+def test_decodes_py_near_signed_transactions():
+    signing_key = SigningKey(b"\x01" * 32)
+    secret_key = signing_key.encode() + signing_key.verify_key.encode()
+    actions = [transactions.create_function_call_action("sign_trade", b'{"quote":"q"}', 300000000000000, 10 ** 21)]
+    block_hash = b"\x05" * 32
+
+    signed = transactions.sign_and_serialize_transaction("worker.near", secret_key, "sign.near", 7, actions, block_hash)
+    decoded = decode_signed_transaction(signed)
+
+    assert decoded["hash"] == transactions.calc_trx_hash("worker.near", secret_key, "sign.near", 7, actions, block_hash)
+    assert decoded["public_key"] == "ed25519:" + base58.b58encode(signing_key.verify_key.encode()).decode()
+    assert decoded["nonce"] == 7
+    assert decoded["actions"][0]["FunctionCall"]["method_name"] == "sign_trade"
+    assert decoded["actions"][0]["FunctionCall"]["deposit"] == str(10 ** 21)
+
+
+def test_fake_contract_signatures_verify_like_mpc_ones(monkeypatch):
+    contract = FakeSignContract("sign.near")
+    contract.call("worker.near", "register_worker", {"checksum": "c"})
+    quote = '{"nonce":"n"}'
+
+    signature = contract.call("worker.near", "sign_trade", {"quote": quote})
+    payload = bytes(contract.view("generate_payload", {"data": list(erc191_message(quote.encode('utf-8')))}))
+
+    monkeypatch.setenv('SIGNER_PUBLIC_KEY_USING_MINDSHARE_ACCOUNT', contract.signer_public_key)
+    assert verify_signature({"result": {"payload": payload.hex()}}, signature)
+
+
+def test_schedulers_run_full_cycles_against_the_stack():
+    instances = 2
+    with SimulatorStack(tx_delay=0.05, poll_interval=0.05) as stack:
+        report = run_load(stack, instances=instances, cycles=1)
+
+    assert report["failed_instances"] == []
+    assert report["cycles"] == instances
+    # Every portfolio registered its worker, got its trade signed and published the intent
+    assert report["servers"]["near_rpc"]["workers"] == instances
+    assert report["signatures"] == instances
+    assert report["published"] == instances
@@ -0,0 +1,19 @@
+from src.bench.startup import ENTRYPOINT, eagerly_loaded, parse_importtime
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     base58
+import time:      2000 |       5000 |   src.worker.keypair
+import time:       300 |       9000 | src.scheduler.scheduler
+"""
+
+
+def test_parse_importtime_keeps_depth_and_times():
+    entries = parse_importtime(IMPORTTIME_OUTPUT)
+
+    assert [entry["module"] for entry in entries] == ["base58", "src.worker.keypair", "src.scheduler.scheduler"]
+    assert [entry["depth"] for entry in entries] == [2, 1, 0]
+    assert entries[2]["cumulative_us"] == 9000
+
+
+def test_scheduler_import_defers_crypto_and_rpc_libraries():
+    assert eagerly_loaded(ENTRYPOINT) == []
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from src.backtest.engine import MarketHistory
+from src.timeseries.store import MINDSHARE, PRICE, TimeSeriesStore, to_timestamp
+
+DAY = 86400
+
+
+def test_appends_keep_time_order_and_update_the_last_observation(tmp_path):
+    series = TimeSeriesStore(str(tmp_path)).series(MINDSHARE, "NEAR")
+
+    assert series.append([2 * DAY, DAY], [0.2, 0.1]) == 2
+    assert series.append([DAY, 2 * DAY, 3 * DAY], [9.0, 0.25, 0.3]) == 1  # older rows are history already
+
+    timestamps, values = series.columns()
+    assert timestamps.tolist() == [DAY, 2 * DAY, 3 * DAY]
+    assert values.tolist() == [0.1, 0.25, 0.3]
+
+
+def test_windowed_reads(tmp_path):
+    series = TimeSeriesStore(str(tmp_path)).series(MINDSHARE, "ETH")
+    series.append(np.arange(10) * DAY, np.arange(10) / 10)
+
+    assert series.window(2 * DAY, 5 * DAY)[1].tolist() == [0.2, 0.3, 0.4]
+    assert series.rolling_mean(3 * DAY) == pytest.approx(0.8)
+    assert series.delta(4 * DAY) == pytest.approx(0.4)
+    assert series.at(int(4.5 * DAY)) == 0.4 and series.at(-1) is None
+    assert np.isnan(series.resample(np.array([-DAY, DAY]))).tolist() == [True, False]
+
+
+def test_a_value_left_by_a_crashed_writer_does_not_shift_later_rows(tmp_path):
+    series = TimeSeriesStore(str(tmp_path)).series(PRICE, "ETH")
+    series.append([1, 2], [1.0, 2.0])
+    series.values.append(np.array([0.9]))  # crashed before writing its timestamp
+
+    assert series.latest() == (2, 2.0)
+    series.append([3], [3.0])
+
+    assert series.columns()[1].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_quotes_price_the_side_without_a_known_price(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+
+    assert store.record_quote("ETH", 0.5, "USDC", 1000.0, observed_at=DAY) == 1
+    assert store.record_quote("USDC", 100.0, "SOL", 0.5, observed_at=DAY) == 1
+    assert store.record_quote("SOL", 1.0, "ETH", 0.1, observed_at=2 * DAY) == 1  # priced from the last ETH quote
+    assert store.record_quote("BTC", 1.0, "XRP", 10.0) == 0
+
+    assert store.series(PRICE, "ETH").latest() == (DAY, 2000.0)
+    assert store.series(PRICE, "SOL").columns()[1].tolist() == [200.0, 200.0]
+    assert store.series(PRICE, "USDC").latest() is None
+
+
+def test_readers_see_rows_appended_by_another_writer(tmp_path):
+    reader = TimeSeriesStore(str(tmp_path)).series(MINDSHARE, "SOL")
+    assert reader.latest() is None
+
+    TimeSeriesStore(str(tmp_path)).record_mindshare("SOL", {"2026-10-17": 0.05, "2026-10-18": 0.06})
+
+    assert reader.latest() == (to_timestamp("2026-10-18"), 0.06)
+    assert len(reader) == 2
+
+
+def test_history_for_the_backtester_comes_from_the_store(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    observed = to_timestamp("2026-10-16")
+    store.record_quote("ETH", 1.0, "USDC", 2000.0, observed_at=observed)
+    store.record_quote("ETH", 1.0, "USDC", 2100.0, observed_at=observed + DAY)
+    store.record_mindshare("ETH", {"2026-10-18": 0.06})
+
+    history = MarketHistory.from_store(store, ["USDC", "ETH"], observed, observed + 3 * DAY, DAY)
+
+    assert history.prices[:, 1].tolist() == [2000.0, 2100.0, 2100.0]
+    assert history.prices[:, 0].tolist() == [1.0] * 3  # stablecoins need no recorded price
+    assert history.mindshare.tolist() == [[0.0, 0.0], [0.0, 0.0], [0.0, 0.06]]
+    with pytest.raises(ValueError):
+        MarketHistory.from_store(store, ["NEAR"], observed, observed + DAY, DAY)
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import pytest
+
+from src.bench.cassette import Cassette
+from src.bench.harness import CycleHarness, LatencyProfile, SAMPLE_CASSETTE_PATH, replay_scheduler
+from src.telemetry import tracing
+from src.telemetry.tracing import NOOP_SPAN, RotatingJsonlExporter, Tracer
+
+
+def read_spans(path):
+    spans = []
+    with open(path) as file:
+        for line in file:
+            request = json.loads(line)
+            for resource in request["resourceSpans"]:
+                for scope in resource["scopeSpans"]:
+                    spans.extend(scope["spans"])
+    return spans
+
+
+def attributes(span):
+    return {item["key"]: list(item["value"].values())[0] for item in span["attributes"]}
+
+
+@pytest.fixture
+def tracer(tmp_path, monkeypatch):
+    tracer = Tracer(RotatingJsonlExporter(str(tmp_path / "traces.jsonl")))
+    monkeypatch.setattr(tracing, "_tracer", tracer)
+    return tracer
+
+
+def test_disabled_tracer_hands_out_noop_spans():
+    tracer = Tracer()
+    with tracer.cycle() as cycle, tracer.span("stage") as span:
+        span.set_attribute("ignored", 1)
+    assert cycle is NOOP_SPAN and span is NOOP_SPAN
+
+
+def test_concurrent_children_keep_their_parent_and_export_with_the_root(tracer):
+    async def quote(pair):
+        with tracer.span("quote.sign", pair=pair):
+            await asyncio.sleep(0)
+            with tracer.span("contract.sign_trade", gas=300):
+                await asyncio.sleep(0)
+
+    async def cycle():
+        with tracer.cycle(portfolio="alice.near"):
+            await asyncio.gather(quote("ETH/USDC"), quote("SOL/NEAR"))
+
+    asyncio.run(cycle())
+
+    with open(tracer.exporter.path) as file:
+        assert len(file.readlines()) == 1
+    spans = {span["spanId"]: span for span in read_spans(tracer.exporter.path)}
+    root = next(span for span in spans.values() if "parentSpanId" not in span)
+    assert attributes(root)["cycle.id"] == root["traceId"]
+    for span in spans.values():
+        assert span["traceId"] == root["traceId"]
+        if span["name"] == "contract.sign_trade":
+            assert spans[span["parentSpanId"]]["name"] == "quote.sign"
+            assert attributes(span)["gas"] == "300"
+
+
+def test_failed_stage_is_marked_and_late_spans_export_alone(tracer):
+    with pytest.raises(ValueError):
+        with tracer.cycle():
+            late = tracer.start_span("tx.resume")
+            with tracer.span("publish_intent"):
+                raise ValueError("relay down")
+    late.end()
+
+    spans = read_spans(tracer.exporter.path)
+    failed = next(span for span in spans if span["name"] == "publish_intent")
+    assert failed["status"] == {"code": "STATUS_CODE_ERROR", "message": "ValueError: relay down"}
+    assert spans[-1]["name"] == "tx.resume" and "parentSpanId" in spans[-1]
+
+
+def test_exporter_rotates_past_max_bytes(tmp_path):
+    path = str(tmp_path / "traces.jsonl")
+    tracer = Tracer(RotatingJsonlExporter(path, max_bytes=600, backups=2))
+    for _ in range(6):
+        with tracer.cycle():
+            pass
+
+    assert (tmp_path / "traces.jsonl.1").exists() and (tmp_path / "traces.jsonl.2").exists()
+    assert not (tmp_path / "traces.jsonl.3").exists()
+
+
+def test_replayed_cycle_has_a_span_per_stage(tracer):
+    harness = CycleHarness(replay_scheduler(), Cassette.load(SAMPLE_CASSETTE_PATH), latency=LatencyProfile(scale=0))
+    asyncio.run(harness.run_cycle())
+
+    names = [span["name"] for span in read_spans(tracer.exporter.path)]
+    for stage in ("cycle", "agent.run", "quote.process", "quote.parse", "quote.intent_swap",
+                  "quote.sign", "quote.publish", "verify_signature", "publish_intent"):
+        assert stage in names
+    assert names.count("quote.sign") == 2
@@ -0,0 +1,78 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock
+
+from src.contract.tx_tracker import TransactionTracker
+
+
+def landed(value="ok"):
+    return Mock(status={"SuccessValue": value})
+
+
+def test_wait_returns_result_when_transaction_lands():
+    provider = Mock()
+    provider.get_tx = AsyncMock(side_effect=[Exception("UNKNOWN_TRANSACTION"), landed()])
+    tracker = TransactionTracker(provider, "worker.near", poll_interval=0.01)
+
+    async def scenario():
+        tracker.track("hash", "sign_trade")
+        tracker.start()
+        result = await tracker.wait("hash", timeout=1)
+        await tracker.stop()
+        return result
+
+    result = asyncio.run(scenario())
+
+    assert result.status == {"SuccessValue": "ok"}
+    assert provider.get_tx.await_count == 2
+    assert tracker.pending == []
+
+
+def test_timed_out_transaction_is_resumed_by_handler():
+    provider = Mock()
+    provider.get_tx = AsyncMock(return_value=None)
+    tracker = TransactionTracker(provider, "worker.near")
+    resumed = []
+
+    async def handler(tx_result, context):
+        resumed.append((tx_result.status, context))
+
+    tracker.on_result("sign_trade", handler)
+
+    async def scenario():
+        tracker.track("hash", "sign_trade", {"quote": "q"})
+        assert await tracker.wait("hash", timeout=0.01) is None
+
+        # Polling keeps going after the waiter gave up
+        await tracker.poll_once()
+        assert resumed == []
+
+        provider.get_tx.return_value = landed()
+        await tracker.poll_once()
+
+    asyncio.run(scenario())
+
+    assert resumed == [({"SuccessValue": "ok"}, {"quote": "q"})]
+
+
+def test_pending_transactions_survive_restart(tmp_path):
+    path = str(tmp_path / "pending.json")
+    provider = Mock()
+    provider.get_tx = AsyncMock(return_value=None)
+
+    async def submit():
+        tracker = TransactionTracker(provider, "worker.near", path=path)
+        tracker.track("hash", "sign_trade", {"quote": "q"})
+
+    asyncio.run(submit())
+    with open(path) as file:
+        assert json.load(file)[0]["tx_hash"] == "hash"
+
+    restarted = TransactionTracker(provider, "worker.near", path=path)
+    handler = AsyncMock()
+    restarted.on_result("sign_trade", handler)
+    provider.get_tx.return_value = landed()
+    asyncio.run(restarted.poll_once())
+
+    handler.assert_awaited_once()
+    assert handler.call_args[0][1] == {"quote": "q"}
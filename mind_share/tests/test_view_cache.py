@@ -0,0 +1,74 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+from src.rpc.view_cache import ViewCallCache
+
+
+def view_result(value, block_height):
+    return Mock(result=value, block_height=block_height)
+
+
+def test_identical_concurrent_calls_share_one_request():
+    cache = ViewCallCache()
+    fetch = AsyncMock(return_value=view_result(1, 100))
+
+    async def scenario():
+        return await asyncio.gather(*(
+            cache.call("sign.near", "get_worker", {"account_id": "a"}, fetch) for _ in range(5)
+        ))
+
+    results = asyncio.run(scenario())
+
+    assert fetch.await_count == 1
+    assert all(result.result == 1 for result in results)
+
+
+def test_args_order_does_not_change_the_key():
+    cache = ViewCallCache()
+    cache.store("intents.near", "mt_balance_of", {"account_id": "a", "token_id": "t"}, {"result": "1"})
+
+    hit, value = cache.lookup("intents.near", "mt_balance_of", {"token_id": "t", "account_id": "a"})
+
+    assert hit
+    assert value == {"result": "1"}
+
+
+def test_newer_block_invalidates_block_aware_entries():
+    cache = ViewCallCache(ttl=60)
+    cache.store("intents.near", "mt_balance_of", {"token_id": "t"}, {"result": "1", "block_height": 100})
+    cache.store("sign.near", "generate_payload", {"data": [1]}, view_result([0] * 32, 100), block_aware=False)
+
+    cache.observe_block(101)
+
+    assert cache.lookup("intents.near", "mt_balance_of", {"token_id": "t"}) == (False, None)
+    assert cache.lookup("sign.near", "generate_payload", {"data": [1]})[0]
+
+
+def test_ttl_expiry_and_explicit_invalidation():
+    clock = Mock(return_value=0.0)
+    cache = ViewCallCache(ttl=1, clock=clock)
+    cache.store("sign.near", "get_worker", {"account_id": "a"}, view_result({}, None))
+
+    assert cache.lookup("sign.near", "get_worker", {"account_id": "a"})[0]
+    cache.invalidate("sign.near", "get_worker")
+    assert not cache.lookup("sign.near", "get_worker", {"account_id": "a"})[0]
+
+    cache.store("sign.near", "get_worker", {"account_id": "a"}, view_result({}, None))
+    clock.return_value = 2.0
+    assert not cache.lookup("sign.near", "get_worker", {"account_id": "a"})[0]
+
+
+def test_failed_fetch_is_not_cached():
+    cache = ViewCallCache()
+    fetch = AsyncMock(side_effect=[Exception("option::unwrap()"), view_result({}, 1)])
+
+    async def scenario():
+        try:
+            await cache.call("sign.near", "get_worker", {"account_id": "a"}, fetch)
+        except Exception:
+            pass
+        return await cache.call("sign.near", "get_worker", {"account_id": "a"}, fetch)
+
+    asyncio.run(scenario())
+
+    assert fetch.await_count == 2
@@ -0,0 +1,111 @@
+import asyncio
+import base58
+import secrets
+
+from nacl.signing import SigningKey
+from unittest.mock import Mock
+from src.tappd.tappd import DeriveKeyResponse
+from src.worker.pool import WorkerAccountPool, DERIVED, FUNDED, REGISTERED
+from src.worker.pool_store import SqlitePoolStore
+
+
+def random_key():
+    signing_key = SigningKey(secrets.token_bytes(32))
+    return base58.b58encode(signing_key.encode() + signing_key.verify_key.encode()).decode('utf-8')
+
+
+def test_pool_advances_accounts_to_registered():
+    funded = set()
+
+    async def check_funded(account):
+        return account.account_id in funded
+
+    async def register(account):
+        return True
+
+    pool = WorkerAccountPool(size=2, derive_key=random_key, check_funded=check_funded, register=register)
+
+    async def scenario():
+        await pool.replenish()
+        assert pool.stats() == {DERIVED: 2, FUNDED: 0, REGISTERED: 0}
+        assert pool.acquire() is None
+
+        funded.add(pool.pending_funding()[0])
+        await pool.replenish()
+        assert pool.stats() == {DERIVED: 1, FUNDED: 0, REGISTERED: 1}
+
+        account = pool.acquire()
+        assert account.ready
+        assert len(account.account_id) == 64
+
+        # The handed out account is replaced on the next pass
+        await pool.replenish()
+        assert sum(pool.stats().values()) == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_registration_keeps_account_funded():
+    async def check_funded(account):
+        return True
+
+    async def register(account):
+        raise Exception("rpc down")
+
+    pool = WorkerAccountPool(size=1, derive_key=random_key, check_funded=check_funded, register=register)
+    asyncio.run(pool.replenish())
+
+    assert pool.stats()[FUNDED] == 1
+    assert pool.acquire() is None
+
+
+def shared_pool(tmp_path, owner, funded, size=2):
+    client = Mock()
+    client.derive_key.return_value = DeriveKeyResponse(key="c2VhbC1rZXk=", certificate_chain=[])
+
+    async def check_funded(account):
+        return account.account_id in funded
+
+    async def register(account):
+        return True
+
+    return WorkerAccountPool(size=size, derive_key=random_key, check_funded=check_funded, register=register,
+                             store=SqlitePoolStore(str(tmp_path / "pool.db"), client), owner=owner)
+
+
+def test_pool_keys_survive_a_restart_and_in_use_accounts_stay_in_use(tmp_path):
+    funded = set()
+    pool = shared_pool(tmp_path, "replica-a", funded)
+    asyncio.run(pool.replenish())
+    announced = pool.pending_funding()
+    funded.update(announced)
+    asyncio.run(pool.replenish())
+    in_use = pool.acquire()
+
+    # The operator funded the announced accounts, a new process still holds their keys
+    restarted = shared_pool(tmp_path, "replica-b", funded)
+    assert [account.account_id for account in restarted.spare()] == [a for a in announced if a != in_use.account_id]
+    assert restarted.stats() == {DERIVED: 0, FUNDED: 0, REGISTERED: 1}
+    assert restarted.acquire().account_id != in_use.account_id
+    assert restarted.acquire().account_id != in_use.account_id
+    # An owner that comes back under the same id gets its own account again
+    assert shared_pool(tmp_path, "replica-a", funded).acquire().account_id == in_use.account_id
+
+
+def test_a_new_replica_takes_a_ready_account_at_once_and_none_twice(tmp_path):
+    funded = set()
+    first = shared_pool(tmp_path, "replica-a", funded, size=1)
+    asyncio.run(first.replenish())
+    funded.update(first.pending_funding())
+    asyncio.run(first.replenish())
+
+    # Nothing to derive or fund, the account the first replica prepared is ready
+    second = shared_pool(tmp_path, "replica-b", funded, size=1)
+    third = shared_pool(tmp_path, "replica-c", funded, size=1)
+    assert second.acquire() is not None
+    assert third.acquire() is None
+    # The shared pool is topped up to its size again, whichever replica gets to it
+    asyncio.run(third.replenish())
+    asyncio.run(second.replenish())
+    assert sum(second.stats().values()) == 1
+